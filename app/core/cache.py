@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from collections.abc import Callable
+from typing import Generic, TypeVar
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from ..models.dialetos import insert_com_upsert
+from ..models.models import VersaoCache
+
+# CONFIG
+CACHE_REVALIDACAO_SEGUNDOS = float(os.environ.get("CACHE_REVALIDACAO_SEGUNDOS", 5))
+
+T = TypeVar("T")
+
+_SEM_VALOR = object()
+_caches: list["CacheVersionado"] = []
+
+
+class CacheVersionado(Generic[T]):
+    """
+    Cache de processo para dados pequenos e muito lidos.
+
+    Toda escrita em `modelo` feita por uma Session incrementa a versão da
+    `chave` na tabela versao_cache, na mesma transação. O processo que
+    escreveu invalida sua cópia no commit; os demais comparam a versão do BD
+    com a sua no máximo a cada CACHE_REVALIDACAO_SEGUNDOS.
+    """
+
+    def __init__(self, chave: str, modelo: type, carregar: Callable[[Session], T]):
+        self.chave = chave
+        self.modelo = modelo
+        self.carregar = carregar
+        self.acertos = 0
+        self.falhas = 0
+        self._trava = threading.Lock()
+        self._valor = _SEM_VALOR
+        self._versao: int | None = None
+        self._verificado_em = 0.0
+        self._geracao = 0
+        _caches.append(self)
+
+    def obter(self, db: Session) -> T:
+        agora = time.monotonic()
+        with self._trava:
+            if (
+                self._valor is not _SEM_VALOR
+                and agora - self._verificado_em < CACHE_REVALIDACAO_SEGUNDOS
+            ):
+                self.acertos += 1
+                return self._valor  # type: ignore[return-value]
+            geracao = self._geracao
+
+        versao = db.scalar(
+            select(VersaoCache.versao).where(VersaoCache.chave == self.chave)
+        )
+        with self._trava:
+            if self._valor is not _SEM_VALOR and versao == self._versao:
+                self._verificado_em = agora
+                self.acertos += 1
+                return self._valor  # type: ignore[return-value]
+
+        valor = self.carregar(db)
+        with self._trava:
+            self.falhas += 1
+            # Não guarda o valor se houve invalidação durante a carga
+            if geracao == self._geracao:
+                self._valor = valor
+                self._versao = versao
+                self._verificado_em = agora
+        return valor
+
+    def invalida(self) -> None:
+        with self._trava:
+            self._valor = _SEM_VALOR
+            self._geracao += 1
+
+
+def caches_registrados() -> list[CacheVersionado]:
+    return list(_caches)
+
+
+def _incrementa_versoes(session: Session, chaves: set[str]) -> None:
+    session.info.setdefault("caches_alterados", set()).update(chaves)
+
+    conexao = session.connection()
+    for chave in chaves:
+        stmt = insert_com_upsert(conexao.dialect.name, VersaoCache).values(
+            chave=chave, versao=1
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[VersaoCache.chave],
+            set_={"versao": VersaoCache.versao + 1},
+        )
+        conexao.execute(stmt)
+
+
+@event.listens_for(Session, "after_flush")
+def _registra_escritas(session: Session, contexto) -> None:
+    alterados = [*session.new, *session.dirty, *session.deleted]
+    chaves = {
+        cache.chave
+        for cache in _caches
+        if any(isinstance(obj, cache.modelo) for obj in alterados)
+    }
+    if chaves:
+        _incrementa_versoes(session, chaves)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _registra_escritas_em_massa(estado: ORMExecuteState) -> None:
+    if not (estado.is_insert or estado.is_update or estado.is_delete):
+        return
+    modelos = {mapper.class_ for mapper in estado.all_mappers}
+    chaves = {cache.chave for cache in _caches if cache.modelo in modelos}
+    if chaves:
+        _incrementa_versoes(estado.session, chaves)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalida_apos_commit(session: Session) -> None:
+    chaves = session.info.pop("caches_alterados", set())
+    for cache in _caches:
+        if cache.chave in chaves:
+            cache.invalida()
+
+
+@event.listens_for(Session, "after_rollback")
+def _descarta_apos_rollback(session: Session) -> None:
+    session.info.pop("caches_alterados", None)
@@ -0,0 +1,93 @@
+import os
+import threading
+from collections import OrderedDict
+
+from .executores import pool_processos
+from .seguranca import descriptografa_lote
+
+# CONFIG
+TAMANHO_CACHE_CPFS = int(os.environ.get("TAMANHO_CACHE_CPFS", 10_000))
+
+# Abaixo disso o custo de enviar os CPFs a outros processos não compensa
+MINIMO_CPFS_PARALELO = 2000
+TAMANHO_LOTE_CPFS = 1000
+
+INCLUIR_CPF_DESCRICAO = (
+    "Descriptografa e devolve o CPF de cada item; envie false para listar "
+    "mais rápido quando o CPF não for usado"
+)
+
+_cache: OrderedDict[bytes, str] = OrderedDict()
+_trava_cache = threading.Lock()
+# CPFs distintos encontrados e não encontrados no cache
+estatisticas_cache = {"acertos": 0, "falhas": 0}
+
+
+def _descriptografa_em_paralelo(cifrados: list[bytes]) -> list[str]:
+    if len(cifrados) < MINIMO_CPFS_PARALELO:
+        return descriptografa_lote(cifrados)
+
+    lotes = [
+        cifrados[inicio : inicio + TAMANHO_LOTE_CPFS]
+        for inicio in range(0, len(cifrados), TAMANHO_LOTE_CPFS)
+    ]
+    return [
+        cpf for lote in pool_processos().map(descriptografa_lote, lotes) for cpf in lote
+    ]
+
+
+def descriptografa_cpfs(cifrados: list[bytes | None]) -> list[str | None]:
+    """
+    Descriptografa os CPFs de uma página de uma vez, na mesma ordem e
+    devolvendo None para os vazios. Os já vistos vêm de um cache LRU de até
+    TAMANHO_CACHE_CPFS itens indexado pelo texto cifrado; os demais são
+    descriptografados uma única vez cada, no pool de processos se forem muitos.
+    """
+    encontrados: dict[bytes, str] = {}
+    faltando: dict[bytes, None] = {}
+    with _trava_cache:
+        for cifrado in cifrados:
+            if not cifrado or cifrado in encontrados:
+                continue
+            cpf = _cache.get(cifrado)
+            if cpf is None:
+                faltando[cifrado] = None
+                continue
+            _cache.move_to_end(cifrado)
+            encontrados[cifrado] = cpf
+        estatisticas_cache["acertos"] += len(encontrados)
+        estatisticas_cache["falhas"] += len(faltando)
+
+    if faltando:
+        novos = dict(zip(faltando, _descriptografa_em_paralelo(list(faltando))))
+        encontrados.update(novos)
+        if TAMANHO_CACHE_CPFS > 0:
+            with _trava_cache:
+                _cache.update(novos)
+                while len(_cache) > TAMANHO_CACHE_CPFS:
+                    _cache.popitem(last=False)
+
+    return [encontrados[cifrado] if cifrado else None for cifrado in cifrados]
+
+
+class ComCpfDescriptografado:
+    """
+    Mixin dos esquemas de saída que expõem o CPF descriptografado de
+    objetos com a coluna cpf_cript. Use antes de BaseModel nas bases.
+    """
+
+    @classmethod
+    def from_orm(cls, obj):
+        return cls.lista_from_orm([obj])[0]
+
+    @classmethod
+    def lista_from_orm(cls, objs, incluir_cpf: bool = True):
+        """
+        Converte uma página inteira, descriptografando os CPFs em lote, ou
+        deixando-os como None quando incluir_cpf é False.
+        """
+        if incluir_cpf:
+            cpfs = descriptografa_cpfs([obj.cpf_cript for obj in objs])
+        else:
+            cpfs = [None] * len(objs)
+        return [cls(**{**obj.__dict__, "cpf": cpf}) for obj, cpf in zip(objs, cpfs)]
@@ -0,0 +1,69 @@
+import asyncio
+import secrets
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models.models import Funcionario
+from .cache import CacheVersionado
+from .executores import pool_senhas
+from . import seguranca
+from .seguranca import gerar_hash_senha, verificar_hash
+
+
+@dataclass(frozen=True)
+class Credencial:
+    id: int
+    tipo: str
+    senha: str
+
+
+def _carrega_credenciais(db: Session) -> dict[str, Credencial]:
+    linhas = db.execute(
+        select(
+            Funcionario.cpf_hash, Funcionario.id, Funcionario.tipo, Funcionario.senha
+        ).where(Funcionario.cpf_hash.is_not(None), Funcionario.data_saida.is_(None))
+    )
+    return {
+        cpf_hash: Credencial(id, tipo.value, senha)
+        for cpf_hash, id, tipo, senha in linhas
+    }
+
+
+# Funcionários ativos indexados pelo hash do CPF. Invalidado automaticamente
+# por qualquer escrita em Funcionario (senha nova, desligamento, anonimização)
+cache_credenciais = CacheVersionado("credenciais", Funcionario, _carrega_credenciais)
+
+
+_hashes_ficticios: dict[tuple[str, int], str] = {}
+
+
+def hash_ficticio() -> str:
+    """
+    Hash de uma senha aleatória com o KDF atual, verificado quando o CPF não
+    tem credencial para que o login leve o mesmo tempo com ou sem cadastro.
+    """
+    chave = (seguranca.KDF_SENHAS, seguranca.ITERACOES_PBKDF2)
+    if chave not in _hashes_ficticios:
+        _hashes_ficticios[chave] = gerar_hash_senha(secrets.token_hex(16))
+    return _hashes_ficticios[chave]
+
+
+def busca_credencial(db: Session, cpf_hash: str) -> Credencial | None:
+    return cache_credenciais.obter(db).get(cpf_hash)
+
+
+def _verifica(senha: str, hash_senha: str | None) -> bool:
+    return verificar_hash(senha, hash_senha or hash_ficticio())
+
+
+async def verifica_senha(senha: str, hash_senha: str | None) -> bool:
+    """
+    Verifica a senha no pool de senhas, sem bloquear o event loop. Sem
+    `hash_senha`, verifica contra o hash fictício e retorna False.
+    """
+    correta = await asyncio.wrap_future(
+        pool_senhas().submit(_verifica, senha, hash_senha)
+    )
+    return correta and hash_senha is not None
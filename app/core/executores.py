@@ -0,0 +1,55 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# CONFIG
+MAX_PROCESSOS = int(os.environ.get("MAX_PROCESSOS", os.cpu_count() or 1))
+TRABALHADORES_SENHAS = int(
+    os.environ.get("TRABALHADORES_SENHAS", min(4, os.cpu_count() or 1))
+)
+
+_pool_processos: ProcessPoolExecutor | None = None
+_pool_senhas: ThreadPoolExecutor | None = None
+_trava_senhas = threading.Lock()
+
+
+def pool_processos() -> ProcessPoolExecutor:
+    """
+    Retorna o pool de processos compartilhado para trabalho pesado de CPU,
+    criando-o no primeiro uso. Usa spawn para não herdar as threads do servidor.
+    """
+    global _pool_processos
+    if _pool_processos is None:
+        _pool_processos = ProcessPoolExecutor(
+            max_workers=MAX_PROCESSOS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool_processos
+
+
+def pool_senhas() -> ThreadPoolExecutor:
+    """
+    Retorna o pool de threads que verifica senhas no login, criando-o no
+    primeiro uso. Fica separado do threadpool das rotas para que um KDF lento
+    em muitos logins simultâneos não ocupe as threads das demais requisições.
+    Threads bastam: o hashlib libera o GIL durante o pbkdf2.
+    """
+    global _pool_senhas
+    with _trava_senhas:
+        if _pool_senhas is None:
+            _pool_senhas = ThreadPoolExecutor(
+                max_workers=TRABALHADORES_SENHAS, thread_name_prefix="senhas"
+            )
+        return _pool_senhas
+
+
+def encerra_pools() -> None:
+    global _pool_processos, _pool_senhas
+    if _pool_processos is not None:
+        _pool_processos.shutdown(cancel_futures=True)
+        _pool_processos = None
+    with _trava_senhas:
+        if _pool_senhas is not None:
+            _pool_senhas.shutdown(cancel_futures=True)
+            _pool_senhas = None
@@ -0,0 +1,85 @@
+import io
+import os
+import tempfile
+from collections.abc import Iterator
+
+import polars as pl
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+from ..models.db_setup import engine
+from ..utils.arquivos import TAMANHO_BLOCO_COPIA
+
+# CONFIG
+TAMANHO_LOTE_EXPORTACAO = int(os.environ.get("TAMANHO_LOTE_EXPORTACAO", 10_000))
+
+TIPOS_MIDIA = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _lotes(query: Select, esquema: dict) -> Iterator[pl.DataFrame]:
+    # yield_per usa cursor do lado do servidor quando o driver suporta
+    # (psycopg) e fetchmany nos demais, então só um lote fica na memória
+    with Session(engine) as db:
+        resultado = db.execute(
+            query.execution_options(yield_per=TAMANHO_LOTE_EXPORTACAO)
+        )
+        for linhas in resultado.partitions():
+            yield pl.DataFrame(linhas, schema=esquema, orient="row")
+
+
+def _csv(lotes: Iterator[pl.DataFrame], esquema: dict) -> Iterator[bytes]:
+    cabecalho = True
+    for lote in lotes:
+        buffer = io.BytesIO()
+        lote.write_csv(buffer, include_header=cabecalho)
+        cabecalho = False
+        yield buffer.getvalue()
+    if cabecalho:
+        yield pl.DataFrame(schema=esquema).write_csv().encode()
+
+
+def _ndjson(lotes: Iterator[pl.DataFrame]) -> Iterator[bytes]:
+    for lote in lotes:
+        buffer = io.BytesIO()
+        lote.write_ndjson(buffer)
+        yield buffer.getvalue()
+
+
+def _parquet(lotes: Iterator[pl.DataFrame], esquema: dict) -> Iterator[bytes]:
+    # O rodapé do Parquet só pode ser escrito no fim: os lotes vão para
+    # arquivos IPC temporários, que o polars junta em streaming num Parquet
+    with tempfile.TemporaryDirectory() as diretorio:
+        partes = []
+        for lote in lotes:
+            partes.append(os.path.join(diretorio, f"{len(partes)}.arrow"))
+            lote.write_ipc(partes[-1])
+        if not partes:
+            partes.append(os.path.join(diretorio, "vazio.arrow"))
+            pl.DataFrame(schema=esquema).write_ipc(partes[-1])
+
+        caminho = os.path.join(diretorio, "exportacao.parquet")
+        pl.scan_ipc(partes).sink_parquet(caminho)
+        with open(caminho, "rb") as arquivo:
+            while bloco := arquivo.read(TAMANHO_BLOCO_COPIA):
+                yield bloco
+
+
+def exporta(query: Select, esquema: dict, formato: str) -> Iterator[bytes]:
+    """
+    Executa a query numa sessão própria e gera o resultado em blocos de
+    bytes no `formato` pedido (uma chave de TIPOS_MIDIA), lendo no máximo
+    TAMANHO_LOTE_EXPORTACAO linhas por vez. As colunas da query devem
+    seguir a ordem do `esquema`.
+    """
+    lotes = _lotes(query, esquema)
+    match formato:
+        case "csv":
+            return _csv(lotes, esquema)
+        case "ndjson":
+            return _ndjson(lotes)
+        case _:
+            return _parquet(lotes, esquema)
@@ -0,0 +1,213 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from ..models.db_setup import engine
+from ..models.models import HistoricoAcoes
+
+# CONFIG
+# sincrono: grava na transação da requisição
+# lote: enfileira após o commit e espera vaga na fila se ela estiver cheia, por
+# até ESPERA_FILA_AUDITORIA_SEGUNDOS; o que não couber é gravado na hora
+# descartavel: enfileira após o commit e descarta a ação se a fila estiver cheia
+MODO_AUDITORIA = os.environ.get("MODO_AUDITORIA", "sincrono")
+TAMANHO_FILA_AUDITORIA = int(os.environ.get("TAMANHO_FILA_AUDITORIA", 10_000))
+TAMANHO_LOTE_AUDITORIA = int(os.environ.get("TAMANHO_LOTE_AUDITORIA", 500))
+INTERVALO_AUDITORIA_SEGUNDOS = float(os.environ.get("INTERVALO_AUDITORIA_SEGUNDOS", 1))
+# Espera máxima por vaga em cada commit, não em cada ação
+ESPERA_FILA_AUDITORIA_SEGUNDOS = float(
+    os.environ.get("ESPERA_FILA_AUDITORIA_SEGUNDOS", 0.5)
+)
+
+MODOS_AUDITORIA = ("sincrono", "lote", "descartavel")
+
+logger = logging.getLogger(__name__)
+
+_fila: queue.Queue[dict] = queue.Queue(maxsize=TAMANHO_FILA_AUDITORIA)
+_parar = threading.Event()
+_trava = threading.Lock()
+_trabalhador: threading.Thread | None = None
+
+_metricas = {
+    "enfileiradas": 0,
+    "gravadas": 0,
+    "descartadas": 0,
+    "diretas": 0,
+    "falhas": 0,
+    "lotes": 0,
+    "ultima_latencia_ms": 0.0,
+    "maior_latencia_ms": 0.0,
+    "latencia_total_ms": 0.0,
+}
+
+
+def auditoria_assincrona() -> bool:
+    if MODO_AUDITORIA not in MODOS_AUDITORIA:
+        raise ValueError(f"MODO_AUDITORIA inválido: {MODO_AUDITORIA}")
+    return MODO_AUDITORIA != "sincrono"
+
+
+def adia_acoes(db: Session, linhas: list[dict]) -> None:
+    """
+    Guarda as linhas de HistoricoAcoes na sessão para serem
+    enfileiradas só depois que a transação for commitada.
+    """
+    # Sem transação aberta o commit não dispara after_commit
+    if not db.in_transaction():
+        db.begin()
+    db.info.setdefault("acoes_pendentes", []).extend(linhas)
+
+
+def _soma(**valores) -> None:
+    with _trava:
+        for chave, valor in valores.items():
+            _metricas[chave] += valor
+
+
+def enfileira(linhas: list[dict]) -> None:
+    """
+    Põe as linhas na fila. No modo descartavel, as que não cabem são
+    descartadas; no modo lote, espera vaga por até
+    ESPERA_FILA_AUDITORIA_SEGUNDOS no total e grava o restante direto no BD,
+    para não travar a requisição (ou o event loop, com a AsyncSession) se o
+    trabalhador parar.
+    """
+    inicia_fila_auditoria()
+    descartar = MODO_AUDITORIA == "descartavel"
+    prazo = time.monotonic() + ESPERA_FILA_AUDITORIA_SEGUNDOS
+    for posicao, linha in enumerate(linhas):
+        try:
+            if descartar:
+                _fila.put_nowait(linha)
+            else:
+                _fila.put(linha, timeout=max(0.0, prazo - time.monotonic()))
+        except queue.Full:
+            if descartar:
+                _soma(descartadas=1)
+                continue
+            _grava_direto(linhas[posicao:])
+            return
+        else:
+            _soma(enfileiradas=1)
+
+
+def _grava_direto(linhas: list[dict]) -> None:
+    try:
+        with engine.begin() as conexao:
+            conexao.execute(insert(HistoricoAcoes.__table__), linhas)
+    except Exception:
+        logger.exception("Falha gravando %d ações do histórico", len(linhas))
+        _soma(falhas=len(linhas))
+    else:
+        _soma(gravadas=len(linhas), diretas=len(linhas))
+
+
+def _grava(lote: list[dict]) -> None:
+    inicio = time.perf_counter()
+    try:
+        with engine.begin() as conexao:
+            conexao.execute(insert(HistoricoAcoes.__table__), lote)
+    except Exception:
+        logger.exception("Falha gravando %d ações do histórico", len(lote))
+        _soma(falhas=len(lote))
+        return
+    finally:
+        for _ in lote:
+            _fila.task_done()
+
+    latencia = (time.perf_counter() - inicio) * 1000
+    with _trava:
+        _metricas["gravadas"] += len(lote)
+        _metricas["lotes"] += 1
+        _metricas["ultima_latencia_ms"] = latencia
+        _metricas["maior_latencia_ms"] = max(_metricas["maior_latencia_ms"], latencia)
+        _metricas["latencia_total_ms"] += latencia
+
+
+def _retira_lote(espera: float | None) -> list[dict]:
+    lote = []
+    try:
+        if espera is not None:
+            lote.append(_fila.get(timeout=espera))
+        while len(lote) < TAMANHO_LOTE_AUDITORIA:
+            lote.append(_fila.get_nowait())
+    except queue.Empty:
+        pass
+    return lote
+
+
+def descarrega_fila() -> None:
+    """
+    Grava tudo o que estiver na fila no momento, em lotes.
+    """
+    while lote := _retira_lote(None):
+        _grava(lote)
+
+
+def _consome() -> None:
+    while not _parar.is_set():
+        if lote := _retira_lote(INTERVALO_AUDITORIA_SEGUNDOS):
+            _grava(lote)
+    descarrega_fila()
+
+
+def inicia_fila_auditoria() -> None:
+    global _trabalhador
+    with _trava:
+        if _trabalhador is None or not _trabalhador.is_alive():
+            _parar.clear()
+            _trabalhador = threading.Thread(
+                target=_consome, name="fila-auditoria", daemon=True
+            )
+            _trabalhador.start()
+
+
+def encerra_fila_auditoria() -> None:
+    """
+    Para o trabalhador e grava o que ainda estiver na fila.
+    """
+    global _trabalhador
+    _parar.set()
+    if _trabalhador is not None:
+        _trabalhador.join()
+        _trabalhador = None
+    descarrega_fila()
+
+
+def aguarda_fila() -> None:
+    """
+    Bloqueia até que todas as ações enfileiradas tenham sido processadas.
+    """
+    _fila.join()
+
+
+def metricas_fila() -> dict:
+    with _trava:
+        metricas = dict(_metricas)
+    metricas["latencia_media_ms"] = (
+        metricas.pop("latencia_total_ms") / metricas["lotes"]
+        if metricas["lotes"]
+        else 0.0
+    )
+    return {
+        "modo": MODO_AUDITORIA,
+        "profundidade": _fila.qsize(),
+        "capacidade": _fila.maxsize,
+        **metricas,
+    }
+
+
+@event.listens_for(Session, "after_commit")
+def _enfileira_apos_commit(session: Session) -> None:
+    if linhas := session.info.pop("acoes_pendentes", None):
+        enfileira(linhas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descarta_apos_rollback(session: Session) -> None:
+    session.info.pop("acoes_pendentes", None)
@@ -1,10 +1,11 @@
+from collections.abc import Iterable
 from datetime import datetime
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import insert
 
-from app.core.seguranca import gerar_hash
-from ..models.models import HistoricoAcoes, Usuario
+from ..models.models import HistoricoAcoes
+from .fila_auditoria import adia_acoes, auditoria_assincrona
 
 from enum import Enum
 
@@ -26,17 +27,25 @@ class AcoesEnum(str, Enum):
 def guarda_acao(
     db: Session,
     acao: AcoesEnum,
-    cpf_ator: str,
+    ator: dict,
     id_alvo: int | None = None,
-    info_adicional: dict | None = None,
+    info_adicional: dict | str | None = None,
 ) -> None:
-    query = select(Usuario).where(Usuario.cpf_hash == gerar_hash(cpf_ator))
-    ator = db.scalars(query).first()
+    """
+    Registra uma ação feita pelo usuário autenticado.
+    `ator` é o contexto retornado por get_usuario_atual/requer_permissao.
+    Fora do modo síncrono a ação só é gravada depois do commit, pela fila.
+    """
+    if auditoria_assincrona():
+        guarda_acoes(
+            db, acao, ator, [{"id_alvo": id_alvo, "info_adicional": info_adicional}]
+        )
+        return
 
     try:
         db.add(
             HistoricoAcoes(
-                usuario_id_ator=ator.id,
+                usuario_id_ator=ator["id"],
                 usuario_id_alvo=id_alvo,
                 acao=acao,
                 info=info_adicional,
@@ -45,3 +54,36 @@ def guarda_acao(
         )
     except Exception as e:
         raise HTTPException(400, f"Erro guardando ação: {e}")
+
+
+def guarda_acoes(
+    db: Session,
+    acao: AcoesEnum,
+    ator: dict,
+    registros: Iterable[dict],
+) -> None:
+    """
+    Registra várias ocorrências da mesma ação em um único INSERT.
+    Cada registro pode ter as chaves `id_alvo` e `info_adicional`.
+    """
+    agora = datetime.now()
+    linhas = [
+        {
+            "usuario_id_ator": ator["id"],
+            "usuario_id_alvo": registro.get("id_alvo"),
+            "acao": acao,
+            "info": registro.get("info_adicional"),
+            "data": agora,
+        }
+        for registro in registros
+    ]
+    if not linhas:
+        return
+    if auditoria_assincrona():
+        adia_acoes(db, linhas)
+        return
+
+    try:
+        db.execute(insert(HistoricoAcoes.__table__), linhas)
+    except Exception as e:
+        raise HTTPException(400, f"Erro guardando ações: {e}")
@@ -0,0 +1,504 @@
+import os
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+import polars as pl
+from fastapi import HTTPException, status
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    Table,
+    delete,
+    insert,
+    select,
+)
+from sqlalchemy.orm import Session
+
+from ..models.models import Cliente, ClienteTipo, Compra, Usuario
+from ..schemas.compra import CompraOut
+from ..schemas.informacoes_gerais import InformacoesGeraisDTO
+from .cpfs import MINIMO_CPFS_PARALELO, TAMANHO_LOTE_CPFS
+from .executores import pool_processos
+from .historico_acoes import AcoesEnum, guarda_acoes
+from .resumo_compras import (
+    COLUNAS_CHAVE,
+    TAMANHO_LOTE_IN,
+    acumula_no_resumo,
+    categorias_dos_usuarios,
+)
+from .seguranca import protege_cpfs
+
+# CONFIG
+TAMANHO_LOTE_IMPORTACAO = int(os.environ.get("TAMANHO_LOTE_IMPORTACAO", 10_000))
+
+# Tabela temporária (por conexão) com as chaves do lote sendo importado; fica
+# fora de Base.metadata para não ser criada como tabela comum
+CHAVES_LOTE = Table(
+    "chaves_compra_lote",
+    MetaData(),
+    Column("usuario_id", Integer, nullable=False),
+    Column("horario", DateTime, nullable=False),
+    prefixes=["TEMPORARY"],
+)
+
+COLUNAS_CLIENTE = [
+    "cpf",
+    "nome",
+    "matricula",
+    "tipo",
+    "graduando",
+    "pos_graduando",
+    "bolsista",
+]
+COLUNAS_COMPRA = ["usuario_id", "horario", "local", "forma_pagamento", "preco_compra"]
+
+# Sem isso o polars lê CPFs e matrículas como inteiros e perde zeros à esquerda
+ESQUEMA_CSV_CLIENTE = {"cpf": pl.String, "matricula": pl.String}
+
+MOTIVO_VALOR_INVALIDO = "Valores ausentes ou inválidos"
+MOTIVO_FORA_DO_HORARIO = "Compra realizada fora dos horários de almoço e jantar"
+MOTIVO_CLIENTE_INEXISTENTE = (
+    "O cliente solicitante da compra não está cadastrado no sistema"
+)
+MOTIVO_CPF_DUPLICADO = "Cliente com esse CPF já existe."
+MOTIVO_TIPO_INVALIDO = "Tipo de cliente inválido"
+MOTIVO_COMPRA_DUPLICADA = (
+    "Já existe uma compra para este usuário na mesma data e horário"
+)
+
+# Variações ISO 8601 aceitas por datetime.fromisoformat
+FORMATOS_HORARIO = [
+    "%Y-%m-%dT%H:%M:%S%.f",
+    "%Y-%m-%d %H:%M:%S%.f",
+    "%Y-%m-%dT%H:%M",
+    "%Y-%m-%d %H:%M",
+]
+
+VALORES_VERDADEIROS = ["true", "t", "1", "sim", "s"]
+
+ESQUEMA_REJEITADAS = {"linha": pl.Int64, "motivo": pl.String}
+
+FORMATOS_IMPORTACAO = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".arrow": "ipc",
+    ".ipc": "ipc",
+    ".feather": "ipc",
+}
+ERRO_FORMATO = (
+    "O arquivo deveria ser CSV, Parquet ou Arrow IPC (.arrow, .ipc, .feather)."
+)
+ERRO_COLUNAS = "O arquivo não contém as colunas necessárias."
+
+
+class ErroLeituraArquivo(ValueError):
+    pass
+
+
+@dataclass
+class Validacao:
+    validas: pl.DataFrame
+    rejeitadas: pl.DataFrame
+
+
+def formato_do_arquivo(nome: str) -> str | None:
+    return FORMATOS_IMPORTACAO.get(os.path.splitext(nome)[1].lower())
+
+
+def extensao_importavel(nome: str | None) -> str:
+    """
+    Retorna a extensão do arquivo enviado, em minúsculas,
+    ou responde 400 se o formato não for aceito.
+    """
+    if not nome or formato_do_arquivo(nome) is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=ERRO_FORMATO
+        )
+    return os.path.splitext(nome)[1].lower()
+
+
+def colunas_do_arquivo(caminho: str) -> list[str]:
+    try:
+        match formato_do_arquivo(caminho):
+            case "csv":
+                return pl.read_csv(caminho, n_rows=0).columns
+            case "parquet":
+                return list(pl.read_parquet_schema(caminho))
+            case _:
+                return list(pl.read_ipc_schema(caminho))
+    except Exception as e:
+        raise ErroLeituraArquivo(str(e)) from e
+
+
+def _le_csv_em_lotes(
+    caminho: str, colunas: list[str], esquema: dict | None, pular: int
+) -> Iterator[tuple[int, pl.DataFrame]]:
+    try:
+        leitor = pl.read_csv_batched(
+            caminho,
+            columns=colunas,
+            schema_overrides=esquema,
+            batch_size=TAMANHO_LOTE_IMPORTACAO,
+            skip_rows_after_header=pular,
+        )
+    except Exception as e:
+        raise ErroLeituraArquivo(str(e)) from e
+
+    inicio = pular + 1
+    while True:
+        try:
+            lotes = leitor.next_batches(1)
+        except Exception as e:
+            raise ErroLeituraArquivo(str(e)) from e
+        if not lotes:
+            return
+        yield inicio, lotes[0]
+        inicio += lotes[0].height
+
+
+def _fatia_em_lotes(
+    tabela: pl.DataFrame, deslocamento: int
+) -> Iterator[tuple[int, pl.DataFrame]]:
+    for inicio in range(0, tabela.height, TAMANHO_LOTE_IMPORTACAO):
+        yield deslocamento + inicio + 1, tabela.slice(inicio, TAMANHO_LOTE_IMPORTACAO)
+
+
+def _le_parquet_em_lotes(
+    caminho: str, colunas: list[str], pular: int
+) -> Iterator[tuple[int, pl.DataFrame]]:
+    # Ler fatias menores que um grupo de linhas faz o mesmo grupo ser
+    # descomprimido várias vezes; 2**18 é o tamanho de grupo padrão do polars
+    bloco = max(TAMANHO_LOTE_IMPORTACAO, 2**18)
+    try:
+        varredura = pl.scan_parquet(caminho).select(colunas)
+        total = varredura.select(pl.len()).collect().item()
+        for deslocamento in range(pular, total, bloco):
+            tabela = varredura.slice(deslocamento, bloco).collect()
+            yield from _fatia_em_lotes(tabela, deslocamento)
+    except pl.exceptions.PolarsError as e:
+        raise ErroLeituraArquivo(str(e)) from e
+
+
+def _le_ipc_em_lotes(
+    caminho: str, colunas: list[str], pular: int
+) -> Iterator[tuple[int, pl.DataFrame]]:
+    # Mapeado em memória, o arquivo não é copiado: os lotes são fatias dele
+    try:
+        tabela = pl.read_ipc(caminho, columns=colunas, memory_map=True)
+    except pl.exceptions.PolarsError as e:
+        raise ErroLeituraArquivo(str(e)) from e
+    yield from _fatia_em_lotes(tabela.slice(pular), pular)
+
+
+def le_em_lotes(
+    caminho: str, colunas: list[str], esquema: dict | None = None, pular: int = 0
+) -> Iterator[tuple[int, pl.DataFrame]]:
+    """
+    Lê as `colunas` do arquivo (CSV, Parquet ou Arrow IPC, pela extensão) em
+    lotes de aproximadamente TAMANHO_LOTE_IMPORTACAO linhas, sem carregar o
+    arquivo inteiro. Gera o número da primeira linha de cada lote (contando a
+    partir de 1, sem o cabeçalho) e o lote. `esquema` só se aplica ao CSV;
+    `pular` ignora as primeiras linhas, para retomar uma importação.
+    """
+    match formato_do_arquivo(caminho):
+        case "csv":
+            return _le_csv_em_lotes(caminho, colunas, esquema, pular)
+        case "parquet":
+            return _le_parquet_em_lotes(caminho, colunas, pular)
+        case _:
+            return _le_ipc_em_lotes(caminho, colunas, pular)
+
+
+def _converte_colunas_compra(tabela: pl.DataFrame) -> pl.DataFrame:
+    if tabela.schema["horario"] == pl.String:
+        horario = pl.coalesce(
+            pl.col("horario").str.to_datetime(formato, time_unit="us", strict=False)
+            for formato in FORMATOS_HORARIO
+        )
+    else:
+        horario = pl.col("horario").cast(pl.Datetime("us"), strict=False)
+
+    return tabela.select(
+        "linha",
+        pl.col("usuario_id").cast(pl.Int64, strict=False),
+        horario,
+        pl.col("local").cast(pl.String),
+        pl.col("forma_pagamento").cast(pl.String),
+        pl.col("preco_compra").cast(pl.Int64, strict=False),
+    )
+
+
+def _separa(
+    tabela: pl.DataFrame, rejeitar: pl.Expr, motivo: str, rejeitadas: list
+) -> pl.DataFrame:
+    tabela = tabela.with_columns(rejeitar.alias("_rejeitar"))
+    rejeitadas.append(tabela.filter("_rejeitar").select("linha", motivo=pl.lit(motivo)))
+    return tabela.filter(~pl.col("_rejeitar")).drop("_rejeitar")
+
+
+def _junta_rejeitadas(rejeitadas: list[pl.DataFrame]) -> pl.DataFrame:
+    return pl.concat([pl.DataFrame(schema=ESQUEMA_REJEITADAS), *rejeitadas]).sort(
+        "linha"
+    )
+
+
+def _categorias_clientes(db: Session, ids: pl.Series) -> pl.DataFrame:
+    categorias = categorias_dos_usuarios(db, ids.to_list())
+    return pl.DataFrame(
+        [(id, *categoria) for id, categoria in categorias.items()],
+        schema={
+            "usuario_id": pl.Int64,
+            "tipo_cliente": pl.String,
+            "graduando": pl.Boolean,
+            "pos_graduando": pl.Boolean,
+            "bolsista": pl.Boolean,
+        },
+        orient="row",
+    )
+
+
+def _compras_existentes(db: Session, tabela: pl.DataFrame) -> pl.DataFrame:
+    # Copia as chaves (usuario_id, horario) do lote para uma tabela temporária e
+    # cruza com a chave primária de compra: a consulta cresce com o lote, não
+    # com o período que ele cobre nem com o histórico dos usuários
+    conexao = db.connection()
+    CHAVES_LOTE.create(conexao, checkfirst=True)
+    conexao.execute(delete(CHAVES_LOTE))
+    conexao.execute(
+        insert(CHAVES_LOTE),
+        tabela.select("usuario_id", "horario").to_dicts(),
+    )
+    query = select(Compra.usuario_id, Compra.horario).join(
+        CHAVES_LOTE,
+        (Compra.usuario_id == CHAVES_LOTE.c.usuario_id)
+        & (Compra.horario == CHAVES_LOTE.c.horario),
+    )
+    existentes = conexao.execute(query).all()
+    conexao.execute(delete(CHAVES_LOTE))
+    return pl.DataFrame(
+        existentes,
+        schema={"usuario_id": pl.Int64, "horario": pl.Datetime("us")},
+        orient="row",
+    )
+
+
+def valida_compras(
+    db: Session,
+    tabela: pl.DataFrame,
+    info_gerais: InformacoesGeraisDTO,
+    inicio: int = 1,
+) -> Validacao:
+    """
+    Valida um lote de compras coluna a coluna. Cada linha é rejeitada pelo
+    primeiro motivo que se aplicar, na ordem: valores inválidos, horário fora
+    das refeições, cliente inexistente e compra duplicada (no próprio lote ou
+    no BD). `inicio` é o número da primeira linha do lote, usado nos motivos.
+    """
+    rejeitadas: list[pl.DataFrame] = []
+    tabela = _converte_colunas_compra(
+        tabela.with_row_index("linha", offset=inicio).cast({"linha": pl.Int64})
+    )
+
+    tabela = _separa(
+        tabela,
+        pl.any_horizontal(pl.col(COLUNAS_COMPRA).is_null()),
+        MOTIVO_VALOR_INVALIDO,
+        rejeitadas,
+    )
+
+    hora = pl.col("horario").dt.time()
+    almoco = hora.is_between(info_gerais.inicio_almoco, info_gerais.fim_almoco)
+    jantar = hora.is_between(info_gerais.inicio_jantar, info_gerais.fim_jantar)
+    tabela = _separa(tabela, ~(almoco ^ jantar), MOTIVO_FORA_DO_HORARIO, rejeitadas)
+
+    clientes = _categorias_clientes(db, tabela["usuario_id"].unique())
+    tabela = tabela.join(clientes, on="usuario_id", how="left")
+    tabela = _separa(
+        tabela,
+        pl.col("tipo_cliente").is_null(),
+        MOTIVO_CLIENTE_INEXISTENTE,
+        rejeitadas,
+    )
+
+    duplicada_no_lote = pl.struct("usuario_id", "horario").is_first_distinct().not_()
+    tabela = _separa(tabela, duplicada_no_lote, MOTIVO_COMPRA_DUPLICADA, rejeitadas)
+    if not tabela.is_empty():
+        existentes = _compras_existentes(db, tabela).with_columns(
+            _existente=pl.lit(True)
+        )
+        tabela = tabela.join(existentes, on=["usuario_id", "horario"], how="left")
+        tabela = _separa(
+            tabela,
+            pl.col("_existente").is_not_null(),
+            MOTIVO_COMPRA_DUPLICADA,
+            rejeitadas,
+        ).drop("_existente")
+
+    return Validacao(validas=tabela, rejeitadas=_junta_rejeitadas(rejeitadas))
+
+
+def insere_compras(db: Session, validas: pl.DataFrame) -> None:
+    """
+    Insere em lote compras já validadas por `valida_compras` e acumula os
+    totais no resumo mensal.
+    """
+    if validas.is_empty():
+        return
+
+    db.execute(insert(Compra.__table__), validas.select(COLUNAS_COMPRA).to_dicts())
+
+    agregado = validas.group_by(
+        pl.col("horario").dt.year().alias("ano"),
+        pl.col("horario").dt.month().alias("mes"),
+        "tipo_cliente",
+        "graduando",
+        "pos_graduando",
+        "bolsista",
+    ).agg(
+        quantidade=pl.len(),
+        faturamento=pl.col("preco_compra").sum(),
+    )
+    acumula_no_resumo(
+        db, agregado.select(*COLUNAS_CHAVE, "quantidade", "faturamento").to_dicts()
+    )
+
+
+def registra_compras(db: Session, validas: pl.DataFrame, ator: dict) -> None:
+    """
+    Insere as compras validadas e registra uma ação no histórico para cada uma.
+    """
+    insere_compras(db, validas)
+    guarda_acoes(
+        db,
+        AcoesEnum.CADASTRAR_COMPRA,
+        ator,
+        (
+            {"info_adicional": CompraOut.model_validate(compra).model_dump_json()}
+            for compra in validas.select(COLUNAS_COMPRA).iter_rows(named=True)
+        ),
+    )
+
+
+def protege_cpfs_em_paralelo(cpfs: list[str]) -> list[tuple[str, bytes]]:
+    """
+    Calcula hash e criptografia dos CPFs, dividindo lotes grandes entre
+    o pool de processos.
+    """
+    if len(cpfs) < MINIMO_CPFS_PARALELO:
+        return protege_cpfs(cpfs)
+
+    lotes = [
+        cpfs[inicio : inicio + TAMANHO_LOTE_CPFS]
+        for inicio in range(0, len(cpfs), TAMANHO_LOTE_CPFS)
+    ]
+    return [par for lote in pool_processos().map(protege_cpfs, lotes) for par in lote]
+
+
+def _converte_booleano(coluna: str) -> pl.Expr:
+    return (
+        pl.col(coluna)
+        .cast(pl.String)
+        .str.to_lowercase()
+        .is_in(VALORES_VERDADEIROS)
+        .fill_null(False)
+    )
+
+
+def _hashes_existentes(db: Session, hashes: list[str]) -> pl.DataFrame:
+    existentes = []
+    for inicio in range(0, len(hashes), TAMANHO_LOTE_IN):
+        lote = hashes[inicio : inicio + TAMANHO_LOTE_IN]
+        existentes.extend(
+            db.scalars(select(Usuario.cpf_hash).where(Usuario.cpf_hash.in_(lote)))
+        )
+    return pl.DataFrame(
+        {"cpf_hash": existentes, "_existente": [True] * len(existentes)},
+        schema={"cpf_hash": pl.String, "_existente": pl.Boolean},
+    )
+
+
+def valida_clientes(db: Session, tabela: pl.DataFrame, inicio: int = 1) -> Validacao:
+    """
+    Valida um lote de clientes e prepara hash e criptografia dos CPFs.
+    Rejeita linhas sem CPF, com tipo inválido ou com CPF repetido no próprio
+    lote ou já cadastrado no BD.
+    """
+    rejeitadas: list[pl.DataFrame] = []
+    tabela = tabela.with_row_index("linha", offset=inicio).select(
+        pl.col("linha").cast(pl.Int64),
+        pl.col("cpf").cast(pl.String).str.strip_chars(),
+        pl.col("nome").cast(pl.String),
+        pl.col("matricula").cast(pl.String),
+        pl.col("tipo").cast(pl.String).str.strip_chars().str.to_lowercase(),
+        _converte_booleano("graduando"),
+        _converte_booleano("pos_graduando"),
+        _converte_booleano("bolsista"),
+    )
+
+    tabela = _separa(
+        tabela,
+        pl.col("cpf").is_null() | (pl.col("cpf") == ""),
+        MOTIVO_VALOR_INVALIDO,
+        rejeitadas,
+    )
+    tabela = _separa(
+        tabela,
+        ~pl.col("tipo").is_in([tipo.value for tipo in ClienteTipo]).fill_null(False),
+        MOTIVO_TIPO_INVALIDO,
+        rejeitadas,
+    )
+    tabela = _separa(
+        tabela, ~pl.col("cpf").is_first_distinct(), MOTIVO_CPF_DUPLICADO, rejeitadas
+    )
+
+    protegidos = protege_cpfs_em_paralelo(tabela["cpf"].to_list())
+    tabela = tabela.with_columns(
+        cpf_hash=pl.Series([hash for hash, _ in protegidos], dtype=pl.String),
+        cpf_cript=pl.Series([cript for _, cript in protegidos], dtype=pl.Binary),
+    )
+
+    existentes = _hashes_existentes(db, tabela["cpf_hash"].to_list())
+    tabela = tabela.join(existentes, on="cpf_hash", how="left")
+    tabela = _separa(
+        tabela, pl.col("_existente").is_not_null(), MOTIVO_CPF_DUPLICADO, rejeitadas
+    ).drop("_existente")
+
+    return Validacao(validas=tabela, rejeitadas=_junta_rejeitadas(rejeitadas))
+
+
+def insere_clientes(db: Session, validas: pl.DataFrame) -> list[int]:
+    """
+    Insere em lote clientes já validados por `valida_clientes`
+    e retorna os ids gerados, na ordem das linhas.
+    """
+    if validas.is_empty():
+        return []
+
+    linhas = validas.select(
+        "cpf_hash",
+        "cpf_cript",
+        "nome",
+        "matricula",
+        "tipo",
+        "graduando",
+        "pos_graduando",
+        "bolsista",
+    ).to_dicts()
+    return list(
+        db.scalars(
+            insert(Cliente).returning(Cliente.usuario_id, sort_by_parameter_order=True),
+            linhas,
+        )
+    )
+
+
+def registra_clientes(db: Session, validas: pl.DataFrame, ator: dict) -> list[int]:
+    """
+    Insere os clientes validados, registra uma ação no histórico para cada
+    um e retorna os ids gerados.
+    """
+    ids = insere_clientes(db, validas)
+    guarda_acoes(db, AcoesEnum.CADASTRAR_CLIENTE, ator, ({"id_alvo": id} for id in ids))
+    return ids
@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metricas import consultas_bd, tempo_consultas_bd
+
+logger = logging.getLogger(__name__)
+
+# CONFIG
+# Consultas mais lentas que isso (em ms) vão para o log; vazio desliga
+_sql_lenta_ms = os.environ.get("SQL_LENTA_MS", "200")
+SQL_LENTA_MS = float(_sql_lenta_ms) if _sql_lenta_ms else None
+
+
+@dataclass
+class MedicaoSQL:
+    """
+    Consultas executadas durante uma requisição e o tempo gasto nelas.
+    Cada ida ao banco conta uma vez: um `executemany` conta uma vez por lote.
+    """
+
+    metodo: str
+    caminho: str
+    consultas: int = 0
+    tempo_bd: float = 0.0
+    tempo_total: float = 0.0
+    _inicio: float = field(default_factory=time.perf_counter, repr=False)
+
+    def server_timing(self) -> str:
+        return (
+            f'bd;dur={self.tempo_bd * 1000:.1f};desc="{self.consultas} consultas", '
+            f"total;dur={self.tempo_total * 1000:.1f}"
+        )
+
+
+_medicao_atual: ContextVar[MedicaoSQL | None] = ContextVar("medicao_sql", default=None)
+_coletores: list[list[MedicaoSQL]] = []
+_trava_coletores = threading.Lock()
+
+
+def _parametros_ocultos(parametros, executemany: bool) -> str:
+    # Só os tipos: valores podem ter CPF, senha ou nome
+    if executemany:
+        return f"{len(parametros)} linhas"
+    if isinstance(parametros, dict):
+        return repr({nome: type(valor).__name__ for nome, valor in parametros.items()})
+    return repr([type(valor).__name__ for valor in parametros or ()])
+
+
+def instrumenta_engine(engine: Engine) -> None:
+    """
+    Mede cada consulta do engine: soma na medição da requisição em curso,
+    se houver, e registra no log as mais lentas que SQL_LENTA_MS, com os
+    parâmetros reduzidos aos seus tipos.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conexao, cursor, sql, parametros, contexto, executemany):
+        conexao.info.setdefault("inicios_consulta", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conexao, cursor, sql, parametros, contexto, executemany):
+        duracao = time.perf_counter() - conexao.info["inicios_consulta"].pop()
+        consultas_bd.soma()
+        tempo_consultas_bd.soma(duracao)
+
+        medicao = _medicao_atual.get()
+        if medicao is not None:
+            medicao.consultas += 1
+            medicao.tempo_bd += duracao
+
+        if SQL_LENTA_MS is not None and duracao * 1000 >= SQL_LENTA_MS:
+            logger.warning(
+                "Consulta lenta (%.1f ms): %s | parâmetros: %s",
+                duracao * 1000,
+                " ".join(sql.split()),
+                _parametros_ocultos(parametros, executemany),
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _erro(contexto):
+        # after_cursor_execute não roda quando a consulta falha
+        if contexto.connection is not None and contexto.execution_context is not None:
+            inicios = contexto.connection.info.get("inicios_consulta")
+            if inicios:
+                inicios.pop()
+
+
+class MiddlewareInstrumentacao:
+    """
+    Abre uma MedicaoSQL para cada requisição HTTP e a devolve no cabeçalho
+    Server-Timing. O tempo de respostas em streaming só conta até o início
+    do envio.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicao = MedicaoSQL(scope["method"], scope["path"])
+
+        async def envia(mensagem: Message) -> None:
+            if mensagem["type"] == "http.response.start":
+                medicao.tempo_total = time.perf_counter() - medicao._inicio
+                MutableHeaders(scope=mensagem).append(
+                    "Server-Timing", medicao.server_timing()
+                )
+            await send(mensagem)
+
+        # O threadpool copia o contexto, então as rotas síncronas enxergam
+        # a mesma medição
+        token = _medicao_atual.set(medicao)
+        try:
+            await self.app(scope, receive, envia)
+        finally:
+            _medicao_atual.reset(token)
+            with _trava_coletores:
+                for coletor in _coletores:
+                    coletor.append(medicao)
+
+
+@contextmanager
+def mede_requisicoes() -> Iterator[list[MedicaoSQL]]:
+    """
+    Coleta as medições das requisições terminadas dentro do bloco, em
+    ordem. Útil nos testes para limitar o número de consultas por rota.
+    """
+    medicoes: list[MedicaoSQL] = []
+    with _trava_coletores:
+        _coletores.append(medicoes)
+    try:
+        yield medicoes
+    finally:
+        with _trava_coletores:
+            _coletores.remove(medicoes)
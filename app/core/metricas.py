@@ -0,0 +1,266 @@
+import math
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+
+import polars as pl
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+TIPO_CONTEUDO = "text/plain; version=0.0.4; charset=utf-8"
+
+BALDES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BALDES_ESPERA_POOL = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+# Rótulo das requisições que não casaram com nenhuma rota: usar o caminho
+# criaria uma série nova para cada URL inventada
+ROTA_DESCONHECIDA = "desconhecida"
+
+Rotulos = tuple[str, ...]
+
+_metricas: dict[str, "_Metrica"] = {}
+
+
+def _escapa(valor: str) -> str:
+    return valor.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _formata(valor: float) -> str:
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(
+        self,
+        nome: str,
+        ajuda: str,
+        rotulos: Rotulos = (),
+        coleta: Callable[[], dict[Rotulos, float]] | None = None,
+    ):
+        if nome in _metricas:
+            raise ValueError(f"Métrica já registrada: {nome}")
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.coleta = coleta
+        self._trava = threading.Lock()
+        # Sem rótulos a série existe desde o início, valendo zero
+        self._valores: dict[Rotulos, float] = {} if rotulos else {(): 0}
+        _metricas[nome] = self
+
+    def _chave(self, rotulos: dict[str, str]) -> Rotulos:
+        if set(rotulos) != set(self.rotulos):
+            raise ValueError(f"{self.nome} espera os rótulos {self.rotulos}")
+        return tuple(str(rotulos[nome]) for nome in self.rotulos)
+
+    def _linhas_rotulos(self, valores: Rotulos, extra: str = "") -> str:
+        pares = [
+            f'{nome}="{_escapa(valor)}"' for nome, valor in zip(self.rotulos, valores)
+        ]
+        if extra:
+            pares.append(extra)
+        return "{" + ",".join(pares) + "}" if pares else ""
+
+    def _amostras(self) -> Iterator[str]:
+        if self.coleta is not None:
+            valores = self.coleta()
+        else:
+            with self._trava:
+                valores = dict(self._valores)
+        for rotulos, valor in sorted(valores.items()):
+            yield f"{self.nome}{self._linhas_rotulos(rotulos)} {_formata(valor)}"
+
+    def exporta(self) -> str:
+        cabecalho = f"# HELP {self.nome} {self.ajuda}\n# TYPE {self.nome} {self.tipo}\n"
+        return cabecalho + "".join(linha + "\n" for linha in self._amostras())
+
+
+class Contador(_Metrica):
+    """
+    Total que só cresce. Com `coleta`, os valores são lidos de outro
+    contador do processo a cada exportação.
+    """
+
+    tipo = "counter"
+
+    def soma(self, valor: float = 1, **rotulos: str) -> None:
+        chave = self._chave(rotulos)
+        with self._trava:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+
+class Medidor(_Metrica):
+    """
+    Valor que sobe e desce. Com `coleta`, é lido a cada exportação.
+    """
+
+    tipo = "gauge"
+
+    def soma(self, valor: float = 1, **rotulos: str) -> None:
+        chave = self._chave(rotulos)
+        with self._trava:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def define(self, valor: float, **rotulos: str) -> None:
+        with self._trava:
+            self._valores[self._chave(rotulos)] = valor
+
+
+class Histograma(_Metrica):
+    """
+    Distribuição de durações em baldes cumulativos, com soma e contagem.
+    """
+
+    tipo = "histogram"
+
+    def __init__(
+        self, nome: str, ajuda: str, rotulos: Rotulos = (), baldes=BALDES_LATENCIA
+    ):
+        super().__init__(nome, ajuda, rotulos)
+        self.baldes = tuple(sorted(baldes))
+        self._series: dict[Rotulos, list[float]] = {}
+        if not rotulos:
+            self._series[()] = self._serie_vazia()
+
+    def _serie_vazia(self) -> list[float]:
+        return [0] * (len(self.baldes) + 2)
+
+    def observa(self, valor: float, **rotulos: str) -> None:
+        chave = self._chave(rotulos)
+        with self._trava:
+            # Contagem por balde (não cumulativa), mais a soma no fim
+            serie = self._series.setdefault(chave, self._serie_vazia())
+            for indice, limite in enumerate(self.baldes):
+                if valor <= limite:
+                    serie[indice] += 1
+                    break
+            else:
+                serie[len(self.baldes)] += 1
+            serie[-1] += valor
+
+    def _amostras(self) -> Iterator[str]:
+        with self._trava:
+            series = {chave: list(serie) for chave, serie in self._series.items()}
+        for rotulos, serie in sorted(series.items()):
+            acumulado = 0
+            for limite, quantidade in zip((*self.baldes, math.inf), serie):
+                acumulado += quantidade
+                le = self._linhas_rotulos(rotulos, f'le="{_formata(limite)}"')
+                yield f"{self.nome}_bucket{le} {acumulado}"
+            sufixo = self._linhas_rotulos(rotulos)
+            yield f"{self.nome}_sum{sufixo} {_formata(serie[-1])}"
+            yield f"{self.nome}_count{sufixo} {acumulado}"
+
+
+def exporta_metricas() -> str:
+    """
+    Todas as métricas registradas no formato de texto do Prometheus.
+    """
+    return "".join(metrica.exporta() for metrica in list(_metricas.values()))
+
+
+requisicoes_duracao = Histograma(
+    "ru_requisicoes_duracao_segundos",
+    "Duração das requisições HTTP, até o fim do envio da resposta",
+    ("metodo", "rota", "status"),
+)
+requisicoes_em_andamento = Medidor(
+    "ru_requisicoes_em_andamento", "Requisições HTTP sendo atendidas agora"
+)
+espera_pool = Histograma(
+    "ru_bd_pool_espera_segundos",
+    "Espera por uma conexão livre no pool do banco",
+    baldes=BALDES_ESPERA_POOL,
+)
+consultas_bd = Contador("ru_bd_consultas_total", "Comandos SQL executados")
+tempo_consultas_bd = Contador(
+    "ru_bd_consultas_segundos_total", "Tempo gasto nos comandos SQL executados"
+)
+linhas_importadas = Contador(
+    "ru_importacao_linhas_total",
+    "Linhas lidas dos arquivos importados, aceitas ou rejeitadas",
+    ("tipo",),
+)
+tempo_importacao = Contador(
+    "ru_importacao_segundos_total",
+    "Tempo gasto lendo, validando e gravando os lotes importados",
+    ("tipo",),
+)
+
+
+class _MedeEspera:
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()  # type: ignore[misc]
+        finally:
+            espera_pool.observa(time.perf_counter() - inicio)
+
+
+class QueuePoolMedido(_MedeEspera, QueuePool):
+    """QueuePool que registra em espera_pool quanto cada checkout esperou."""
+
+
+class AsyncAdaptedQueuePoolMedido(_MedeEspera, AsyncAdaptedQueuePool):
+    """Como QueuePoolMedido, para os engines assíncronos."""
+
+
+def mede_importacao(
+    tipo: str, lotes: Iterable[tuple[int, pl.DataFrame]]
+) -> Iterator[tuple[int, pl.DataFrame]]:
+    """
+    Repassa os lotes de `le_em_lotes` somando as linhas e o tempo até o
+    próximo lote (leitura e processamento) nas métricas de importação.
+    """
+    inicio = time.perf_counter()
+    for inicio_lote, lote in lotes:
+        yield inicio_lote, lote
+        linhas_importadas.soma(lote.height, tipo=tipo)
+        agora = time.perf_counter()
+        tempo_importacao.soma(agora - inicio, tipo=tipo)
+        inicio = agora
+
+
+class MiddlewareMetricas:
+    """
+    Mede cada requisição HTTP: duração por método, rota e status e o
+    número de requisições em andamento. A rota é o molde do caminho
+    (`/cliente/{cliente_id}`), não a URL requisitada.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def envia(mensagem: Message) -> None:
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        inicio = time.perf_counter()
+        requisicoes_em_andamento.soma(1)
+        try:
+            await self.app(scope, receive, envia)
+        finally:
+            requisicoes_em_andamento.soma(-1)
+            # O roteador grava a rota encontrada no próprio scope
+            rota = getattr(scope.get("route"), "path", ROTA_DESCONHECIDA)
+            requisicoes_duracao.observa(
+                time.perf_counter() - inicio,
+                metodo=scope["method"],
+                rota=rota,
+                status=str(status),
+            )
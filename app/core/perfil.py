@@ -0,0 +1,153 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+from datetime import datetime
+from uuid import uuid4
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .permissoes import requer_permissao
+from .seguranca import get_usuario_atual
+
+# CONFIG
+DIRETORIO_PERFIS = os.environ.get("DIRETORIO_PERFIS", "perfis")
+# Perfis mais antigos são apagados quando passam deste número
+MAXIMO_PERFIS = int(os.environ.get("MAXIMO_PERFIS", 50))
+
+CABECALHO_PEDIDO = b"x-perfil"
+CABECALHO_ARQUIVO = "X-Perfil-Arquivo"
+EXTENSAO = ".pstats"
+PERFIL_OCUPADO = "Outra requisição já está sendo perfilada; tente de novo."
+
+_NOME_VALIDO = re.compile(r"^[\w.-]+\.pstats$")
+
+# O cProfile usa sys.monitoring, que só aceita um perfilador ativo por vez
+_trava_perfil = threading.Lock()
+_requer_admin = requer_permissao("admin")
+
+
+def _pediu_perfil(scope: Scope) -> bool:
+    for nome, valor in scope["headers"]:
+        if nome == CABECALHO_PEDIDO:
+            return valor.lower() in (b"1", b"true")
+    return False
+
+
+def _autoriza(scope: Scope) -> None:
+    # Mesma checagem das rotas, feita à mão porque aqui não há Depends
+    for nome, valor in scope["headers"]:
+        if nome == b"authorization":
+            esquema, _, token = valor.decode("latin-1").partition(" ")
+            if esquema.lower() == "bearer" and token:
+                _requer_admin(
+                    get_usuario_atual(
+                        HTTPAuthorizationCredentials(scheme=esquema, credentials=token)
+                    )
+                )
+                return
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+
+
+def _nome_arquivo(scope: Scope) -> str:
+    caminho = re.sub(r"[^\w-]+", "_", scope["path"]).strip("_") or "raiz"
+    agora = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return f"{agora}-{scope['method']}-{caminho}-{uuid4().hex[:8]}{EXTENSAO}"
+
+
+def lista_perfis() -> list[str]:
+    """
+    Nomes dos perfis guardados, do mais novo para o mais antigo.
+    """
+    if not os.path.isdir(DIRETORIO_PERFIS):
+        return []
+    nomes = [nome for nome in os.listdir(DIRETORIO_PERFIS) if _NOME_VALIDO.match(nome)]
+    return sorted(
+        nomes,
+        key=lambda nome: os.path.getmtime(os.path.join(DIRETORIO_PERFIS, nome)),
+        reverse=True,
+    )
+
+
+def caminho_perfil(nome: str) -> str | None:
+    """
+    Caminho do perfil `nome`, ou None se ele não existe ou o nome é inválido.
+    """
+    if not _NOME_VALIDO.match(nome):
+        return None
+    caminho = os.path.join(DIRETORIO_PERFIS, nome)
+    return caminho if os.path.isfile(caminho) else None
+
+
+def resumo_perfil(caminho: str, linhas: int) -> str:
+    """
+    As `linhas` funções com maior tempo acumulado, no formato do pstats.
+    """
+    saida = io.StringIO()
+    pstats.Stats(caminho, stream=saida).sort_stats("cumulative").print_stats(linhas)
+    return saida.getvalue()
+
+
+def _grava(perfil: cProfile.Profile, nome: str) -> None:
+    os.makedirs(DIRETORIO_PERFIS, exist_ok=True)
+    perfil.dump_stats(os.path.join(DIRETORIO_PERFIS, nome))
+    for antigo in lista_perfis()[MAXIMO_PERFIS:]:
+        os.remove(os.path.join(DIRETORIO_PERFIS, antigo))
+
+
+class MiddlewarePerfil:
+    """
+    Perfila com o cProfile a requisição que trouxer o cabeçalho
+    `X-Perfil: 1` e o token de um admin. O resultado é gravado em
+    DIRETORIO_PERFIS, no formato do pstats, e o nome do arquivo volta no
+    cabeçalho X-Perfil-Arquivo. Sem o cabeçalho, o custo é só procurá-lo.
+
+    O cProfile mede o processo inteiro, então requisições atendidas ao
+    mesmo tempo também aparecem no perfil.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _pediu_perfil(scope):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            _autoriza(scope)
+        except HTTPException as erro:
+            resposta = JSONResponse({"detail": erro.detail}, erro.status_code)
+            await resposta(scope, receive, send)
+            return
+
+        if not _trava_perfil.acquire(blocking=False):
+            resposta = JSONResponse(
+                {"detail": PERFIL_OCUPADO}, status.HTTP_409_CONFLICT
+            )
+            await resposta(scope, receive, send)
+            return
+
+        nome = _nome_arquivo(scope)
+
+        async def envia(mensagem: Message) -> None:
+            if mensagem["type"] == "http.response.start":
+                MutableHeaders(scope=mensagem).append(CABECALHO_ARQUIVO, nome)
+            await send(mensagem)
+
+        try:
+            perfil = cProfile.Profile()
+            perfil.enable()
+            try:
+                await self.app(scope, receive, envia)
+            finally:
+                perfil.disable()
+            _grava(perfil, nome)
+        finally:
+            _trava_perfil.release()
@@ -0,0 +1,255 @@
+from collections import defaultdict
+from collections.abc import Iterable
+
+from sqlalchemy import (
+    Connection,
+    String,
+    cast,
+    delete,
+    event,
+    exists,
+    extract,
+    false,
+    func,
+    inspect,
+    literal,
+    select,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models.dialetos import insert_com_upsert
+from ..models.models import Cliente, Compra, ResumoMensalCompras
+
+SEM_CATEGORIA = ResumoMensalCompras.SEM_CATEGORIA
+COLUNAS_CHAVE = ("ano", "mes", "tipo_cliente", "graduando", "pos_graduando", "bolsista")
+CAMPOS_CATEGORIA = ("tipo", "graduando", "pos_graduando", "bolsista")
+TAMANHO_LOTE_IN = 5000
+
+
+def _insert_resumo(db: Session | Connection):
+    dialeto = db.dialect if isinstance(db, Connection) else db.get_bind().dialect
+    return insert_com_upsert(dialeto.name, ResumoMensalCompras)
+
+
+def categorias_dos_usuarios(db: Session, ids: Iterable[int]) -> dict[int, tuple]:
+    """
+    Retorna a chave de categoria (tipo, graduando, pos_graduando, bolsista)
+    de cada cliente entre os ids informados, consultando em lotes.
+    """
+    ids = list(set(ids))
+    categorias = {}
+    for inicio in range(0, len(ids), TAMANHO_LOTE_IN):
+        query = select(
+            Cliente.id,
+            Cliente.tipo,
+            Cliente.graduando,
+            Cliente.pos_graduando,
+            Cliente.bolsista,
+        ).where(Cliente.id.in_(ids[inicio : inicio + TAMANHO_LOTE_IN]))
+        for id, tipo, graduando, pos_graduando, bolsista in db.execute(query):
+            categorias[id] = (tipo.value, graduando, pos_graduando, bolsista)
+    return categorias
+
+
+def acumula_no_resumo(db: Session | Connection, linhas: list[dict]) -> None:
+    """
+    Soma linhas agregadas no resumo mensal. Cada linha traz as chaves
+    ano, mes, tipo_cliente, graduando, pos_graduando e bolsista e os valores
+    quantidade e faturamento a acrescentar.
+    """
+    if not linhas:
+        return
+
+    stmt = _insert_resumo(db)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            ResumoMensalCompras.ano,
+            ResumoMensalCompras.mes,
+            ResumoMensalCompras.tipo_cliente,
+            ResumoMensalCompras.graduando,
+            ResumoMensalCompras.pos_graduando,
+            ResumoMensalCompras.bolsista,
+        ],
+        set_={
+            "quantidade": ResumoMensalCompras.quantidade + stmt.excluded.quantidade,
+            "faturamento": ResumoMensalCompras.faturamento + stmt.excluded.faturamento,
+        },
+    )
+    db.execute(stmt, linhas)
+
+
+def registra_compras_no_resumo(db: Session, compras: list[Compra]) -> None:
+    """
+    Atualiza o resumo mensal com compras recém inseridas.
+    """
+    categorias = categorias_dos_usuarios(db, (c.usuario_id for c in compras))
+    sem_categoria = (SEM_CATEGORIA, False, False, False)
+
+    agregados: dict[tuple, list[int]] = defaultdict(lambda: [0, 0])
+    for compra in compras:
+        chave = (compra.horario.year, compra.horario.month) + categorias.get(
+            compra.usuario_id, sem_categoria
+        )
+        agregados[chave][0] += 1
+        agregados[chave][1] += compra.preco_compra
+
+    acumula_no_resumo(
+        db,
+        [
+            dict(zip(COLUNAS_CHAVE, chave), quantidade=quantidade, faturamento=total)
+            for chave, (quantidade, total) in agregados.items()
+        ],
+    )
+
+
+def move_cliente_no_resumo(
+    db: Session | Connection, cliente_id: int, de: tuple, para: tuple
+) -> None:
+    """
+    Passa as compras de um cliente da categoria `de` para `para` no resumo,
+    mês a mês. As categorias são tuplas (tipo, graduando, pos_graduando,
+    bolsista).
+    """
+    ano = extract("year", Compra.horario)
+    mes = extract("month", Compra.horario)
+    meses = db.execute(
+        select(ano, mes, func.count(), func.sum(Compra.preco_compra))
+        .where(Compra.usuario_id == cliente_id)
+        .group_by(ano, mes)
+    ).all()
+
+    linhas = []
+    for ano_compra, mes_compra, quantidade, total in meses:
+        periodo = (int(ano_compra), int(mes_compra))
+        linhas.append(
+            dict(
+                zip(COLUNAS_CHAVE, periodo + de),
+                quantidade=-quantidade,
+                faturamento=-total,
+            )
+        )
+        linhas.append(
+            dict(
+                zip(COLUNAS_CHAVE, periodo + para),
+                quantidade=quantidade,
+                faturamento=total,
+            )
+        )
+    acumula_no_resumo(db, linhas)
+
+
+def _categoria(cliente: Cliente, anterior: bool) -> tuple:
+    estado = inspect(cliente)
+    valores = []
+    for campo in CAMPOS_CATEGORIA:
+        historico = estado.attrs[campo].history
+        if anterior and historico.deleted:
+            valor = historico.deleted[0]
+        else:
+            valor = getattr(cliente, campo)
+        valores.append(valor)
+    tipo = valores[0]
+    return (getattr(tipo, "value", tipo), *map(bool, valores[1:]))
+
+
+@event.listens_for(Session, "after_flush")
+def _acompanha_categoria_dos_clientes(session: Session, contexto) -> None:
+    # O resumo usa a categoria atual do cliente, como a reconstrução: uma
+    # mudança de categoria ou remoção leva as compras dele junto, na mesma
+    # transação. Compras de quem deixou de ser cliente vão para SEM_CATEGORIA.
+    movimentos = []
+    for cliente in session.dirty:
+        if not isinstance(cliente, Cliente):
+            continue
+        de, para = _categoria(cliente, True), _categoria(cliente, False)
+        if de != para:
+            movimentos.append((cliente.id, de, para))
+    for cliente in session.deleted:
+        if isinstance(cliente, Cliente):
+            movimentos.append(
+                (
+                    cliente.id,
+                    _categoria(cliente, True),
+                    (SEM_CATEGORIA, False, False, False),
+                )
+            )
+
+    if movimentos:
+        conexao = session.connection()
+        for cliente_id, de, para in movimentos:
+            move_cliente_no_resumo(conexao, cliente_id, de, para)
+
+
+def reconstroi_resumo_compras(db: Session) -> None:
+    """
+    Descarta o resumo mensal e o recalcula a partir de todas as compras.
+    """
+    ano = extract("year", Compra.horario)
+    mes = extract("month", Compra.horario)
+    tipo = func.coalesce(cast(Cliente.tipo, String), literal(SEM_CATEGORIA))
+    graduando = func.coalesce(Cliente.graduando, false())
+    pos_graduando = func.coalesce(Cliente.pos_graduando, false())
+    bolsista = func.coalesce(Cliente.bolsista, false())
+
+    agregado = (
+        select(
+            ano,
+            mes,
+            tipo,
+            graduando,
+            pos_graduando,
+            bolsista,
+            func.count(),
+            func.sum(Compra.preco_compra),
+        )
+        .select_from(Compra)
+        .outerjoin(Cliente, Compra.usuario_id == Cliente.usuario_id)
+        .group_by(ano, mes, tipo, graduando, pos_graduando, bolsista)
+    )
+
+    db.execute(delete(ResumoMensalCompras))
+    db.execute(
+        _insert_resumo(db).from_select(
+            [
+                ResumoMensalCompras.ano,
+                ResumoMensalCompras.mes,
+                ResumoMensalCompras.tipo_cliente,
+                ResumoMensalCompras.graduando,
+                ResumoMensalCompras.pos_graduando,
+                ResumoMensalCompras.bolsista,
+                ResumoMensalCompras.quantidade,
+                ResumoMensalCompras.faturamento,
+            ],
+            agregado,
+        )
+    )
+
+
+def preenche_resumo_se_vazio(db: Session) -> bool:
+    """
+    Reconstrói o resumo mensal quando ele está vazio e já há compras, como
+    num banco anterior ao resumo. Retorna se reconstruiu. Com vários
+    processos iniciando juntos, só a primeira reconstrução é gravada.
+    """
+    if db.scalar(select(exists().select_from(ResumoMensalCompras))) or not db.scalar(
+        select(exists().select_from(Compra))
+    ):
+        return False
+    try:
+        reconstroi_resumo_compras(db)
+        db.commit()
+    except IntegrityError:
+        # Outro processo preencheu o resumo ao mesmo tempo
+        db.rollback()
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    from ..models.db_setup import engine
+
+    with Session(engine) as db:
+        reconstroi_resumo_compras(db)
+        db.commit()
+    print("Resumo mensal de compras reconstruído.")
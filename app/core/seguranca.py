@@ -3,6 +3,8 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt  # type: ignore
 from datetime import datetime, timezone, timedelta
 import hashlib
+import hmac
+import os
 from cryptography.fernet import Fernet
 
 security = HTTPBearer()
@@ -10,13 +12,48 @@ fernet = Fernet("7kT3Kk1-CFNKWgW6tp22bxlSo0qGwc8ZRjWiOUPR2JU=")
 
 # Sessão de gerar hash de senhas - Início
 
+# CONFIG
+# "sha256" (padrão) ou "pbkdf2"; só afeta senhas novas ou alteradas
+KDF_SENHAS = os.environ.get("KDF_SENHAS", "sha256")
+ITERACOES_PBKDF2 = int(os.environ.get("ITERACOES_PBKDF2", 600_000))
+
+PREFIXO_PBKDF2 = "pbkdf2_sha256"
+
 
 def gerar_hash(str_decodificada: str):
     return hashlib.sha256(str_decodificada.encode("utf-8")).hexdigest()
 
 
+def _pbkdf2(senha_str: str, sal: bytes, iteracoes: int) -> str:
+    return hashlib.pbkdf2_hmac("sha256", senha_str.encode(), sal, iteracoes).hex()
+
+
+def gerar_hash_senha(senha_str: str) -> str:
+    """
+    Hash de senha com o KDF de KDF_SENHAS. O pbkdf2 guarda iterações e sal
+    junto do hash (`pbkdf2_sha256$iteracoes$sal$hash`), então mudar
+    ITERACOES_PBKDF2 não invalida as senhas já gravadas.
+    """
+    if KDF_SENHAS != "pbkdf2":
+        return gerar_hash(senha_str)
+    sal = os.urandom(16)
+    return (
+        f"{PREFIXO_PBKDF2}${ITERACOES_PBKDF2}${sal.hex()}"
+        f"${_pbkdf2(senha_str, sal, ITERACOES_PBKDF2)}"
+    )
+
+
 def verificar_hash(senha_str: str, hash_str: str):
-    return hashlib.sha256(senha_str.encode()).hexdigest() == hash_str
+    try:
+        if hash_str.startswith(PREFIXO_PBKDF2 + "$"):
+            _, iteracoes, sal, esperado = hash_str.split("$")
+            calculado = _pbkdf2(senha_str, bytes.fromhex(sal), int(iteracoes))
+        else:
+            calculado, esperado = gerar_hash(senha_str), hash_str
+        return hmac.compare_digest(calculado, esperado)
+    except (ValueError, TypeError):
+        # Hash gravado malformado: conta como senha errada
+        return False
 
 
 # Sessão de gerar hash de senhas - Fim
@@ -80,4 +117,20 @@ def descriptografa_cpf(cpf_criptografado: bytes):
     return fernet.decrypt(cpf_criptografado).decode()
 
 
+def protege_cpfs(cpfs: list[str]) -> list[tuple[str, bytes]]:
+    """
+    Gera o hash e a versão criptografada de cada CPF do lote.
+    Fica no nível do módulo para poder ser executada em outro processo.
+    """
+    return [(gerar_hash(cpf), criptografa_cpf(cpf)) for cpf in cpfs]
+
+
+def descriptografa_lote(cpfs_criptografados: list[bytes]) -> list[str]:
+    """
+    Descriptografa um lote de CPFs.
+    Fica no nível do módulo para poder ser executada em outro processo.
+    """
+    return [descriptografa_cpf(cpf) for cpf in cpfs_criptografados]
+
+
 # Sessão de criptografia de CPF - Fim
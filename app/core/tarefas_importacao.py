@@ -0,0 +1,323 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import BinaryIO
+from uuid import uuid4
+
+import polars as pl
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..models.db_setup import engine
+from ..models.models import RejeicaoImportacao, StatusTarefa, TarefaImportacao
+from ..routers.informacoes_gerais import read_info
+from ..utils.arquivos import copia_em_blocos
+from .importacao import (
+    COLUNAS_CLIENTE,
+    COLUNAS_COMPRA,
+    ESQUEMA_CSV_CLIENTE,
+    Validacao,
+    ERRO_COLUNAS,
+    colunas_do_arquivo,
+    le_em_lotes,
+    registra_clientes,
+    registra_compras,
+    valida_clientes,
+    valida_compras,
+)
+from .metricas import mede_importacao
+
+# CONFIG
+DIRETORIO_IMPORTACOES = os.environ.get("DIRETORIO_IMPORTACOES", "importacoes")
+TRABALHADORES_IMPORTACAO = int(os.environ.get("TRABALHADORES_IMPORTACAO", 1))
+# Sem progresso por este tempo, outro processo pode assumir a tarefa
+PRAZO_TAREFA_SEGUNDOS = float(os.environ.get("PRAZO_TAREFA_SEGUNDOS", 300))
+
+TIPO_COMPRAS = "compras"
+TIPO_CLIENTES = "clientes"
+
+STATUS_FINAIS = (StatusTarefa.concluida, StatusTarefa.falhou, StatusTarefa.cancelada)
+
+EM_SEGUNDO_PLANO_DESCRICAO = (
+    "Importa em segundo plano e responde na hora com o id da tarefa, "
+    "acompanhada em /importacoes/{tarefa_id}"
+)
+
+logger = logging.getLogger(__name__)
+
+_encerrando = threading.Event()
+_trava = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _trava:
+        if _executor is None:
+            _encerrando.clear()
+            _executor = ThreadPoolExecutor(
+                max_workers=TRABALHADORES_IMPORTACAO, thread_name_prefix="importacao"
+            )
+        return _executor
+
+
+def cria_tarefa(
+    db: Session, tipo: str, origem: BinaryIO, extensao: str, ator: dict
+) -> int:
+    """
+    Copia o arquivo enviado para DIRETORIO_IMPORTACOES, registra a tarefa
+    como pendente e a agenda. Commita a sessão para que o trabalhador e as
+    consultas de status já enxerguem a tarefa.
+    """
+    os.makedirs(DIRETORIO_IMPORTACOES, exist_ok=True)
+    caminho = os.path.join(DIRETORIO_IMPORTACOES, f"{uuid4().hex}{extensao}")
+    copia_em_blocos(origem, caminho)
+
+    agora = datetime.now()
+    tarefa = TarefaImportacao(
+        tipo=tipo,
+        status=StatusTarefa.pendente,
+        arquivo=caminho,
+        usuario_id_ator=ator["id"],
+        criada_em=agora,
+        atualizada_em=agora,
+    )
+    db.add(tarefa)
+    db.commit()
+
+    agenda_tarefa(tarefa.id)
+    return tarefa.id
+
+
+def agenda_tarefa(tarefa_id: int) -> None:
+    _pool().submit(processa_tarefa, tarefa_id)
+
+
+def _colunas(tipo: str) -> list[str]:
+    return COLUNAS_CLIENTE if tipo == TIPO_CLIENTES else COLUNAS_COMPRA
+
+
+def _esquema(tipo: str) -> dict | None:
+    return ESQUEMA_CSV_CLIENTE if tipo == TIPO_CLIENTES else None
+
+
+def _importa_lote(
+    db: Session, tipo: str, lote: pl.DataFrame, inicio: int, ator: dict
+) -> Validacao:
+    if tipo == TIPO_CLIENTES:
+        validacao = valida_clientes(db, lote, inicio)
+        registra_clientes(db, validacao.validas, ator)
+    else:
+        validacao = valida_compras(db, lote, read_info(db), inicio)
+        registra_compras(db, validacao.validas, ator)
+    return validacao
+
+
+def _atualiza_se_dono(
+    db: Session, tarefa_id: int, dono: str, valores: dict, *condicoes
+) -> bool:
+    """
+    Grava `valores` na tarefa só se ela ainda pertence a `dono` e atende às
+    `condicoes`, renovando o batimento. Retorna se a linha foi alterada.
+    """
+    resultado = db.execute(
+        update(TarefaImportacao)
+        .where(
+            TarefaImportacao.id == tarefa_id,
+            TarefaImportacao.dono == dono,
+            TarefaImportacao.status == StatusTarefa.processando,
+            *condicoes,
+        )
+        .values({"atualizada_em": datetime.now(), **valores})
+        .execution_options(synchronize_session=False)
+    )
+    return resultado.rowcount == 1
+
+
+def _finaliza(
+    tarefa_id: int,
+    arquivo: str,
+    dono: str,
+    status: StatusTarefa,
+    erro: str | None = None,
+    **valores,
+) -> None:
+    with Session(engine) as db:
+        finalizou = _atualiza_se_dono(
+            db,
+            tarefa_id,
+            dono,
+            {"status": status, "erro": erro, "dono": None, **valores},
+        )
+        db.commit()
+    if finalizou and os.path.exists(arquivo):
+        os.remove(arquivo)
+
+
+def tarefa_livre(agora: datetime):
+    """
+    Condição das tarefas que nenhum processo está tocando: pendentes ou
+    processando sem batimento há mais de PRAZO_TAREFA_SEGUNDOS.
+    """
+    return or_(
+        TarefaImportacao.status == StatusTarefa.pendente,
+        and_(
+            TarefaImportacao.status == StatusTarefa.processando,
+            TarefaImportacao.atualizada_em
+            < agora - timedelta(seconds=PRAZO_TAREFA_SEGUNDOS),
+        ),
+    )
+
+
+def _reivindica(tarefa_id: int, dono: str) -> bool:
+    """
+    Marca a tarefa como processando por `dono` numa única instrução, se ela
+    está pendente ou se o dono anterior parou de dar sinal há mais de
+    PRAZO_TAREFA_SEGUNDOS, e não teve cancelamento pedido. Só um processo
+    consegue reivindicar cada tarefa.
+    """
+    agora = datetime.now()
+    with Session(engine) as db:
+        resultado = db.execute(
+            update(TarefaImportacao)
+            .where(
+                TarefaImportacao.id == tarefa_id,
+                TarefaImportacao.cancelamento_solicitado.is_(False),
+                tarefa_livre(agora),
+            )
+            .values(status=StatusTarefa.processando, dono=dono, atualizada_em=agora)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    return resultado.rowcount == 1
+
+
+def _processa(tarefa_id: int, dono: str) -> None:
+    if not _reivindica(tarefa_id, dono):
+        return
+
+    with Session(engine) as db:
+        tarefa = db.get_one(TarefaImportacao, tarefa_id)
+        tipo, arquivo, ja_processadas = (
+            tarefa.tipo,
+            tarefa.arquivo,
+            tarefa.linhas_processadas,
+        )
+        inseridas, rejeitadas = tarefa.linhas_inseridas, tarefa.linhas_rejeitadas
+        ator = {"id": tarefa.usuario_id_ator}
+
+    if not set(_colunas(tipo)).issubset(colunas_do_arquivo(arquivo)):
+        _finaliza(tarefa_id, arquivo, dono, StatusTarefa.falhou, ERRO_COLUNAS)
+        return
+
+    processadas = ja_processadas
+    lotes = mede_importacao(
+        tipo, le_em_lotes(arquivo, _colunas(tipo), _esquema(tipo), ja_processadas)
+    )
+    for inicio, lote in lotes:
+        if _encerrando.is_set():
+            # Devolve a tarefa para ser retomada deste lote na próxima
+            # inicialização, sem esperar o prazo
+            with Session(engine) as db:
+                _atualiza_se_dono(
+                    db, tarefa_id, dono, {"status": StatusTarefa.pendente, "dono": None}
+                )
+                db.commit()
+            return
+
+        with Session(engine) as db:
+            # Renova o batimento antes de importar: se a tarefa foi cancelada
+            # ou assumida por outro processo, nada deste lote é gravado
+            if not _atualiza_se_dono(
+                db,
+                tarefa_id,
+                dono,
+                {},
+                TarefaImportacao.cancelamento_solicitado.is_(False),
+            ):
+                db.rollback()
+                _finaliza(tarefa_id, arquivo, dono, StatusTarefa.cancelada)
+                return
+
+            validacao = _importa_lote(db, tipo, lote, inicio, ator)
+            if not validacao.rejeitadas.is_empty():
+                db.execute(
+                    insert(RejeicaoImportacao.__table__),
+                    validacao.rejeitadas.with_columns(
+                        tarefa_id=pl.lit(tarefa_id)
+                    ).to_dicts(),
+                )
+
+            processadas = inicio - 1 + lote.height
+            inseridas += validacao.validas.height
+            rejeitadas += validacao.rejeitadas.height
+            _atualiza_se_dono(
+                db,
+                tarefa_id,
+                dono,
+                {
+                    "linhas_processadas": processadas,
+                    "linhas_inseridas": inseridas,
+                    "linhas_rejeitadas": rejeitadas,
+                },
+            )
+            db.commit()
+
+    _finaliza(
+        tarefa_id,
+        arquivo,
+        dono,
+        StatusTarefa.concluida,
+        linhas_total=processadas,
+    )
+
+
+def processa_tarefa(tarefa_id: int) -> None:
+    """
+    Reivindica a tarefa, lê o arquivo em lotes de TAMANHO_LOTE_IMPORTACAO
+    linhas e importa cada um na sua própria transação, junto com o progresso
+    e as rejeições. Cada lote confere antes se a tarefa ainda é deste
+    trabalhador e não foi cancelada.
+    """
+    dono = f"{os.getpid()}-{uuid4().hex[:12]}"
+    try:
+        _processa(tarefa_id, dono)
+    except Exception as e:
+        logger.exception("Falha na tarefa de importação %d", tarefa_id)
+        with Session(engine) as db:
+            arquivo = db.scalar(
+                select(TarefaImportacao.arquivo).where(TarefaImportacao.id == tarefa_id)
+            )
+        if arquivo is not None:
+            _finaliza(tarefa_id, arquivo, dono, StatusTarefa.falhou, str(e))
+
+
+def retoma_tarefas() -> None:
+    """
+    Agenda as tarefas pendentes e as interrompidas cujo dono parou de dar
+    sinal. Com vários processos, todos podem agendar a mesma tarefa: só o
+    que conseguir reivindicá-la a processa.
+    """
+    with Session(engine) as db:
+        ids = db.scalars(
+            select(TarefaImportacao.id)
+            .where(tarefa_livre(datetime.now()))
+            .order_by(TarefaImportacao.id)
+        ).all()
+    for tarefa_id in ids:
+        agenda_tarefa(tarefa_id)
+
+
+def encerra_tarefas() -> None:
+    """
+    Espera o lote atual de cada tarefa terminar; a tarefa volta a ficar
+    pendente e o restante é retomado por `retoma_tarefas`.
+    """
+    global _executor
+    _encerrando.set()
+    with _trava:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(cancel_futures=True)
@@ -1,6 +1,17 @@
 from fastapi import FastAPI
 
-from app.core.seguranca import criptografa_cpf, gerar_hash
+from app.core.executores import encerra_pools
+from app.core.instrumentacao import MiddlewareInstrumentacao
+from app.core.metricas import MiddlewareMetricas
+from app.core.perfil import MiddlewarePerfil
+from app.core.fila_auditoria import (
+    auditoria_assincrona,
+    encerra_fila_auditoria,
+    inicia_fila_auditoria,
+)
+from app.core.seguranca import criptografa_cpf, gerar_hash, gerar_hash_senha
+from app.core.resumo_compras import preenche_resumo_se_vazio
+from app.core.tarefas_importacao import encerra_tarefas, retoma_tarefas
 from .routers.funcionario import funcionarios_router
 from .routers.auth import auth_router
 from .routers.compra import compra_router
@@ -11,7 +22,10 @@ from .routers.informacoes_gerais import informacoes_gerais_router
 
 from .routers.cliente import cliente_router
 from .routers.historico_acoes import acoes_router
-from .models.db_setup import engine
+from .routers.importacao import importacao_router
+from .routers.metricas import metricas_router
+from .routers.perfis import perfis_router
+from .models.db_setup import encerra_engine_assincrono, engine
 from .models.models import Funcionario, InformacoesGerais
 
 from contextlib import asynccontextmanager
@@ -22,7 +36,7 @@ from datetime import date, time
 @asynccontextmanager
 async def setUp(app: FastAPI):
     db = Session(engine)
-    senha = gerar_hash("John123!")
+    senha = gerar_hash_senha("John123!")
     cpf_hash = gerar_hash("19896507406")
     cpf_cript = criptografa_cpf("19896507406")
     admin_data = {
@@ -56,12 +70,28 @@ async def setUp(app: FastAPI):
         db.add(InformacoesGerais(**info_gerais_data))
         db.commit()
 
+    # Bancos anteriores ao resumo mensal o recebem vazio
+    preenche_resumo_se_vazio(db)
+
+    if auditoria_assincrona():
+        inicia_fila_auditoria()
+    retoma_tarefas()
+
     yield
 
+    encerra_tarefas()
+    encerra_fila_auditoria()
+    encerra_pools()
+    await encerra_engine_assincrono()
+
 
 # Só por enquanto
 app = FastAPI(lifespan=setUp)
 
+# Mais interno que o CORS: as respostas de erro do perfil também levam os
+# cabeçalhos de CORS
+app.add_middleware(MiddlewarePerfil)
+
 # =====================================
 # Liberando acesso da api
 origins = ["*"]
@@ -73,12 +103,18 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MiddlewareMetricas)
 # =====================================
 
+app.add_middleware(MiddlewareInstrumentacao)
+
 app.include_router(auth_router)
 app.include_router(acoes_router)
 app.include_router(cliente_router)
 app.include_router(compra_router)
 app.include_router(funcionarios_router)
+app.include_router(importacao_router)
 app.include_router(informacoes_gerais_router)
+app.include_router(metricas_router)
+app.include_router(perfis_router)
 app.include_router(relatorio_router)
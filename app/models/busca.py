@@ -0,0 +1,202 @@
+import logging
+
+from sqlalchemy import (
+    Column,
+    ColumnElement,
+    Engine,
+    Float,
+    Integer,
+    MetaData,
+    Select,
+    String,
+    Table,
+    inspect,
+    literal_column,
+    select,
+    text,
+    union_all,
+)
+
+from .models import Usuario
+
+logger = logging.getLogger(__name__)
+
+# O tokenizador trigram do FTS5 só usa o índice com pelo menos 3 caracteres
+MINIMO_CARACTERES_INDICE = 3
+
+# Fora do Base.metadata: só existem no SQLite e são criadas por
+# cria_indices_busca
+_metadata = MetaData()
+
+busca_cliente = Table(
+    "busca_cliente",
+    _metadata,
+    Column("rowid", Integer),
+    Column("nome", String),
+    Column("matricula", String),
+    Column("rank", Float),
+)
+
+# Valores distintos de compra.local, que são poucos: a busca varre esta
+# tabela em vez da de compras
+locais_compra = Table(
+    "locais_compra",
+    _metadata,
+    Column("local", String, primary_key=True),
+)
+
+_TABELAS_SQLITE = {
+    "busca_cliente": (
+        """
+        CREATE VIRTUAL TABLE busca_cliente
+        USING fts5(nome, matricula, tokenize='trigram')
+        """,
+        """
+        INSERT INTO busca_cliente (rowid, nome, matricula)
+        SELECT usuario.id, usuario.nome, cliente.matricula
+        FROM cliente JOIN usuario ON usuario.id = cliente.usuario_id
+        """,
+    ),
+    "locais_compra": (
+        "CREATE TABLE locais_compra (local VARCHAR PRIMARY KEY) WITHOUT ROWID",
+        "INSERT INTO locais_compra (local) SELECT DISTINCT local FROM compra",
+    ),
+}
+
+_TRIGGERS_SQLITE = [
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_cliente_insere AFTER INSERT ON cliente
+    BEGIN
+        INSERT INTO busca_cliente (rowid, nome, matricula)
+        SELECT new.usuario_id, nome, new.matricula FROM usuario
+        WHERE id = new.usuario_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_cliente_matricula
+    AFTER UPDATE OF matricula ON cliente
+    BEGIN
+        UPDATE busca_cliente SET matricula = new.matricula
+        WHERE rowid = new.usuario_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_cliente_nome AFTER UPDATE OF nome ON usuario
+    BEGIN
+        UPDATE busca_cliente SET nome = new.nome WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_cliente_remove AFTER DELETE ON cliente
+    BEGIN
+        DELETE FROM busca_cliente WHERE rowid = old.usuario_id;
+    END
+    """,
+    # Locais que deixam de ser usados ficam na tabela: só não casam com nada
+    """
+    CREATE TRIGGER IF NOT EXISTS locais_compra_insere AFTER INSERT ON compra
+    BEGIN
+        INSERT OR IGNORE INTO locais_compra (local) VALUES (new.local);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS locais_compra_atualiza AFTER UPDATE OF local ON compra
+    BEGIN
+        INSERT OR IGNORE INTO locais_compra (local) VALUES (new.local);
+    END
+    """,
+]
+
+_COLUNAS_TRIGRAMA_POSTGRES = {
+    "usuario": "nome",
+    "cliente": "matricula",
+    "compra": "local",
+}
+
+
+def cria_indices_busca(engine: Engine) -> None:
+    """
+    Cria os índices de busca textual do dialeto: no SQLite, uma tabela FTS5
+    com o tokenizador trigram para os clientes e a tabela de locais de
+    compra, mantidas por triggers; no PostgreSQL, índices GIN trigram
+    (pg_trgm), que atendem o ILIKE direto. Tabelas criadas agora são
+    preenchidas com os dados já existentes.
+    """
+    match engine.dialect.name:
+        case "sqlite":
+            _cria_tabelas_sqlite(engine)
+        case "postgresql":
+            _cria_trigramas_postgres(engine)
+
+
+def _cria_tabelas_sqlite(engine: Engine) -> None:
+    with engine.begin() as conexao:
+        existentes = set(inspect(conexao).get_table_names())
+        for tabela, comandos in _TABELAS_SQLITE.items():
+            if tabela not in existentes:
+                for comando in comandos:
+                    conexao.execute(text(comando))
+        for trigger in _TRIGGERS_SQLITE:
+            conexao.execute(text(trigger))
+
+
+def _cria_trigramas_postgres(engine: Engine) -> None:
+    try:
+        with engine.begin() as conexao:
+            conexao.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for tabela, coluna in _COLUNAS_TRIGRAMA_POSTGRES.items():
+                conexao.execute(
+                    text(
+                        f"CREATE INDEX IF NOT EXISTS ix_{tabela}_{coluna}_trgm "
+                        f"ON {tabela} USING gin ({coluna} gin_trgm_ops)"
+                    )
+                )
+    except Exception as erro:
+        # Sem a extensão (ou sem permissão para criá-la) a busca continua
+        # funcionando com ILIKE, só que sem índice
+        logger.warning("Índices trigram não criados: %s", erro)
+
+
+def usa_indice_busca(dialeto: str, termo: str) -> bool:
+    """
+    Indica se a busca por `termo` deve usar as tabelas de busca do SQLite.
+    Nos demais casos (outros bancos ou termos curtos) as rotas usam ILIKE.
+    """
+    return dialeto == "sqlite" and len(termo) >= MINIMO_CARACTERES_INDICE
+
+
+def casa_clientes(termo: str, colunas: tuple[str, ...] = ()) -> ColumnElement[bool]:
+    """
+    Condição sobre busca_cliente: nome ou matrícula (ou só as `colunas`
+    dadas) contém `termo`. A relevância BM25 de cada linha encontrada fica
+    em `busca_cliente.c.rank` (menor é melhor).
+    """
+    # Entre aspas o termo é uma frase: casa como trecho, sem a sintaxe do FTS5
+    filtro = '"' + termo.replace('"', '""') + '"'
+    if colunas:
+        filtro = "{" + " ".join(colunas) + "} : " + filtro
+    return literal_column(busca_cliente.name).op("MATCH")(filtro)
+
+
+def ids_clientes(
+    termo: str, colunas: tuple[str, ...] = (), cpf_hash: str | None = None
+) -> Select:
+    """
+    Ids dos clientes encontrados por `casa_clientes` e, com `cpf_hash`, também
+    o do cliente com esse CPF.
+    """
+    encontrados = select(busca_cliente.c.rowid).where(casa_clientes(termo, colunas))
+    if cpf_hash is None:
+        return encontrados
+    return union_all(
+        encontrados, select(Usuario.id).where(Usuario.cpf_hash == cpf_hash)
+    )
+
+
+def locais_com(termo: str) -> Select:
+    """
+    Locais de compra que contêm `termo`, sem diferenciar maiúsculas.
+    """
+    return select(locais_compra.c.local).where(
+        locais_compra.c.local.ilike(f"%{termo}%")
+    )
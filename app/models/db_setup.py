@@ -1,12 +1,125 @@
-from typing import Annotated
+import os
+from collections.abc import Callable
+from typing import Annotated, TypeVar
 from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event, inspect, make_url, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
 
+from ..core.instrumentacao import instrumenta_engine
+from ..core.metricas import AsyncAdaptedQueuePoolMedido, QueuePoolMedido
+from .busca import cria_indices_busca
 from .models import Base
 
-engine = create_engine("sqlite:///odio.db", connect_args={"check_same_thread": False})
+# CONFIG
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///odio.db")
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+# Rotas assíncronas usam AsyncSession (aiosqlite/psycopg) em vez do threadpool
+DB_ASSINCRONO = os.environ.get("DB_ASSINCRONO", "false").lower() == "true"
+DATABASE_URL_ASSINCRONA = os.environ.get("DATABASE_URL_ASSINCRONA")
+# Deixe uma variável vazia para manter o padrão do SQLite naquele pragma
+PRAGMAS_SQLITE = {
+    nome: valor
+    for nome, valor in {
+        "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "cache_size": os.environ.get("SQLITE_CACHE_SIZE", "-64000"),
+        "mmap_size": os.environ.get("SQLITE_MMAP_SIZE", "268435456"),
+        "temp_store": os.environ.get("SQLITE_TEMP_STORE", "MEMORY"),
+        "busy_timeout": os.environ.get("SQLITE_BUSY_TIMEOUT", "5000"),
+    }.items()
+    if valor
+}
+
+
+def opcoes_engine(url: str, assincrono: bool = False) -> dict:
+    """
+    Parâmetros do create_engine para a URL informada.
+    SQLite em memória não usa pool de conexões.
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        opcoes: dict = {"connect_args": {"check_same_thread": False}}
+        if url.database in (None, "", ":memory:"):
+            return opcoes
+    else:
+        opcoes = {}
+
+    return {
+        **opcoes,
+        # Mesmo pool padrão, medindo a espera por conexão
+        "poolclass": AsyncAdaptedQueuePoolMedido if assincrono else QueuePoolMedido,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def aplica_pragmas_sqlite(engine: Engine, pragmas: dict[str, str]) -> None:
+    """
+    Executa os pragmas em toda conexão nova do engine.
+    """
+
+    @event.listens_for(engine, "connect")
+    def _aplica(conexao_dbapi, registro):
+        cursor = conexao_dbapi.cursor()
+        for nome, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nome}={valor}")
+        cursor.close()
+
+
+DRIVERS_ASSINCRONOS = {"sqlite": "aiosqlite", "postgresql": "psycopg"}
+
+T = TypeVar("T")
+
+
+def url_assincrona(url: str) -> str:
+    """
+    Troca o driver da URL pelo equivalente assíncrono do mesmo banco.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    return url.set(
+        drivername=f"{backend}+{DRIVERS_ASSINCRONOS[backend]}"
+    ).render_as_string(hide_password=False)
+
+
+engine = create_engine(DATABASE_URL, **opcoes_engine(DATABASE_URL))
+instrumenta_engine(engine)
+if engine.dialect.name == "sqlite":
+    aplica_pragmas_sqlite(engine, PRAGMAS_SQLITE)
+
+_engine_assincrono: AsyncEngine | None = None
+
+
+def engine_assincrono() -> AsyncEngine:
+    """
+    Retorna o engine assíncrono, criando-o no primeiro uso.
+    """
+    global _engine_assincrono
+    if _engine_assincrono is None:
+        url = DATABASE_URL_ASSINCRONA or url_assincrona(DATABASE_URL)
+        _engine_assincrono = create_async_engine(
+            url, **opcoes_engine(url, assincrono=True)
+        )
+        instrumenta_engine(_engine_assincrono.sync_engine)
+        if _engine_assincrono.dialect.name == "sqlite":
+            aplica_pragmas_sqlite(_engine_assincrono.sync_engine, PRAGMAS_SQLITE)
+    return _engine_assincrono
+
+
+async def encerra_engine_assincrono() -> None:
+    global _engine_assincrono
+    if _engine_assincrono is not None:
+        await _engine_assincrono.dispose()
+        _engine_assincrono = None
 
 
 def get_bd():
@@ -25,6 +138,111 @@ def get_bd():
         bd.close()
 
 
+def cria_indices_faltantes():
+    """
+    Cria índices declarados nos modelos que ainda não existem no BD,
+    já que o create_all não altera tabelas já existentes.
+    """
+    for tabela in Base.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(engine, checkfirst=True)
+
+
+def cria_colunas_faltantes():
+    """
+    Adiciona às tabelas já existentes as colunas anuláveis declaradas nos
+    modelos depois que elas foram criadas.
+    """
+    inspetor = inspect(engine)
+    with engine.begin() as conexao:
+        for tabela in Base.metadata.sorted_tables:
+            existentes = {
+                coluna["name"] for coluna in inspetor.get_columns(tabela.name)
+            }
+            for coluna in tabela.columns:
+                if coluna.name in existentes or not coluna.nullable:
+                    continue
+                definicao = CreateColumn(coluna).compile(dialect=engine.dialect)
+                conexao.execute(
+                    text(f"ALTER TABLE {tabela.name} ADD COLUMN {definicao}")
+                )
+
+
+def alarga_colunas_curtas():
+    """
+    Aumenta as colunas de texto que, num BD já existente, são mais curtas do
+    que o declarado nos modelos (ex.: funcionario.senha, que passou de 50 para
+    255 caracteres com os hashes PBKDF2). O SQLite não impõe o tamanho do
+    VARCHAR, então só o PostgreSQL precisa do ALTER.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    inspetor = inspect(engine)
+    with engine.begin() as conexao:
+        for tabela in Base.metadata.sorted_tables:
+            existentes = {
+                coluna["name"]: coluna["type"]
+                for coluna in inspetor.get_columns(tabela.name)
+            }
+            for coluna in tabela.columns:
+                tamanho = getattr(coluna.type, "length", None)
+                atual = getattr(existentes.get(coluna.name), "length", None)
+                if tamanho is None or atual is None or atual >= tamanho:
+                    continue
+                tipo = coluna.type.compile(dialect=engine.dialect)
+                conexao.execute(
+                    text(
+                        f"ALTER TABLE {tabela.name} "
+                        f"ALTER COLUMN {coluna.name} TYPE {tipo}"
+                    )
+                )
+
+
 Base.metadata.create_all(engine)
+cria_colunas_faltantes()
+alarga_colunas_curtas()
+cria_indices_faltantes()
+cria_indices_busca(engine)
+
+
+async def get_bd_assincrono():
+    """
+    Como get_bd, mas para rotas assíncronas: entrega uma AsyncSession se
+    DB_ASSINCRONO estiver ligado, senão uma Session cujo commit roda no
+    threadpool. Use com executa_no_bd.
+    """
+    if DB_ASSINCRONO:
+        async with AsyncSession(engine_assincrono()) as bd:
+            try:
+                yield bd
+                await bd.commit()
+            except:
+                await bd.rollback()
+                raise
+        return
+
+    bd = Session(engine)
+    try:
+        yield bd
+        await run_in_threadpool(bd.commit)
+    except:
+        await run_in_threadpool(bd.rollback)
+        raise
+    finally:
+        await run_in_threadpool(bd.close)
+
+
+async def executa_no_bd(
+    bd: Session | AsyncSession, funcao: Callable[..., T], *args, **kwargs
+) -> T:
+    """
+    Executa `funcao(session, *args, **kwargs)` sem bloquear o event loop:
+    via run_sync na AsyncSession ou no threadpool na Session síncrona.
+    """
+    if isinstance(bd, AsyncSession):
+        return await bd.run_sync(funcao, *args, **kwargs)
+    return await run_in_threadpool(funcao, bd, *args, **kwargs)
+
 
 conexao_bd = Annotated[Session, Depends(get_bd)]
+conexao_bd_assincrona = Annotated[Session | AsyncSession, Depends(get_bd_assincrono)]
@@ -0,0 +1,34 @@
+from sqlalchemy import Time
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import GenericFunction
+
+
+def insert_com_upsert(nome_dialeto: str, modelo):
+    """
+    Retorna um INSERT do dialeto em uso, que suporta on_conflict_do_update.
+    """
+    match nome_dialeto:
+        case "postgresql":
+            return postgresql.insert(modelo)
+        case _:
+            return sqlite.insert(modelo)
+
+
+class hora_do_dia(GenericFunction):
+    """
+    Hora do dia (sem a data) de uma coluna DateTime, comparável com `time`.
+    """
+
+    type = Time()
+    inherit_cache = True
+
+
+@compiles(hora_do_dia)
+def _hora_do_dia(elemento, compilador, **kw):
+    return f"CAST({compilador.process(elemento.clauses, **kw)} AS TIME)"
+
+
+@compiles(hora_do_dia, "sqlite")
+def _hora_do_dia_sqlite(elemento, compilador, **kw):
+    return f"time{compilador.process(elemento.clause_expr, **kw)}"
@@ -24,6 +24,14 @@ class FormaPagamentoCompra(PyEnum):
     dinheiro = "dinheiro"
 
 
+class StatusTarefa(PyEnum):
+    pendente = "pendente"
+    processando = "processando"
+    concluida = "concluida"
+    falhou = "falhou"
+    cancelada = "cancelada"
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -62,8 +70,8 @@ class Funcionario(Usuario):
             native_enum=True,
         )
     )
-    senha: Mapped[str] = mapped_column(String(50))
-    email: Mapped[str | None] = mapped_column(String(320), nullable=True)
+    senha: Mapped[str] = mapped_column(String(255))
+    email: Mapped[str | None] = mapped_column(String(320), nullable=True, index=True)
     data_entrada: Mapped[date] = mapped_column(Date)
     data_saida: Mapped[date | None] = mapped_column(Date, nullable=True)
 
@@ -114,18 +122,19 @@ class HistoricoAcoes(Base):
     __tablename__ = "historico_acoes"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    usuario_id_ator: Mapped[int] = mapped_column(ForeignKey(Funcionario.usuario_id))
-    usuario_id_alvo: Mapped[int | None] = mapped_column(ForeignKey(Cliente.usuario_id))
+    # Sem FK: o histórico continua existindo depois que o usuário é removido
+    usuario_id_ator: Mapped[int]
+    usuario_id_alvo: Mapped[int | None]
     acao: Mapped[str]
     info: Mapped[dict] = mapped_column(JSON)
-    data: Mapped[datetime] = mapped_column(DateTime)
+    data: Mapped[datetime] = mapped_column(DateTime, index=True)
 
 
 class Compra(Base):
     __tablename__ = "compra"
 
     usuario_id: Mapped[int] = mapped_column(ForeignKey(Usuario.id), primary_key=True)
-    local: Mapped[str]
+    local: Mapped[str] = mapped_column(index=True)
     forma_pagamento: Mapped[FormaPagamentoCompra] = mapped_column(
         Enum(
             FormaPagamentoCompra,
@@ -134,5 +143,80 @@ class Compra(Base):
             native_enum=True,
         )
     )
-    horario: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    horario: Mapped[datetime] = mapped_column(DateTime, primary_key=True, index=True)
     preco_compra: Mapped[int]
+
+
+class ResumoMensalCompras(Base):
+    """
+    Agregado mensal das compras por categoria atual do comprador: mudar a
+    categoria de um cliente move as compras dele. Compras de usuários que não
+    são clientes usam a categoria SEM_CATEGORIA.
+    """
+
+    __tablename__ = "resumo_mensal_compras"
+
+    SEM_CATEGORIA = "nao_cliente"
+
+    ano: Mapped[int] = mapped_column(primary_key=True)
+    mes: Mapped[int] = mapped_column(primary_key=True)
+    tipo_cliente: Mapped[str] = mapped_column(String(20), primary_key=True)
+    graduando: Mapped[bool] = mapped_column(primary_key=True)
+    pos_graduando: Mapped[bool] = mapped_column(primary_key=True)
+    bolsista: Mapped[bool] = mapped_column(primary_key=True)
+    quantidade: Mapped[int] = mapped_column(default=0)
+    faturamento: Mapped[int] = mapped_column(default=0)
+
+
+class VersaoCache(Base):
+    """
+    Contador de versão dos caches de processo, incrementado a cada escrita
+    nos dados cacheados para que todos os workers percebam a mudança.
+    """
+
+    __tablename__ = "versao_cache"
+
+    chave: Mapped[str] = mapped_column(String(50), primary_key=True)
+    versao: Mapped[int] = mapped_column(default=0)
+
+
+class TarefaImportacao(Base):
+    """
+    Importação em segundo plano de um arquivo de compras ou clientes.
+    O arquivo fica em disco até a tarefa terminar e `linhas_processadas`
+    avança na mesma transação de cada lote, para retomar após reinícios.
+    """
+
+    __tablename__ = "tarefa_importacao"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    tipo: Mapped[str] = mapped_column(String(20))
+    status: Mapped[StatusTarefa] = mapped_column(
+        Enum(
+            StatusTarefa, name="status_tarefa_enum", create_type=True, native_enum=True
+        ),
+        index=True,
+    )
+    arquivo: Mapped[str] = mapped_column(String(500))
+    usuario_id_ator: Mapped[int]
+    criada_em: Mapped[datetime] = mapped_column(DateTime)
+    atualizada_em: Mapped[datetime] = mapped_column(DateTime)
+    linhas_total: Mapped[int | None]
+    linhas_processadas: Mapped[int] = mapped_column(default=0)
+    linhas_inseridas: Mapped[int] = mapped_column(default=0)
+    linhas_rejeitadas: Mapped[int] = mapped_column(default=0)
+    cancelamento_solicitado: Mapped[bool] = mapped_column(default=False)
+    erro: Mapped[str | None]
+    # Trabalhador que reivindicou a tarefa; `atualizada_em` serve de batimento
+    dono: Mapped[str | None] = mapped_column(String(64))
+
+
+class RejeicaoImportacao(Base):
+    __tablename__ = "rejeicao_importacao"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    tarefa_id: Mapped[int] = mapped_column(
+        ForeignKey(TarefaImportacao.id, ondelete="CASCADE"), index=True
+    )
+    linha: Mapped[int]
+    motivo: Mapped[str] = mapped_column(String(200))
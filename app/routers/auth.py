@@ -1,9 +1,8 @@
 from fastapi import APIRouter, HTTPException, status
-from sqlalchemy import select
-from ..models.models import Funcionario
-from ..models.db_setup import conexao_bd
+from ..models.db_setup import conexao_bd_assincrona, executa_no_bd
 from ..schemas.auth import LoginDTO
-from ..core.seguranca import gerar_hash, verificar_hash, cria_token_de_acesso
+from ..core.credenciais import busca_credencial, verifica_senha
+from ..core.seguranca import gerar_hash, cria_token_de_acesso
 from ..utils.validacao import valida_e_retorna_cpf
 
 auth_router = APIRouter(
@@ -13,31 +12,27 @@ auth_router = APIRouter(
 router = auth_router
 
 
-def get_usuario_por_cpf(db: conexao_bd, cpf: str):
-    cpf = valida_e_retorna_cpf(cpf)
-    usuario = db.scalar(
-        select(Funcionario).where(Funcionario.cpf_hash == gerar_hash(cpf))
-    )
-    return usuario
-
-
 @router.post(
     "/login",
     summary="Realiza autenticação do usuário no sistema",
     tags=["Autenticação"],
 )
-async def login(login_data: LoginDTO, db: conexao_bd):
-    usuario = get_usuario_por_cpf(db, login_data.cpf)
+async def login(login_data: LoginDTO, db: conexao_bd_assincrona):
+    cpf = valida_e_retorna_cpf(login_data.cpf)
+    credencial = await executa_no_bd(db, busca_credencial, gerar_hash(cpf))
+
+    # Sem credencial, verifica mesmo assim (contra um hash fictício): o tempo
+    # de resposta não pode revelar quais CPFs estão cadastrados
+    senha_correta = await verifica_senha(
+        login_data.senha, credencial.senha if credencial else None
+    )
 
-    if (
-        usuario
-        and verificar_hash(login_data.senha, usuario.senha)
-        and usuario.data_saida is None
-    ):
+    if credencial and senha_correta:
+        # O CPF do token é o que acabou de ser validado: sem descriptografar
         token = cria_token_de_acesso(
-            {"sub": usuario.cpf, "tipo": usuario.tipo.value, "id": usuario.id}
+            {"sub": cpf, "tipo": credencial.tipo, "id": credencial.id}
         )
-        return {"token": token, "tipo": usuario.tipo.value}
+        return {"token": token, "tipo": credencial.tipo}
 
     else:
         raise HTTPException(
@@ -1,15 +1,47 @@
-import io
-from math import ceil
-from typing import Annotated
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status, Query
-from sqlalchemy import select, func
+from typing import Annotated, BinaryIO
+from fastapi.concurrency import run_in_threadpool
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+    status,
+)
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 from sqlalchemy import or_
-import polars as pl
 
 from app.core.historico_acoes import AcoesEnum, guarda_acao
-from ..models.db_setup import conexao_bd
-from ..models.models import Cliente, ClienteTipo
+from app.core.importacao import (
+    COLUNAS_CLIENTE,
+    ESQUEMA_CSV_CLIENTE,
+    ERRO_COLUNAS,
+    ErroLeituraArquivo,
+    colunas_do_arquivo,
+    extensao_importavel,
+    le_em_lotes,
+    registra_clientes,
+    valida_clientes,
+)
+from app.core.tarefas_importacao import (
+    EM_SEGUNDO_PLANO_DESCRICAO,
+    TIPO_CLIENTES,
+    cria_tarefa,
+)
+from ..models.busca import (
+    busca_cliente,
+    casa_clientes,
+    ids_clientes,
+    usa_indice_busca,
+)
+from ..models.db_setup import conexao_bd, conexao_bd_assincrona, executa_no_bd
+from ..models.models import Cliente, ClienteTipo, StatusTarefa
+from ..core.cpfs import INCLUIR_CPF_DESCRICAO
+from ..core.metricas import mede_importacao
 from ..core.seguranca import gerar_hash, criptografa_cpf
 from ..core.permissoes import requer_permissao
 from ..schemas.cliente import (
@@ -19,9 +51,13 @@ from ..schemas.cliente import (
     ClienteEnum,
     ClientePaginationOut,
 )
+from ..schemas.importacao import TarefaCriadaOut
+from ..utils.arquivos import arquivo_temporario
+from ..utils.paginacao import CONTAR_TOTAL_DESCRICAO, CURSOR_DESCRICAO, pagina_consulta
 from ..utils.validacao import valida_e_retorna_cpf
 
 CLIENTE_NAO_ENCONTRADO_MENSAGEM = "Cliente não encontrado"
+SUBTIPO_CLIENTE = Cliente.__mapper__.polymorphic_identity
 
 
 cliente_router = APIRouter(
@@ -65,7 +101,7 @@ def cria_cliente(
             detail="Cliente com esse CPF já existe.",
         )
     # db.refresh(novo)
-    guarda_acao(db, AcoesEnum.CADASTRAR_CLIENTE, ator["cpf"], novo.id)
+    guarda_acao(db, AcoesEnum.CADASTRAR_CLIENTE, ator, novo.id)
     return ClienteOut.from_orm(novo)
 
 
@@ -100,6 +136,9 @@ def listar_clientes(
     page_size: int = Query(
         10, ge=1, le=100, description="Quantidade de clientes por página (padrão 10)"
     ),
+    cursor: str | None = Query(None, description=CURSOR_DESCRICAO),
+    contar_total: bool = Query(False, description=CONTAR_TOTAL_DESCRICAO),
+    incluir_cpf: bool = Query(True, description=INCLUIR_CPF_DESCRICAO),
 ):
     """
     Lista todos os clientes cadastrados, com possibilidade de filtros por:
@@ -129,18 +168,12 @@ def listar_clientes(
     if bolsista is not None:
         query = query.where(Cliente.bolsista == bolsista)
 
-    offset = (page - 1) * page_size
-    total = db.scalar(select(func.count()).select_from(query.subquery()))
-    clientes_na_pagina = db.scalars(query.offset(offset).limit(page_size)).all()
-    clientes_out = [ClienteOut.from_orm(cliente) for cliente in clientes_na_pagina]
+    clientes_na_pagina, paginacao = pagina_consulta(
+        db, query, [Cliente.id], page, page_size, cursor, contar_total
+    )
+    clientes_out = ClienteOut.lista_from_orm(clientes_na_pagina, incluir_cpf)
 
-    return {
-        "total_in_page": len(clientes_na_pagina),
-        "page": page,
-        "page_size": page_size,
-        "total_pages": ceil(total / page_size) if total else 0,
-        "items": clientes_out,
-    }
+    return {**paginacao, "items": clientes_out}
 
 
 @cliente_router.delete(
@@ -164,7 +197,7 @@ def remover_cliente_id(
         )
     db.delete(cliente)
     db.flush()
-    guarda_acao(db, AcoesEnum.DELETAR_CLIENTE, ator["cpf"], cliente.id)
+    guarda_acao(db, AcoesEnum.DELETAR_CLIENTE, ator, cliente.id)
 
 
 @cliente_router.put(
@@ -192,7 +225,7 @@ def editar_cliente(
         setattr(cliente, campo, valor)
     db.flush()
     db.refresh(cliente)
-    guarda_acao(db, AcoesEnum.ATUALIZAR_CLIENTE, ator["cpf"], cliente.id)
+    guarda_acao(db, AcoesEnum.ATUALIZAR_CLIENTE, ator, cliente.id)
     return ClienteOut.from_orm(cliente)
 
 
@@ -220,7 +253,7 @@ def editar_cliente_id(
         setattr(cliente, campo, valor)
     db.flush()
     db.refresh(cliente)
-    guarda_acao(db, AcoesEnum.ATUALIZAR_CLIENTE, ator["cpf"], cliente.id)
+    guarda_acao(db, AcoesEnum.ATUALIZAR_CLIENTE, ator, cliente.id)
     return ClienteOut.from_orm(cliente)
 
 
@@ -248,11 +281,13 @@ def buscar_cliente(cpf: str, db: conexao_bd):
     summary="Busca um cliente pelo ID",
     response_model=ClienteOut,
 )
-def buscar_cliente_id(id: int, db: conexao_bd):
+async def buscar_cliente_id(id: int, db: conexao_bd_assincrona):
     """
     Retorna os dados de um cliente a partir do iD.
     """
-    cliente = db.scalar(select(Cliente).where(Cliente.id == id))
+    cliente = await executa_no_bd(
+        db, Session.scalar, select(Cliente).where(Cliente.id == id)
+    )
     if not cliente:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -283,82 +318,77 @@ def anonimiza_funcionario(
     cliente.nome = None
 
     db.flush()
-    guarda_acao(db, AcoesEnum.ANONIMIZAR_CLIENTE, ator["cpf"], cliente.id)
+    guarda_acao(db, AcoesEnum.ANONIMIZAR_CLIENTE, ator, cliente.id)
 
     return {"message": "Funcionário desativado com sucesso"}
 
 
 @cliente_router.post(
     "/upload-csv/",
-    summary="Cadastra clientes no sistema por meio de CSV",
+    summary="Cadastra clientes no sistema por meio de CSV, Parquet ou Arrow IPC",
+    responses={
+        status.HTTP_202_ACCEPTED: {
+            "model": TarefaCriadaOut,
+            "description": "Importação agendada (em_segundo_plano=true)",
+        }
+    },
 )
 async def upload_clientes_csv(
     db: conexao_bd,
     ator: Annotated[dict, Depends(requer_permissao("funcionario", "admin"))],
+    response: Response,
     arquivo: UploadFile = File(...),
+    em_segundo_plano: bool = Query(False, description=EM_SEGUNDO_PLANO_DESCRICAO),
 ):
     """
-    Realiza a inserção em massa de clientes a partir de um arquivo CSV.
-    O CSV deve conter colunas: cpf,nome,matricula,tipo,graduando,pos_graduando,bolsista
-    Clientes duplicados (mesmo CPF) são ignorados.
+    Realiza a inserção em massa de clientes a partir de um arquivo CSV,
+    Parquet ou Arrow IPC (.arrow, .ipc, .feather).
+    O arquivo deve conter colunas: cpf,nome,matricula,tipo,graduando,pos_graduando,bolsista
+    Clientes duplicados (mesmo CPF) e linhas inválidas são ignorados.
     """
-    if not arquivo.filename.endswith(".csv"):  # type: ignore
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="O arquivo deveria ser CSV."
-        )
+    extensao = extensao_importavel(arquivo.filename)
 
-    contents = await arquivo.read()
-    try:
-        tabela_csv = pl.read_csv(io.BytesIO(contents))
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Erro lendo CSV: {e}"
+    if em_segundo_plano:
+        response.status_code = status.HTTP_202_ACCEPTED
+        tarefa_id = await run_in_threadpool(
+            cria_tarefa, db, TIPO_CLIENTES, arquivo.file, extensao, ator
         )
+        return TarefaCriadaOut(tarefa_id=tarefa_id, status=StatusTarefa.pendente)
 
-    required_columns = {
-        "cpf",
-        "nome",
-        "matricula",
-        "tipo",
-        "graduando",
-        "pos_graduando",
-        "bolsista",
-    }
-    if not required_columns.issubset(set(tabela_csv.columns)):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="O CSV não contém as colunas necessárias.",
-        )
+    # Parsing, criptografia e inserção bloqueiam: rodam fora do event loop
+    return await run_in_threadpool(
+        importa_arquivo_clientes, db, arquivo.file, extensao, ator
+    )
 
-    inseridos = 0
-    clientes = []
-    for linha in tabela_csv.iter_rows(named=True):
+
+def importa_arquivo_clientes(db: Session, origem: BinaryIO, extensao: str, ator: dict):
+    with arquivo_temporario(origem, extensao) as caminho:
         try:
-            cliente = Cliente(
-                cpf_hash=gerar_hash(str(linha["cpf"])),
-                cpf_cript=criptografa_cpf(str(linha["cpf"])),
-                nome=str(linha["nome"]),
-                matricula=str(linha["matricula"]),
-                tipo=str(linha["tipo"]),
-                graduando=bool(linha["graduando"]),
-                pos_graduando=bool(linha["pos_graduando"]),
-                bolsista=bool(linha["bolsista"]),
+            colunas = colunas_do_arquivo(caminho)
+        except ErroLeituraArquivo as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Erro lendo arquivo: {e}",
+            )
+
+        if not set(COLUNAS_CLIENTE).issubset(colunas):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=ERRO_COLUNAS
+            )
+
+        inseridos = 0
+        try:
+            for inicio, lote in mede_importacao(
+                TIPO_CLIENTES,
+                le_em_lotes(caminho, COLUNAS_CLIENTE, ESQUEMA_CSV_CLIENTE),
+            ):
+                validacao = valida_clientes(db, lote, inicio)
+                inseridos += len(registra_clientes(db, validacao.validas, ator))
+        except ErroLeituraArquivo as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Erro lendo arquivo: {e}",
             )
-            inseridos += 1
-            clientes.append(cliente)
-            db.add(cliente)
-            db.flush()
-        except Exception as e:
-            print(f"Erro ao cadastrar {linha.get('cpf')}: {e}")
-            db.rollback()
-            continue
-    for cliente in clientes:
-        guarda_acao(
-            db,
-            AcoesEnum.CADASTRAR_CLIENTE,
-            ator["cpf"],
-            cliente.id,
-        )
 
     return {"message": f"{inseridos} cliente(s) cadastrado(s) com sucesso."}
 
@@ -382,45 +412,55 @@ def buscar_clientes_todos_campos(
     tamanho_pagina: int = Query(
         10, ge=1, le=100, description="Quantidade de clientes por página (padrão 10)"
     ),
+    cursor: str | None = Query(None, description=CURSOR_DESCRICAO),
+    contar_total: bool = Query(False, description=CONTAR_TOTAL_DESCRICAO),
+    incluir_cpf: bool = Query(True, description=INCLUIR_CPF_DESCRICAO),
 ):
     """
     Pesquisa clientes em (nome, matrícula, subtipo e CPF).
-    - Nome, matrícula e subtipo são pesquisados com ILIKE.
+    - Nome e matrícula são pesquisados pelo índice de busca textual quando o
+      banco tem um e o termo é longo o bastante; nos outros casos, com ILIKE.
+    - Pelo índice, a paginação por página ordena pela relevância, exceto para
+      termos só com dígitos.
+    - Todo cliente tem subtipo "cliente", então um trecho dele traz todos.
     - CPF real é comparado pelo hash (igualdade).
     """
     consulta = select(Cliente)
+    chave = [Cliente.id]
 
-    if termo_busca:
-        padrao_like = f"%{termo_busca}%"
-
-        filtros = [
-            Cliente.nome.ilike(padrao_like),
-            Cliente.matricula.ilike(padrao_like),
-            Cliente.subtipo.ilike(padrao_like),
-        ]
-
+    if termo_busca and termo_busca.lower() not in SUBTIPO_CLIENTE:
         # Se for apenas dígitos, assumimos que é CPF e comparamos pelo hash
-        if termo_busca.isdigit():
-            cpf_hash = gerar_hash(termo_busca)
-            filtros.append(Cliente.cpf_hash == cpf_hash)
-
-        consulta = consulta.where(or_(*filtros))
+        cpf_hash = gerar_hash(termo_busca) if termo_busca.isdigit() else None
+
+        if not usa_indice_busca(db.get_bind().dialect.name, termo_busca):
+            padrao_like = f"%{termo_busca}%"
+            filtros = [
+                Cliente.nome.ilike(padrao_like),
+                Cliente.matricula.ilike(padrao_like),
+            ]
+            if cpf_hash is not None:
+                filtros.append(Cliente.cpf_hash == cpf_hash)
+            consulta = consulta.where(or_(*filtros))
+        elif cpf_hash is not None:
+            consulta = consulta.where(
+                Cliente.id.in_(ids_clientes(termo_busca, cpf_hash=cpf_hash))
+            )
+        else:
+            consulta = (
+                consulta.join(busca_cliente, busca_cliente.c.rowid == Cliente.id)
+                .where(casa_clientes(termo_busca))
+                .order_by(busca_cliente.c.rank, Cliente.id)
+            )
+            # O FTS5 entrega as linhas na ordem do rowid (o id do cliente), então
+            # o modo cursor pagina por ela sem ordenar todos os encontrados
+            chave = [busca_cliente.c.rowid.label("id")]
 
     if tipo:
         consulta = consulta.where(Cliente.tipo == tipo)
 
-    deslocamento = (pagina - 1) * tamanho_pagina
-
-    total = db.scalar(select(func.count()).select_from(consulta.subquery()))
-    clientes_encontrados = db.scalars(
-        consulta.offset(deslocamento).limit(tamanho_pagina)
-    ).all()
-    clientes_out = [ClienteOut.from_orm(cliente) for cliente in clientes_encontrados]
-
-    return {
-        "total_in_page": len(clientes_encontrados),
-        "page": pagina,
-        "page_size": tamanho_pagina,
-        "total_pages": ceil(total / tamanho_pagina) if total else 0,
-        "items": clientes_out,
-    }
+    clientes_encontrados, paginacao = pagina_consulta(
+        db, consulta, chave, pagina, tamanho_pagina, cursor, contar_total
+    )
+    clientes_out = ClienteOut.lista_from_orm(clientes_encontrados, incluir_cpf)
+
+    return {**paginacao, "items": clientes_out}
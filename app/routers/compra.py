@@ -1,17 +1,61 @@
-from typing import Annotated
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, status
-import io
-from math import ceil
+from dataclasses import dataclass
+from typing import Annotated, BinaryIO, Literal
+from fastapi.concurrency import run_in_threadpool
+from fastapi import (
+    APIRouter,
+    Depends,
+    UploadFile,
+    File,
+    HTTPException,
+    Path,
+    Query,
+    Response,
+    status,
+)
 import polars as pl
-from sqlalchemy import select, func, or_
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, String, cast, or_, select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.exportacao import TIPOS_MIDIA, exporta
 from app.core.historico_acoes import AcoesEnum, guarda_acao
+from app.core.importacao import (
+    COLUNAS_COMPRA,
+    MOTIVO_COMPRA_DUPLICADA,
+    MOTIVO_VALOR_INVALIDO,
+    ERRO_COLUNAS,
+    ErroLeituraArquivo,
+    Validacao,
+    colunas_do_arquivo,
+    extensao_importavel,
+    le_em_lotes,
+    registra_compras,
+    valida_compras,
+)
+from app.core.metricas import mede_importacao
+from app.core.resumo_compras import registra_compras_no_resumo
 from app.routers.informacoes_gerais import read_info
-from ..models.db_setup import conexao_bd
-from ..models.models import Compra
+from app.core.tarefas_importacao import (
+    EM_SEGUNDO_PLANO_DESCRICAO,
+    TIPO_COMPRAS,
+    cria_tarefa,
+)
+from ..models.busca import ids_clientes, locais_com, usa_indice_busca
+from ..models.db_setup import conexao_bd, conexao_bd_assincrona, executa_no_bd
+from ..models.dialetos import hora_do_dia
+from ..models.models import (
+    ClienteTipo,
+    Compra,
+    FormaPagamentoCompra,
+    StatusTarefa,
+)
 from ..models.models import Cliente
 from ..schemas.compra import CompraIn, CompraOut, CompraPaginationOut
+from ..schemas.importacao import TarefaCriadaOut
 from ..core.permissoes import requer_permissao
+from ..utils.arquivos import arquivo_temporario
+from ..utils.intervalos import intervalo_mes
+from ..utils.paginacao import CONTAR_TOTAL_DESCRICAO, CURSOR_DESCRICAO, pagina_consulta
 from datetime import date, datetime
 
 compra_router = APIRouter(
@@ -26,11 +70,15 @@ router = compra_router
     summary="Cadastra uma compra no sistema",
     status_code=status.HTTP_201_CREATED,
 )
-def cadastra_compra(
+async def cadastra_compra(
     compra: CompraIn,
     ator: Annotated[dict, Depends(requer_permissao("funcionario", "admin"))],
-    db: conexao_bd,
+    db: conexao_bd_assincrona,
 ):
+    return await executa_no_bd(db, registra_compra, compra, ator)
+
+
+def registra_compra(db: Session, compra: CompraIn, ator: dict):
     nova_compra = Compra(
         usuario_id=compra.usuario_id,
         horario=compra.horario,
@@ -59,19 +107,22 @@ def cadastra_compra(
 
         db.add(nova_compra)
         db.flush()
+        registra_compras_no_resumo(db, [nova_compra])
 
-    except IntegrityError as e:
+    except IntegrityError:
         db.rollback()
-        if "UNIQUE constraint failed: compra.usuario_id, compra.horario" in str(e):
+        chave = {"usuario_id": compra.usuario_id, "horario": compra.horario}
+        if db.get(Compra, chave) is not None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Já existe uma compra para este usuário na mesma data e horário",
             )
+        raise
 
     guarda_acao(
         db,
         AcoesEnum.CADASTRAR_COMPRA,
-        ator["cpf"],
+        ator,
         info_adicional=CompraOut.model_validate(nova_compra).model_dump_json(),
     )
     return {"message": "Compra cadastrada com sucesso"}
@@ -79,185 +130,254 @@ def cadastra_compra(
 
 @router.post(
     "/csv",
-    summary="Cadastra uma compra no sistema por meio de csv",
+    summary="Cadastra compras no sistema por meio de CSV, Parquet ou Arrow IPC",
+    responses={
+        status.HTTP_202_ACCEPTED: {
+            "model": TarefaCriadaOut,
+            "description": "Importação agendada (em_segundo_plano=true)",
+        }
+    },
 )
 async def cadastra_compra_csv(
     db: conexao_bd,
     ator: Annotated[dict, Depends(requer_permissao("funcionario", "admin"))],
+    response: Response,
     arquivo: UploadFile = File(...),
+    em_segundo_plano: bool = Query(False, description=EM_SEGUNDO_PLANO_DESCRICAO),
 ):
-    if not arquivo.filename.endswith(".csv"):  # type: ignore
-        raise HTTPException(status_code=400, detail="O arquivo deveria ser CSV.")
+    extensao = extensao_importavel(arquivo.filename)
 
-    contents = await arquivo.read()
-    try:
-        tabela_csv = pl.read_csv(io.BytesIO(contents))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Erro lendo CSV: {e}")
-
-    required_columns = {
-        "usuario_id",
-        "horario",
-        "local",
-        "forma_pagamento",
-        "preco_compra",
-    }
-    if not required_columns.issubset(set(tabela_csv.columns)):
-        raise HTTPException(
-            status_code=422, detail="O CSV não contém as colunas necessárias."
+    if em_segundo_plano:
+        response.status_code = status.HTTP_202_ACCEPTED
+        tarefa_id = await run_in_threadpool(
+            cria_tarefa, db, TIPO_COMPRAS, arquivo.file, extensao, ator
         )
+        return TarefaCriadaOut(tarefa_id=tarefa_id, status=StatusTarefa.pendente)
 
-    inseridas = 0
-    compras = []
-    info_gerais = read_info(db)
-    for linha in tabela_csv.iter_rows(named=True):
+    # Parsing, validação e inserção bloqueiam: rodam fora do event loop
+    return await run_in_threadpool(
+        importa_arquivo_compras, db, arquivo.file, extensao, ator
+    )
+
+
+def importa_arquivo_compras(db: Session, origem: BinaryIO, extensao: str, ator: dict):
+    """
+    Importa o arquivo em lotes, na transação da requisição: qualquer linha
+    inválida desfaz o arquivo inteiro. Compras duplicadas são ignoradas.
+    """
+    with arquivo_temporario(origem, extensao) as caminho:
         try:
-            compra = Compra(
-                usuario_id=int(linha["usuario_id"]),
-                horario=datetime.fromisoformat(linha["horario"]),
-                local=str(linha["local"]),
-                forma_pagamento=str(linha["forma_pagamento"]),
-                preco_compra=int(linha["preco_compra"]),
-            )
-            hora_compra = compra.horario.time()
-            if not (
-                (info_gerais.inicio_almoco <= hora_compra <= info_gerais.fim_almoco)
-                ^ (info_gerais.inicio_jantar <= hora_compra <= info_gerais.fim_jantar)
-            ):
-                raise HTTPException(
-                    status_code=400,
-                    detail="Compra realizada fora dos horários de almoço e jantar",
-                )
-
-            cliente_com_usuario_id = db.get(Cliente, compra.usuario_id)
-            if not (cliente_com_usuario_id):
-                raise HTTPException(
-                    status_code=400,
-                    detail="O cliente solicitante da compra não está cadastrado no sistema",
-                )
-
-            db.add(compra)
-            db.flush()
-            compras.append(compra)
-            inseridas += 1
-
-        except HTTPException as e:
-            raise e
-
-        except IntegrityError as e:
-            db.rollback()
-            if "UNIQUE constraint failed: compra.usuario_id, compra.horario" in str(e):
-                continue
-
-            else:
-                raise
-
-        except Exception as e:
-            raise HTTPException(
-                status_code=422, detail=f"Erro ao cadastrar {linha}: {e}"
-            )
+            colunas = colunas_do_arquivo(caminho)
+        except ErroLeituraArquivo as e:
+            raise HTTPException(status_code=400, detail=f"Erro lendo arquivo: {e}")
 
-    for compra in compras:
-        guarda_acao(
-            db,
-            AcoesEnum.CADASTRAR_COMPRA,
-            ator["cpf"],
-            None,
-            info_adicional=CompraOut.model_validate(compra).model_dump_json(),
-        )
+        if not set(COLUNAS_COMPRA).issubset(colunas):
+            raise HTTPException(status_code=422, detail=ERRO_COLUNAS)
+
+        info = read_info(db)
+        inseridas = 0
+        try:
+            for inicio, lote in mede_importacao(
+                TIPO_COMPRAS, le_em_lotes(caminho, COLUNAS_COMPRA)
+            ):
+                validacao = valida_compras(db, lote, info, inicio)
+                rejeita_erros_compra(validacao)
+                registra_compras(db, validacao.validas, ator)
+                inseridas += validacao.validas.height
+        except ErroLeituraArquivo as e:
+            raise HTTPException(status_code=400, detail=f"Erro lendo arquivo: {e}")
 
     return {"message": f"{inseridas} compra(s) cadastrada(s) com sucesso."}
 
 
-@router.get(
-    "/",
-    summary="Retorna compras (com filtros opcionais)",
-    tags=["Compra"],
-    response_model=CompraPaginationOut,
-    dependencies=[Depends(requer_permissao("funcionario", "admin"))],
-)
-def filtra_compra(
-    db: conexao_bd,
+def rejeita_erros_compra(validacao: Validacao) -> None:
+    erros = validacao.rejeitadas.filter(pl.col("motivo") != MOTIVO_COMPRA_DUPLICADA)
+    if not erros.is_empty():
+        linha, motivo = erros.row(0)
+        if motivo == MOTIVO_VALOR_INVALIDO:
+            raise HTTPException(
+                status_code=422, detail=f"Erro ao cadastrar linha {linha}: {motivo}"
+            )
+        raise HTTPException(status_code=400, detail=motivo)
+
+
+@dataclass
+class FiltrosCompra:
     horario: datetime | None = Query(
         default=None, description="Filtra por horário da compra"
-    ),
-    local: str | None = Query(default=None, description="Filtra por local da compra"),
+    )
+    local: str | None = Query(default=None, description="Filtra por local da compra")
     forma_pagamento: str | None = Query(
         default=None, description="Filtra por forma de pagamento da compra"
-    ),
+    )
     comprador: str | None = Query(
         default=None, description="Filtra por comprador responsável pela compra"
-    ),
+    )
     categoria_comprador: str | None = Query(
         default=None, description="Filtra por categoria do comprador"
-    ),
+    )
     preco_compra: int | None = Query(
         default=None, description="Filtra por preço da compra"
-    ),
+    )
     data_inicio: date | None = Query(
         default=None, description="Filtrar compras a partir desta data"
-    ),
+    )
     data_fim: date | None = Query(
         default=None, description="Filtrar compras até esta data"
-    ),
+    )
     refeicao: str | None = Query(
         default=None, description="Incluir só **almoço** ou só **jantar**"
-    ),
+    )
+
+
+def aplica_filtros_compra(query: Select, filtros: FiltrosCompra) -> Select:
+    """
+    Aplica os filtros que não dependem do BD a uma query
+    que já faz join de Compra com Cliente.
+    """
+    if filtros.horario is not None:
+        query = query.where(Compra.horario == filtros.horario)
+    if filtros.local is not None:
+        query = query.where(Compra.local.ilike(f"%{filtros.local}%"))
+    if filtros.forma_pagamento is not None:
+        query = query.where(
+            cast(Compra.forma_pagamento, String).ilike(f"%{filtros.forma_pagamento}%")
+        )
+    if filtros.preco_compra is not None:
+        query = query.where(Compra.preco_compra == filtros.preco_compra)
+    if filtros.comprador is not None:
+        query = query.where(Cliente.nome.ilike(f"%{filtros.comprador}%"))
+    if filtros.categoria_comprador is not None:
+        query = query.where(
+            cast(Cliente.tipo, String).ilike(f"%{filtros.categoria_comprador}%")
+        )
+
+    if filtros.data_inicio is not None:
+        query = query.where(Compra.horario >= filtros.data_inicio)
+    if filtros.data_fim is not None:
+        query = query.where(Compra.horario <= filtros.data_fim)
+    return query
+
+
+def aplica_filtro_refeicao(db: Session, query: Select, refeicao: str | None) -> Select:
+    if refeicao is None:
+        return query
+
+    info_gerais = read_info(db)
+    match refeicao:
+        case "jantar":
+            ini = info_gerais.inicio_jantar
+            fim = info_gerais.fim_jantar
+        case "almoço":
+            ini = info_gerais.inicio_almoco
+            fim = info_gerais.fim_almoco
+        case _:
+            raise HTTPException(
+                400,
+                f"Refeicão {refeicao} não existe, seleciona 'jantar' ou 'almoço'",
+            )
+    return query.where(hora_do_dia(Compra.horario).between(ini, fim))
+
+
+@router.get(
+    "/",
+    summary="Retorna compras (com filtros opcionais)",
+    tags=["Compra"],
+    response_model=CompraPaginationOut,
+    dependencies=[Depends(requer_permissao("funcionario", "admin"))],
+)
+async def filtra_compra(
+    db: conexao_bd_assincrona,
+    filtros: Annotated[FiltrosCompra, Depends()],
     page: int = Query(1, ge=1, description="Número da página (padrão 1)"),
     page_size: int = Query(
         10, ge=1, le=100, description="Quantidade de compras por página (padrão 10)"
     ),
+    cursor: str | None = Query(None, description=CURSOR_DESCRICAO),
+    contar_total: bool = Query(False, description=CONTAR_TOTAL_DESCRICAO),
 ):
     query = select(Compra).join(Cliente, Compra.usuario_id == Cliente.usuario_id)
+    query = aplica_filtros_compra(query, filtros)
+
+    def consulta(sessao: Session, query):
+        query = aplica_filtro_refeicao(sessao, query, filtros.refeicao)
+        compras_na_pagina, paginacao = pagina_consulta(
+            sessao,
+            query,
+            [Compra.horario, Compra.usuario_id],
+            page,
+            page_size,
+            cursor,
+            contar_total,
+        )
+        compras_out = [
+            CompraOut.model_validate(c, from_attributes=True) for c in compras_na_pagina
+        ]
 
-    if horario is not None:
-        query = query.where(Compra.horario == horario)
-    if local is not None:
-        query = query.where(Compra.local.ilike(f"%{local}%"))
-    if forma_pagamento is not None:
-        query = query.where(Compra.forma_pagamento.ilike(f"%{forma_pagamento}%"))
-    if preco_compra is not None:
-        query = query.where(Compra.preco_compra == preco_compra)
-    if comprador is not None:
-        query = query.where(Cliente.nome.ilike(f"%{comprador}%"))
-    if categoria_comprador is not None:
-        query = query.where(Cliente.tipo.ilike(f"%{categoria_comprador}%"))
-
-    if data_inicio is not None:
-        query = query.where(Compra.horario >= data_inicio)
-    if data_fim is not None:
-        query = query.where(Compra.horario <= data_fim)
-
-    if refeicao is not None:
-        info_gerais = read_info(db)
-        match refeicao:
-            case "jantar":
-                ini = info_gerais.inicio_jantar
-                fim = info_gerais.fim_jantar
-            case "almoço":
-                ini = info_gerais.inicio_almoco
-                fim = info_gerais.fim_almoco
-            case _:
-                raise HTTPException(
-                    400,
-                    f"Refeicão {refeicao} não existe, seleciona 'jantar' ou 'almoço'",
-                )
-        query = query.where(func.time(Compra.horario).between(ini, fim))
-
-    offset = (page - 1) * page_size
-    total = db.scalar(select(func.count()).select_from(query.subquery()))
-    compras_na_pagina = db.scalars(query.offset(offset).limit(page_size)).all()
-    compras_out = [
-        CompraOut.model_validate(c, from_attributes=True) for c in compras_na_pagina
-    ]
+        return {**paginacao, "items": compras_out}
+
+    return await executa_no_bd(db, consulta, query)
 
-    return {
-        "total_in_page": len(compras_na_pagina),
-        "page": page,
-        "page_size": page_size,
-        "total_pages": ceil(total / page_size) if total else 0,
-        "items": compras_out,
-    }
+
+ESQUEMA_EXPORTACAO_COMPRAS = {
+    "usuario_id": pl.Int64,
+    "horario": pl.Datetime("us"),
+    "local": pl.String,
+    "forma_pagamento": pl.String,
+    "preco_compra": pl.Int64,
+    "nome": pl.String,
+    "matricula": pl.String,
+    "categoria": pl.String,
+    "graduando": pl.Boolean,
+    "pos_graduando": pl.Boolean,
+    "bolsista": pl.Boolean,
+}
+
+
+@router.get(
+    "/exportar",
+    summary="Exporta compras com os dados do comprador em CSV, NDJSON ou Parquet",
+    description=(
+        "Aceita os mesmos filtros da listagem de compras e envia todas as "
+        "compras encontradas, ordenadas por horário, em streaming."
+    ),
+    tags=["Compra"],
+    response_class=StreamingResponse,
+    dependencies=[Depends(requer_permissao("funcionario", "admin"))],
+)
+def exporta_compras(
+    db: conexao_bd,
+    filtros: Annotated[FiltrosCompra, Depends()],
+    formato: Literal["csv", "ndjson", "parquet"] = Query(
+        "csv", description="Formato do arquivo exportado"
+    ),
+):
+    query = (
+        select(
+            Compra.usuario_id,
+            Compra.horario,
+            Compra.local,
+            cast(Compra.forma_pagamento, String),
+            Compra.preco_compra,
+            Cliente.nome,
+            Cliente.matricula,
+            cast(Cliente.tipo, String),
+            Cliente.graduando,
+            Cliente.pos_graduando,
+            Cliente.bolsista,
+        )
+        .join(Cliente, Compra.usuario_id == Cliente.usuario_id)
+        .order_by(Compra.horario, Compra.usuario_id)
+    )
+    query = aplica_filtros_compra(query, filtros)
+    # Resolvido antes de começar a enviar, para que erros virem status HTTP
+    query = aplica_filtro_refeicao(db, query, filtros.refeicao)
+
+    return StreamingResponse(
+        exporta(query, ESQUEMA_EXPORTACAO_COMPRAS, formato),
+        media_type=TIPOS_MIDIA[formato],
+        headers={"Content-Disposition": f'attachment; filename="compras.{formato}"'},
+    )
 
 
 @router.get(
@@ -279,17 +399,30 @@ def listar_compras(
     page_size: int = Query(
         10, ge=1, le=100, description="Quantidade de compras por página (padrão 10)"
     ),
+    cursor: str | None = Query(None, description=CURSOR_DESCRICAO),
+    contar_total: bool = Query(False, description=CONTAR_TOTAL_DESCRICAO),
 ):
     query = select(Compra).join(Cliente, Compra.usuario_id == Cliente.usuario_id)
 
     if busca:
-        busca_like = f"%{busca}%"
-        filtro = []
-
-        filtro.append(Compra.local.ilike(busca_like))
-        filtro.append(Compra.forma_pagamento.ilike(busca_like))
-        filtro.append(Cliente.nome.ilike(busca_like))
-        filtro.append(Cliente.tipo.ilike(busca_like))
+        if usa_indice_busca(db.get_bind().dialect.name, busca):
+            filtro = [
+                Compra.local.in_(locais_com(busca)),
+                Compra.usuario_id.in_(ids_clientes(busca, ("nome",))),
+            ]
+        else:
+            busca_like = f"%{busca}%"
+            filtro = [Compra.local.ilike(busca_like), Cliente.nome.ilike(busca_like)]
+
+        # Colunas enum têm poucos valores: os que contêm a busca são
+        # escolhidos aqui, em vez de aplicar ILIKE em cada linha
+        termo = busca.lower()
+        formas = [f for f in FormaPagamentoCompra if termo in f.name.lower()]
+        if formas:
+            filtro.append(Compra.forma_pagamento.in_(formas))
+        tipos = [t for t in ClienteTipo if termo in t.name.lower()]
+        if tipos:
+            filtro.append(Cliente.tipo.in_(tipos))
 
         try:
             busca_int = int(busca)
@@ -306,20 +439,20 @@ def listar_compras(
 
         query = query.where(or_(*filtro))
 
-    offset = (page - 1) * page_size
-    total = db.scalar(select(func.count()).select_from(query.subquery()))
-    compras_na_pagina = db.scalars(query.offset(offset).limit(page_size)).all()
+    compras_na_pagina, paginacao = pagina_consulta(
+        db,
+        query,
+        [Compra.horario, Compra.usuario_id],
+        page,
+        page_size,
+        cursor,
+        contar_total,
+    )
     compras_out = [
         CompraOut.model_validate(c, from_attributes=True) for c in compras_na_pagina
     ]
 
-    return {
-        "total_in_page": len(compras_na_pagina),
-        "page": page,
-        "page_size": page_size,
-        "total_pages": ceil(total / page_size) if total else 0,
-        "items": compras_out,
-    }
+    return {**paginacao, "items": compras_out}
 
 
 @router.get(
@@ -330,19 +463,19 @@ def listar_compras(
 )
 def get_compras_por_cliente_e_mes(
     cliente_id: int,
-    year: int,
-    month: int,
     db: conexao_bd,
+    year: int = Path(..., ge=1900, le=2100),
+    month: int = Path(..., ge=1, le=12),
 ):
     """
     Retorna todas as compras de um cliente em um determinado mês e ano.
     """
+    inicio, fim = intervalo_mes(year, month)
     query = (
         select(Compra)
         .join(Cliente, Compra.usuario_id == Cliente.id)
         .where(Cliente.id == cliente_id)
-        .where(func.extract("year", Compra.horario) == year)
-        .where(func.extract("month", Compra.horario) == month)
+        .where(Compra.horario >= inicio, Compra.horario < fim)
     )
     compras = db.scalars(query).all()
     return compras
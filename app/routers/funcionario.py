@@ -1,8 +1,7 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select, func, or_, cast, and_
+from sqlalchemy import select, or_, cast, and_
 from sqlalchemy.sql.sqltypes import String as SAString
-from math import ceil
 from pydantic import EmailStr
 from datetime import date, datetime
 
@@ -17,8 +16,10 @@ from ..schemas.funcionario import (
     FuncionarioPaginationOut,
 )
 from ..core.permissoes import requer_permissao
+from ..utils.paginacao import CONTAR_TOTAL_DESCRICAO, CURSOR_DESCRICAO, pagina_consulta
 from ..utils.validacao import valida_e_retorna_cpf
-from ..core.seguranca import gerar_hash, criptografa_cpf
+from ..core.cpfs import INCLUIR_CPF_DESCRICAO
+from ..core.seguranca import gerar_hash, gerar_hash_senha, criptografa_cpf
 from validate_docbr import CPF  # type: ignore
 
 cpf = CPF()
@@ -28,6 +29,8 @@ router = funcionarios_router
 
 FUNCIONARIO_NAO_ENCONTRADO_MSG = "Funcionário não encontrado"
 NUMERO_PAGINA_PADRAO_MSG = "Número da página (padrão 1)"
+# Maior valor de uma coluna INTEGER no PostgreSQL
+MAIOR_ID = 2**31 - 1
 
 
 def valida_funcionario(
@@ -36,12 +39,25 @@ def valida_funcionario(
 ):
     funcionario.cpf = valida_e_retorna_cpf(funcionario.cpf)
 
-    if gerar_hash(funcionario.cpf) in db.scalars(select(Funcionario.cpf_hash)):
+    # Uma só consulta, pelos índices de cpf_hash e email, em vez de trazer
+    # todos os funcionários para o Python
+    cpf_existe, email_existe = db.execute(
+        select(
+            select(Funcionario.id)
+            .where(Funcionario.cpf_hash == gerar_hash(funcionario.cpf))
+            .exists(),
+            select(Funcionario.id)
+            .where(Funcionario.email == funcionario.email)
+            .exists(),
+        )
+    ).one()
+
+    if cpf_existe:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail="CPF já cadastrado no sistema"
         )
 
-    if funcionario.email in db.scalars(select(Funcionario.email)):
+    if email_existe:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Email já cadastrado no sistema",
@@ -64,7 +80,7 @@ def cadastra_funcionario(
         cpf_cript=criptografa_cpf(funcionario.cpf),
         cpf_hash=gerar_hash(funcionario.cpf),
         nome=funcionario.nome,
-        senha=gerar_hash(funcionario.senha),
+        senha=gerar_hash_senha(funcionario.senha),
         email=funcionario.email,
         tipo=FuncionarioTipo(funcionario.tipo),
         data_entrada=funcionario.data_entrada,
@@ -72,7 +88,7 @@ def cadastra_funcionario(
 
     db.add(usuario)
     db.flush()
-    guarda_acao(db, AcoesEnum.CADASTRAR_FUNCIONARIO, ator["cpf"], usuario.id)
+    guarda_acao(db, AcoesEnum.CADASTRAR_FUNCIONARIO, ator, usuario.id)
     return {"message": "Funcionário cadastrado com sucesso"}
 
 
@@ -96,13 +112,11 @@ def atualiza_funcionario(
 
     for campo, valor in funcionario.model_dump(exclude_unset=True).items():
         if campo == "senha":
-            valor = gerar_hash(valor)
+            valor = gerar_hash_senha(valor)
             funcionario_existente.senha = valor
         setattr(funcionario_existente, campo, valor)
 
-    guarda_acao(
-        db, AcoesEnum.ATUALIZAR_FUNCIONARIO, ator["cpf"], funcionario_existente.id
-    )
+    guarda_acao(db, AcoesEnum.ATUALIZAR_FUNCIONARIO, ator, funcionario_existente.id)
     return funcionario_existente
 
 
@@ -130,6 +144,9 @@ def busca_funcionarios(
     page_size: int = Query(
         10, ge=1, le=100, description="Quantidade de registros por página (padrão 10)"
     ),
+    cursor: str | None = Query(None, description=CURSOR_DESCRICAO),
+    contar_total: bool = Query(False, description=CONTAR_TOTAL_DESCRICAO),
+    incluir_cpf: bool = Query(True, description=INCLUIR_CPF_DESCRICAO),
 ):
     query = select(Funcionario).where(cast(Funcionario.tipo, SAString) == "funcionario")
 
@@ -153,18 +170,14 @@ def busca_funcionarios(
     # Ordenação estável
     query = query.order_by(Funcionario.id.asc())
 
-    offset = (page - 1) * page_size
-    total = db.scalar(select(func.count()).select_from(query.subquery()))
-    funcionarios_na_pagina = db.scalars(query.offset(offset).limit(page_size)).all()
-    funcionarios_out = [FuncionarioOut.from_orm(f) for f in funcionarios_na_pagina]
+    funcionarios_na_pagina, paginacao = pagina_consulta(
+        db, query, [Funcionario.id], page, page_size, cursor, contar_total
+    )
+    funcionarios_out = FuncionarioOut.lista_from_orm(
+        funcionarios_na_pagina, incluir_cpf
+    )
 
-    return {
-        "total_in_page": len(funcionarios_out),
-        "page": page,
-        "page_size": page_size,
-        "total_pages": ceil(total / page_size) if total else 0,
-        "items": funcionarios_out,
-    }
+    return {**paginacao, "items": funcionarios_out}
 
 
 @router.get(
@@ -194,6 +207,9 @@ def pesquisar_funcionarios(
     page_size: int = Query(
         10, ge=1, le=100, description="Quantidade de registros por página"
     ),
+    cursor: str | None = Query(None, description=CURSOR_DESCRICAO),
+    contar_total: bool = Query(False, description=CONTAR_TOTAL_DESCRICAO),
+    incluir_cpf: bool = Query(True, description=INCLUIR_CPF_DESCRICAO),
 ):
     query = select(Funcionario)
 
@@ -219,20 +235,14 @@ def pesquisar_funcionarios(
             ~and_(Funcionario.nome.is_(None), Funcionario.cpf_hash.is_(None))
         )
 
-    offset = (page - 1) * page_size
     # Ordenação estável para paginação determinística
     query = query.order_by(Funcionario.id.asc())
-    total = db.scalar(select(func.count()).select_from(query.subquery()))
-    resultados = db.scalars(query.offset(offset).limit(page_size)).all()
-    items = [FuncionarioOut.from_orm(f) for f in resultados]
+    resultados, paginacao = pagina_consulta(
+        db, query, [Funcionario.id], page, page_size, cursor, contar_total
+    )
+    items = FuncionarioOut.lista_from_orm(resultados, incluir_cpf)
 
-    return {
-        "total_in_page": len(resultados),
-        "page": page,
-        "page_size": page_size,
-        "total_pages": ceil(total / page_size) if total else 0,
-        "items": items,
-    }
+    return {**paginacao, "items": items}
 
 
 def aplica_filtros_busca(query, busca: str):
@@ -242,7 +252,7 @@ def aplica_filtros_busca(query, busca: str):
     conditions.append(Funcionario.email.ilike(busca_like))
     conditions.append(cast(Funcionario.tipo, SAString).ilike(busca_like))
 
-    if busca.isdigit():
+    if busca.isdigit() and int(busca) <= MAIOR_ID:
         conditions.append(Funcionario.id == int(busca))
 
     try:
@@ -289,6 +299,9 @@ def busca_admins(
     page_size: int = Query(
         10, ge=1, le=100, description="Quantidade de registros por página (padrão 10)"
     ),
+    cursor: str | None = Query(None, description=CURSOR_DESCRICAO),
+    contar_total: bool = Query(False, description=CONTAR_TOTAL_DESCRICAO),
+    incluir_cpf: bool = Query(True, description=INCLUIR_CPF_DESCRICAO),
 ):
     query = select(Funcionario).where(cast(Funcionario.tipo, SAString) == "admin")
 
@@ -305,18 +318,14 @@ def busca_admins(
     if data_saida is not None:
         query = query.where(Funcionario.data_saida == data_saida)
 
-    offset = (page - 1) * page_size
-    total = db.scalar(select(func.count()).select_from(query.subquery()))
-    funcionarios_na_pagina = db.scalars(query.offset(offset).limit(page_size)).all()
-    funcionarios_out = [FuncionarioOut.from_orm(f) for f in funcionarios_na_pagina]
+    funcionarios_na_pagina, paginacao = pagina_consulta(
+        db, query, [Funcionario.id], page, page_size, cursor, contar_total
+    )
+    funcionarios_out = FuncionarioOut.lista_from_orm(
+        funcionarios_na_pagina, incluir_cpf
+    )
 
-    return {
-        "total_in_page": len(funcionarios_out),
-        "page": page,
-        "page_size": page_size,
-        "total_pages": ceil(total / page_size) if total else 0,
-        "items": funcionarios_out,
-    }
+    return {**paginacao, "items": funcionarios_out}
 
 
 @router.delete(
@@ -336,7 +345,7 @@ def deleta_funcionario(
         )
 
     db.delete(funcionario)
-    guarda_acao(db, AcoesEnum.DELETAR_FUNCIONARIO, ator["cpf"], funcionario.id)
+    guarda_acao(db, AcoesEnum.DELETAR_FUNCIONARIO, ator, funcionario.id)
     return {"message": "Funcionário deletado com sucesso"}
 
 
@@ -370,7 +379,7 @@ def desativa_funcionario(
     funcionario.data_saida = data_saida
 
     db.flush()
-    guarda_acao(db, AcoesEnum.DESATIVAR_FUNCIONARIO, ator["cpf"], funcionario.id)
+    guarda_acao(db, AcoesEnum.DESATIVAR_FUNCIONARIO, ator, funcionario.id)
 
     return {"message": "Funcionário desativado com sucesso"}
 
@@ -400,6 +409,6 @@ def anonimiza_funcionario(
     funcionario.email = None
 
     db.flush()
-    guarda_acao(db, AcoesEnum.ANONIMIZAR_FUNCIONARIO, ator["cpf"], funcionario.id)
+    guarda_acao(db, AcoesEnum.ANONIMIZAR_FUNCIONARIO, ator, funcionario.id)
 
     return {"message": "Funcionário desativado com sucesso"}
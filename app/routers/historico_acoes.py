@@ -1,15 +1,17 @@
 import json
-from math import ceil
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func, select, extract
+from sqlalchemy import select
 from sqlalchemy.orm import aliased
 
-from app.core.seguranca import descriptografa_cpf
-from app.schemas.acoes import AcaoPaginationOut
+from app.schemas.acoes import AcaoPaginationOut, FilaAuditoriaOut
 
+from ..core.cpfs import INCLUIR_CPF_DESCRICAO, descriptografa_cpfs
+from ..core.fila_auditoria import metricas_fila
 from ..core.permissoes import requer_permissao
 from ..models.db_setup import conexao_bd
 from ..models.models import HistoricoAcoes, Usuario
+from ..utils.intervalos import intervalo_ano, intervalo_mes
+from ..utils.paginacao import CONTAR_TOTAL_DESCRICAO, CURSOR_DESCRICAO, pagina_consulta
 
 acoes_router = APIRouter(
     prefix="/historico_acoes",
@@ -32,19 +34,25 @@ def pega_acoes(
     ),
     ano: int | None = Query(
         default=None,
+        ge=1900,
+        le=2100,
         description="Ano específico para filtrar (obrigatório se mes for usado)",
     ),
     page: int = Query(1, ge=1, description="Número da página (padrão 1)"),
     page_size: int = Query(
         10, ge=1, le=100, description="Quantidade de registros por página (padrão 10)"
     ),
+    cursor: str | None = Query(None, description=CURSOR_DESCRICAO),
+    contar_total: bool = Query(False, description=CONTAR_TOTAL_DESCRICAO),
+    incluir_cpf: bool = Query(True, description=INCLUIR_CPF_DESCRICAO),
 ):
     ator = aliased(Usuario, name="ator")
     alvo = aliased(Usuario, name="alvo")
 
     query = (
         select(HistoricoAcoes, ator, alvo)
-        .join(ator, HistoricoAcoes.usuario_id_ator == ator.id)
+        # Sem chave estrangeira, ator e alvo podem ter sido removidos
+        .join(ator, HistoricoAcoes.usuario_id_ator == ator.id, isouter=True)
         .join(alvo, HistoricoAcoes.usuario_id_alvo == alvo.id, isouter=True)
     )
 
@@ -55,42 +63,61 @@ def pega_acoes(
             detail="Se 'mes' for informado, 'ano' também deve ser fornecido",
         )
 
-    if mes is not None and ano is not None:
-        query = query.where(
-            extract("month", HistoricoAcoes.data) == mes,
-            extract("year", HistoricoAcoes.data) == ano,
-        )
+    if ano is not None:
+        if mes is not None:
+            inicio, fim = intervalo_mes(ano, mes)
+        else:
+            inicio, fim = intervalo_ano(ano)
+        query = query.where(HistoricoAcoes.data >= inicio, HistoricoAcoes.data < fim)
 
-    elif ano is not None:
-        query = query.where(
-            extract("year", HistoricoAcoes.data) == ano,
-        )
+    acoes_na_pagina, paginacao = pagina_consulta(
+        db,
+        query,
+        [HistoricoAcoes.id],
+        page,
+        page_size,
+        cursor,
+        contar_total,
+        escalar=False,
+    )
 
-    # paginação
-    offset = (page - 1) * page_size
-    total = db.scalar(select(func.count()).select_from(query.subquery()))
-    acoes_na_pagina = db.execute(query.offset(offset).limit(page_size)).all()
+    # Atores se repetem entre as linhas: cada CPF distinto é descriptografado
+    # uma vez só, junto com os demais da página
+    cifrados = [ator.cpf_cript if ator else None for _, ator, _ in acoes_na_pagina] + [
+        alvo.cpf_cript if alvo else None for _, _, alvo in acoes_na_pagina
+    ]
+    if incluir_cpf:
+        cpfs = descriptografa_cpfs(cifrados)
+    else:
+        cpfs = [None] * len(cifrados)
+    cpfs_ator, cpfs_alvo = cpfs[: len(acoes_na_pagina)], cpfs[len(acoes_na_pagina) :]
 
     itens = [
         {
             "id": historico.id,
-            "ator_id": ator.id,
-            "ator_nome": ator.nome,
-            "ator_cpf": descriptografa_cpf(ator.cpf_cript),
+            "ator_id": historico.usuario_id_ator,
+            "ator_nome": ator.nome if ator else None,
+            "ator_cpf": ator_cpf,
             "acao": historico.acao,
             "alvo_id": alvo.id if alvo else None,
             "alvo_nome": alvo.nome if alvo else None,
-            "alvo_cpf": descriptografa_cpf(alvo.cpf_cript) if alvo else None,
+            "alvo_cpf": alvo_cpf,
             "data": historico.data,
             "info_adicional": json.loads(historico.info) if historico.info else {},
         }
-        for historico, ator, alvo in acoes_na_pagina
+        for (historico, ator, alvo), ator_cpf, alvo_cpf in zip(
+            acoes_na_pagina, cpfs_ator, cpfs_alvo
+        )
     ]
 
-    return {
-        "total_in_page": len(acoes_na_pagina),
-        "page": page,
-        "page_size": page_size,
-        "total_pages": ceil(total / page_size) if total else 0,
-        "items": itens,
-    }
+    return {**paginacao, "items": itens}
+
+
+@router.get(
+    "/fila",
+    summary="Mostra o estado da fila de gravação do histórico",
+    response_model=FilaAuditoriaOut,
+    dependencies=[Depends(requer_permissao("admin"))],
+)
+def pega_metricas_fila():
+    return metricas_fila()
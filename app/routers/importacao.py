@@ -0,0 +1,128 @@
+import os
+from datetime import datetime
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from ..core.permissoes import requer_permissao
+from ..core.tarefas_importacao import STATUS_FINAIS, tarefa_livre
+from ..models.db_setup import conexao_bd
+from ..models.models import RejeicaoImportacao, StatusTarefa, TarefaImportacao
+from ..schemas.importacao import RejeicaoPaginationOut, TarefaImportacaoOut
+from ..utils.paginacao import CONTAR_TOTAL_DESCRICAO, CURSOR_DESCRICAO, pagina_consulta
+
+importacao_router = APIRouter(
+    prefix="/importacoes",
+    tags=["Importações"],
+)
+
+router = importacao_router
+
+
+def busca_tarefa(db: Session, tarefa_id: int, ator: dict) -> TarefaImportacao:
+    """
+    Busca a tarefa visível para o ator: funcionários só enxergam as
+    importações que eles mesmos enviaram; admins enxergam todas.
+    """
+    tarefa = db.get(TarefaImportacao, tarefa_id)
+    if not tarefa or (ator["tipo"] != "admin" and tarefa.usuario_id_ator != ator["id"]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tarefa de importação não encontrada",
+        )
+    return tarefa
+
+
+@router.get(
+    "/{tarefa_id}",
+    summary="Mostra o status e o progresso de uma importação",
+    response_model=TarefaImportacaoOut,
+)
+def status_importacao(
+    tarefa_id: int,
+    db: conexao_bd,
+    ator: Annotated[dict, Depends(requer_permissao("funcionario", "admin"))],
+):
+    return busca_tarefa(db, tarefa_id, ator)
+
+
+@router.get(
+    "/{tarefa_id}/rejeitadas",
+    summary="Lista as linhas rejeitadas de uma importação e seus motivos",
+    response_model=RejeicaoPaginationOut,
+)
+def rejeitadas_importacao(
+    tarefa_id: int,
+    db: conexao_bd,
+    ator: Annotated[dict, Depends(requer_permissao("funcionario", "admin"))],
+    page: int = Query(1, ge=1, description="Número da página (padrão 1)"),
+    page_size: int = Query(
+        10, ge=1, le=100, description="Quantidade de registros por página (padrão 10)"
+    ),
+    cursor: str | None = Query(None, description=CURSOR_DESCRICAO),
+    contar_total: bool = Query(False, description=CONTAR_TOTAL_DESCRICAO),
+):
+    busca_tarefa(db, tarefa_id, ator)
+    query = (
+        select(RejeicaoImportacao)
+        .where(RejeicaoImportacao.tarefa_id == tarefa_id)
+        .order_by(RejeicaoImportacao.id)
+    )
+    rejeitadas, paginacao = pagina_consulta(
+        db, query, [RejeicaoImportacao.id], page, page_size, cursor, contar_total
+    )
+    return {**paginacao, "items": rejeitadas}
+
+
+@router.post(
+    "/{tarefa_id}/cancelar",
+    summary="Cancela uma importação",
+    description=(
+        "Uma importação pendente é cancelada na hora. Uma em andamento para "
+        "antes do próximo lote; os lotes já importados são mantidos."
+    ),
+    response_model=TarefaImportacaoOut,
+)
+def cancela_importacao(
+    tarefa_id: int,
+    db: conexao_bd,
+    ator: Annotated[dict, Depends(requer_permissao("funcionario", "admin"))],
+):
+    tarefa = busca_tarefa(db, tarefa_id, ator)
+    if tarefa.status in STATUS_FINAIS:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"A importação já terminou com status {tarefa.status.value}",
+        )
+
+    # Condicional para não competir com um trabalhador reivindicando a tarefa
+    agora = datetime.now()
+    parada = (
+        db.execute(
+            update(TarefaImportacao)
+            .where(TarefaImportacao.id == tarefa_id, tarefa_livre(agora))
+            .values(
+                status=StatusTarefa.cancelada,
+                cancelamento_solicitado=True,
+                dono=None,
+                atualizada_em=agora,
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        == 1
+    )
+    if not parada:
+        db.execute(
+            update(TarefaImportacao)
+            .where(TarefaImportacao.id == tarefa_id)
+            .values(cancelamento_solicitado=True, atualizada_em=agora)
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    db.refresh(tarefa)
+
+    # Em andamento, o próprio trabalhador remove o arquivo ao parar
+    if parada and os.path.exists(tarefa.arquivo):
+        os.remove(tarefa.arquivo)
+    return tarefa
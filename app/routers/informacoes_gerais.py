@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 
 from sqlalchemy.orm import Session
 
+from app.core.cache import CacheVersionado
 from app.core.historico_acoes import AcoesEnum, guarda_acao
 from ..core.permissoes import requer_permissao
 from ..models.models import InformacoesGerais
@@ -42,7 +43,7 @@ def create_or_replace_info(
     guarda_acao(
         db,
         AcoesEnum.ATUALIZAR_INFOS_GERAIS,
-        ator["cpf"],
+        ator,
         info_adicional=InformacoesGeraisDTO.model_validate(
             novo_registro, from_attributes=True
         ).model_dump_json(),
@@ -57,8 +58,8 @@ def create_or_replace_info(
     response_model=InformacoesGeraisDTO,
     dependencies=[Depends(requer_permissao("funcionario", "admin"))],
 )
-def read_info(db: Session = Depends(get_bd)):
-    info = get_informacoes_gerais(db)
+def read_info(db: Session = Depends(get_bd)) -> InformacoesGeraisDTO:
+    info = cache_informacoes_gerais.obter(db)
     if not info:
         raise HTTPException(
             status_code=404, detail="Informações gerais não encontradas."
@@ -92,7 +93,7 @@ def update_info(
         guarda_acao(
             db,
             AcoesEnum.ATUALIZAR_INFOS_GERAIS,
-            ator["cpf"],
+            ator,
             1,
         )
         return record
@@ -104,6 +105,19 @@ def get_informacoes_gerais(db: Session) -> InformacoesGerais | None:
     return db.query(InformacoesGerais).first()
 
 
+def _carrega_informacoes_gerais(db: Session) -> InformacoesGeraisDTO | None:
+    info = get_informacoes_gerais(db)
+    if not info:
+        return None
+    return InformacoesGeraisDTO.model_validate(info, from_attributes=True)
+
+
+# Invalidado automaticamente por qualquer escrita em InformacoesGerais
+cache_informacoes_gerais = CacheVersionado(
+    "informacoes_gerais", InformacoesGerais, _carrega_informacoes_gerais
+)
+
+
 def update_informacoes_gerais(
     db: Session, data: InformacoesGeraisDTO
 ) -> InformacoesGerais:
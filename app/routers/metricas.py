@@ -0,0 +1,82 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.pool import QueuePool
+
+from ..core.cache import caches_registrados
+from ..core.cpfs import estatisticas_cache
+from ..core.fila_auditoria import metricas_fila
+from ..core.metricas import TIPO_CONTEUDO, Contador, Medidor, exporta_metricas
+from ..models.db_setup import engine
+
+metricas_router = APIRouter(tags=["Métricas"])
+
+router = metricas_router
+
+
+def _acessos_caches(tipo: str) -> dict[tuple[str, ...], float]:
+    valores: dict[tuple[str, ...], float] = {
+        (cache.chave,): getattr(cache, tipo) for cache in caches_registrados()
+    }
+    valores[("cpfs",)] = estatisticas_cache[tipo]
+    return valores
+
+
+def _conexoes_pool() -> dict[tuple[str, ...], float]:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {}
+    return {("em_uso",): pool.checkedout(), ("livres",): pool.checkedin()}
+
+
+Contador(
+    "ru_cache_acertos_total",
+    "Leituras atendidas pelo cache (para os CPFs, CPFs distintos por página)",
+    ("cache",),
+    coleta=lambda: _acessos_caches("acertos"),
+)
+Contador(
+    "ru_cache_falhas_total",
+    "Leituras que precisaram ir ao banco ou descriptografar",
+    ("cache",),
+    coleta=lambda: _acessos_caches("falhas"),
+)
+Medidor(
+    "ru_bd_pool_conexoes",
+    "Conexões do pool do engine síncrono por estado",
+    ("estado",),
+    coleta=_conexoes_pool,
+)
+Medidor(
+    "ru_auditoria_fila_profundidade",
+    "Ações esperando gravação na fila do histórico",
+    coleta=lambda: {(): metricas_fila()["profundidade"]},
+)
+Medidor(
+    "ru_auditoria_fila_capacidade",
+    "Tamanho máximo da fila do histórico",
+    coleta=lambda: {(): metricas_fila()["capacidade"]},
+)
+Contador(
+    "ru_auditoria_acoes_total",
+    "Ações que passaram pela fila do histórico, por resultado",
+    ("resultado",),
+    coleta=lambda: {
+        (resultado,): metricas_fila()[resultado]
+        for resultado in (
+            "enfileiradas",
+            "gravadas",
+            "descartadas",
+            "diretas",
+            "falhas",
+        )
+    },
+)
+
+
+@router.get(
+    "/metrics",
+    summary="Métricas de operação no formato de texto do Prometheus",
+    response_class=PlainTextResponse,
+)
+def metricas():
+    return PlainTextResponse(exporta_metricas(), media_type=TIPO_CONTEUDO)
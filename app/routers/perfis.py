@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from ..core.perfil import caminho_perfil, lista_perfis, resumo_perfil
+from ..core.permissoes import requer_permissao
+
+perfis_router = APIRouter(
+    prefix="/perfis",
+    tags=["Perfis"],
+    dependencies=[Depends(requer_permissao("admin"))],
+)
+
+router = perfis_router
+
+
+@router.get(
+    "/",
+    summary="Lista os perfis de requisição guardados, do mais novo ao mais antigo",
+)
+def perfis() -> list[str]:
+    return lista_perfis()
+
+
+@router.get(
+    "/{nome}",
+    summary="Baixa um perfil no formato do pstats ou um resumo em texto",
+)
+def baixa_perfil(
+    nome: str,
+    resumo: bool = Query(
+        False, description="Devolve as funções com maior tempo acumulado em texto"
+    ),
+    linhas: int = Query(40, ge=1, le=1000, description="Funções no resumo"),
+):
+    caminho = caminho_perfil(nome)
+    if caminho is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Perfil não encontrado"
+        )
+    if resumo:
+        return PlainTextResponse(resumo_perfil(caminho, linhas))
+    return FileResponse(caminho, media_type="application/octet-stream", filename=nome)
@@ -1,290 +1,135 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, Path
 
-from sqlalchemy import Subquery, select, func
+from sqlalchemy import and_, select, func
 from sqlalchemy.orm import Session
 from ..core.permissoes import requer_permissao
 
-from ..models.models import Compra, Cliente, Funcionario
+from ..models.models import (
+    Cliente,
+    ClienteTipo,
+    Funcionario,
+    FuncionarioTipo,
+    ResumoMensalCompras,
+)
 from ..routers.informacoes_gerais import read_info
 from ..models.db_setup import get_bd
 
+from ..utils.intervalos import intervalo_mes
 from ..schemas.relatorio import AlunosRegistrados, PorTipoCliente, RelatorioOut
 
 relatorio_router = APIRouter(prefix="/relatorio", tags=["Relatório"])
 router = relatorio_router
 
 
-def retorna_clientes_registrados(bd: Session, query_alunos_totais: Subquery):
-    num_externos = bd.scalar(
-        select(func.count()).select_from(
-            select(Cliente).where(Cliente.tipo == "externo").subquery()
-        )
-    )
-    num_professores = bd.scalar(
-        select(func.count()).select_from(
-            select(Cliente).where(Cliente.tipo == "professor").subquery()
-        )
-    )
-    num_tecnicos = bd.scalar(
-        select(func.count()).select_from(
-            select(Cliente).where(Cliente.tipo == "tecnico").subquery()
-        )
-    )
-
-    num_clientes_totais = bd.scalar(select(func.count()).select_from(Cliente))
-
-    num_alunos_totais = bd.scalar(select(func.count()).select_from(query_alunos_totais))
-    num_pos_graduacao = bd.scalar(
-        select(func.count())
-        .select_from(query_alunos_totais)
-        .where(
-            query_alunos_totais.columns.graduando.is_(False),
-            query_alunos_totais.columns.pos_graduando.is_(True),
-        )
-    )
-    num_graduacao = bd.scalar(
-        select(func.count())
-        .select_from(query_alunos_totais)
-        .where(
-            query_alunos_totais.columns.graduando.is_(True),
-            query_alunos_totais.columns.pos_graduando.is_(False),
-        )
-    )
-    num_graduacao_e_pos_graduacao = bd.scalar(
-        select(func.count())
-        .select_from(query_alunos_totais)
-        .where(
-            query_alunos_totais.columns.graduando.is_(True),
-            query_alunos_totais.columns.pos_graduando.is_(True),
-        )
-    )
-    num_bolsistas = bd.scalar(
-        select(func.count())
-        .select_from(query_alunos_totais)
-        .where(
-            query_alunos_totais.columns.bolsista.is_(True),
-        )
-    )
-
-    return PorTipoCliente(
-        total=num_clientes_totais or 0,
-        externos=num_externos or 0,
-        professores=num_professores or 0,
-        tecnicos=num_tecnicos or 0,
-        alunos=AlunosRegistrados(
-            total=num_alunos_totais or 0,
-            pos_graduacao=num_pos_graduacao or 0,
-            em_graduacao=num_graduacao or 0,
-            ambos=num_graduacao_e_pos_graduacao or 0,
-            bolsistas=num_bolsistas or 0,
-        ),
-    )
-
-
-def retorna_compras_por_tipo(
-    bd: Session,
-    query_compras_mes: Subquery,
-    query_alunos_totais: Subquery,
-):
-    clientes_totais = select(Cliente.id)
-    compras_totais = bd.scalar(
-        select(func.count())
-        .select_from(query_compras_mes)
-        .where(query_compras_mes.columns.usuario_id.in_(clientes_totais))
-    )
-
-    clientes_externos = clientes_totais.where(Cliente.tipo == "externo")
-    clientes_professores = clientes_totais.where(Cliente.tipo == "professor")
-    clientes_tecnicos = clientes_totais.where(Cliente.tipo == "tecnico")
-
-    compras_externos = bd.scalar(
-        select(func.count())
-        .select_from(query_compras_mes)
-        .where(
-            query_compras_mes.columns.usuario_id.in_(clientes_externos),
-        )
-    )
-    compras_professores = bd.scalar(
-        select(func.count())
-        .select_from(query_compras_mes)
-        .where(
-            query_compras_mes.columns.usuario_id.in_(clientes_professores),
-        )
-    )
-    compras_tecnicos = bd.scalar(
-        select(func.count())
-        .select_from(query_compras_mes)
-        .where(
-            query_compras_mes.columns.usuario_id.in_(clientes_tecnicos),
-        )
-    )
-
-    alunos_total = clientes_totais.where(Cliente.tipo == "aluno")
-    compras_totais_alunos = bd.scalar(
-        select(func.count())
-        .select_from(query_compras_mes)
-        .where(query_compras_mes.columns.usuario_id.in_(alunos_total))
-    )
-    compras_pos_graduacao = bd.scalar(
-        select(func.count())
-        .select_from(query_compras_mes)
-        .where(
-            query_compras_mes.columns.usuario_id.in_(
-                select(query_alunos_totais.columns.id).where(
-                    query_alunos_totais.columns.graduando.is_(False),
-                    query_alunos_totais.columns.pos_graduando.is_(True),
-                )
-            )
-        )
-    )
-    compras_graduacao = bd.scalar(
-        select(func.count())
-        .select_from(query_compras_mes)
-        .where(
-            query_compras_mes.columns.usuario_id.in_(
-                select(query_alunos_totais.columns.id).where(
-                    query_alunos_totais.columns.graduando.is_(True),
-                    query_alunos_totais.columns.pos_graduando.is_(False),
-                )
-            )
-        )
-    )
-    compras_graduacao_e_pos_graduacao = bd.scalar(
-        select(func.count())
-        .select_from(query_compras_mes)
-        .where(
-            query_compras_mes.columns.usuario_id.in_(
-                select(query_alunos_totais.columns.id).where(
-                    query_alunos_totais.columns.graduando.is_(True),
-                    query_alunos_totais.columns.pos_graduando.is_(True),
-                )
-            )
-        )
-    )
-    compras_bolsistas = bd.scalar(
-        select(func.count())
-        .select_from(query_compras_mes)
-        .where(
-            query_compras_mes.columns.usuario_id.in_(
-                select(query_alunos_totais.columns.id).where(
-                    query_alunos_totais.columns.bolsista.is_(True),
-                )
-            )
-        )
-    )
+def filtros_por_tipo_cliente(
+    tipo, graduando, pos_graduando, bolsista, e_cliente
+) -> dict:
+    """
+    Monta as condições de cada categoria do relatório a partir das colunas
+    de classificação do cliente, para uso em agregações condicionais.
+    """
+    aluno = tipo == ClienteTipo.aluno.value
+    return {
+        "total": e_cliente,
+        "externos": tipo == ClienteTipo.externo.value,
+        "professores": tipo == ClienteTipo.professor.value,
+        "tecnicos": tipo == ClienteTipo.tecnico.value,
+        "alunos": aluno,
+        "pos_graduacao": and_(aluno, graduando.is_(False), pos_graduando.is_(True)),
+        "em_graduacao": and_(aluno, graduando.is_(True), pos_graduando.is_(False)),
+        "ambos": and_(aluno, graduando.is_(True), pos_graduando.is_(True)),
+        "bolsistas": and_(aluno, bolsista.is_(True)),
+    }
+
+
+def monta_por_tipo(valores, prefixo: str = "") -> PorTipoCliente:
+    def valor(nome: str) -> int:
+        return valores[f"{prefixo}{nome}"] or 0
 
     return PorTipoCliente(
-        total=compras_totais or 0,
-        externos=compras_externos or 0,
-        professores=compras_professores or 0,
-        tecnicos=compras_tecnicos or 0,
+        total=valor("total"),
+        externos=valor("externos"),
+        professores=valor("professores"),
+        tecnicos=valor("tecnicos"),
         alunos=AlunosRegistrados(
-            total=compras_totais_alunos or 0,
-            pos_graduacao=compras_pos_graduacao or 0,
-            em_graduacao=compras_graduacao or 0,
-            ambos=compras_graduacao_e_pos_graduacao or 0,
-            bolsistas=compras_bolsistas or 0,
+            total=valor("alunos"),
+            pos_graduacao=valor("pos_graduacao"),
+            em_graduacao=valor("em_graduacao"),
+            ambos=valor("ambos"),
+            bolsistas=valor("bolsistas"),
         ),
     )
 
 
-def retorna_faturamento_por_tipo(
-    bd: Session,
-    query_compras_mes: Subquery,
-    query_alunos_totais: Subquery,
-    faturamento_total: int,
-):
-    clientes_totais = select(Cliente.id)
-    clientes_externos = clientes_totais.where(Cliente.tipo == "externo")
-    clientes_professores = clientes_totais.where(Cliente.tipo == "professor")
-    clientes_tecnicos = clientes_totais.where(Cliente.tipo == "tecnico")
-
-    faturamento_externos = bd.scalar(
-        select(func.sum(query_compras_mes.columns.preco_compra))
-        .select_from(query_compras_mes)
-        .where(query_compras_mes.columns.usuario_id.in_(clientes_externos))
-    )
-    faturamento_professores = bd.scalar(
-        select(func.sum(query_compras_mes.columns.preco_compra))
-        .select_from(query_compras_mes)
-        .where(query_compras_mes.columns.usuario_id.in_(clientes_professores))
-    )
-    faturamento_tecnicos = bd.scalar(
-        select(func.sum(query_compras_mes.columns.preco_compra))
-        .select_from(query_compras_mes)
-        .where(
-            query_compras_mes.columns.usuario_id.in_(clientes_tecnicos),
-        )
-    )
-
-    alunos_total = clientes_totais.where(Cliente.tipo == "aluno")
-    faturamento_total_alunos = bd.scalar(
-        select(func.sum(query_compras_mes.columns.preco_compra))
-        .select_from(query_compras_mes)
-        .where(query_compras_mes.columns.usuario_id.in_(alunos_total))
-    )
-    faturamento_pos_graduacao = bd.scalar(
-        select(func.sum(query_compras_mes.columns.preco_compra))
-        .select_from(query_compras_mes)
-        .where(
-            query_compras_mes.columns.usuario_id.in_(
-                select(query_alunos_totais.columns.id).where(
-                    query_alunos_totais.columns.graduando.is_(False),
-                    query_alunos_totais.columns.pos_graduando.is_(True),
-                )
-            )
-        )
-    )
-    faturamento_graduacao = bd.scalar(
-        select(func.sum(query_compras_mes.columns.preco_compra))
-        .select_from(query_compras_mes)
-        .where(
-            query_compras_mes.columns.usuario_id.in_(
-                select(query_alunos_totais.columns.id).where(
-                    query_alunos_totais.columns.graduando.is_(True),
-                    query_alunos_totais.columns.pos_graduando.is_(False),
-                )
-            )
-        )
-    )
-    faturamento_graduacao_e_pos_graduacao = bd.scalar(
-        select(func.sum(query_compras_mes.columns.preco_compra))
-        .select_from(query_compras_mes)
-        .where(
-            query_compras_mes.columns.usuario_id.in_(
-                select(query_alunos_totais.columns.id).where(
-                    query_alunos_totais.columns.graduando.is_(True),
-                    query_alunos_totais.columns.pos_graduando.is_(True),
-                )
-            )
-        )
-    )
-    faturamento_bolsistas = bd.scalar(
-        select(func.sum(query_compras_mes.columns.preco_compra))
-        .select_from(query_compras_mes)
-        .where(
-            query_compras_mes.columns.usuario_id.in_(
-                select(query_alunos_totais.columns.id).where(
-                    query_alunos_totais.columns.bolsista.is_(True),
-                )
-            )
-        )
-    )
-
-    return PorTipoCliente(
-        total=faturamento_total or 0,
-        externos=faturamento_externos or 0,
-        professores=faturamento_professores or 0,
-        tecnicos=faturamento_tecnicos or 0,
-        alunos=AlunosRegistrados(
-            total=faturamento_total_alunos or 0,
-            pos_graduacao=faturamento_pos_graduacao or 0,
-            em_graduacao=faturamento_graduacao or 0,
-            ambos=faturamento_graduacao_e_pos_graduacao or 0,
-            bolsistas=faturamento_bolsistas or 0,
-        ),
-    )
+def retorna_clientes_registrados(bd: Session) -> PorTipoCliente:
+    filtros = filtros_por_tipo_cliente(
+        Cliente.tipo,
+        Cliente.graduando,
+        Cliente.pos_graduando,
+        Cliente.bolsista,
+        e_cliente=Cliente.id.is_not(None),
+    )
+    query = select(
+        *(func.count().filter(filtro).label(nome) for nome, filtro in filtros.items())
+    ).select_from(Cliente)
+    return monta_por_tipo(bd.execute(query).one()._mapping)
+
+
+def retorna_compras_e_faturamento_por_tipo(
+    bd: Session, ano: int, mes: int
+) -> tuple[int, PorTipoCliente, PorTipoCliente]:
+    """
+    Lê do resumo mensal o faturamento bruto do mês e a quantidade de compras
+    e o faturamento de cada categoria de cliente.
+    """
+    resumo = ResumoMensalCompras
+    filtros = filtros_por_tipo_cliente(
+        resumo.tipo_cliente,
+        resumo.graduando,
+        resumo.pos_graduando,
+        resumo.bolsista,
+        e_cliente=resumo.tipo_cliente != resumo.SEM_CATEGORIA,
+    )
+    colunas = [func.sum(resumo.faturamento).label("faturamento_bruto")]
+    for nome, filtro in filtros.items():
+        colunas.append(
+            func.sum(resumo.quantidade).filter(filtro).label(f"compras_{nome}")
+        )
+        colunas.append(
+            func.sum(resumo.faturamento).filter(filtro).label(f"faturamento_{nome}")
+        )
+
+    query = select(*colunas).where(resumo.ano == ano, resumo.mes == mes)
+    valores = bd.execute(query).one()._mapping
+
+    faturamento_bruto = valores["faturamento_bruto"] or 0
+    faturamento_por_tipo = monta_por_tipo(valores, "faturamento_")
+    # O faturamento total inclui compras de usuários que não são clientes
+    faturamento_por_tipo.total = faturamento_bruto
+    return (
+        faturamento_bruto,
+        monta_por_tipo(valores, "compras_"),
+        faturamento_por_tipo,
+    )
+
+
+def retorna_funcionarios(bd: Session, ano: int, mes: int):
+    inicio, fim = intervalo_mes(ano, mes)
+    query = select(
+        func.count()
+        .filter(Funcionario.tipo == FuncionarioTipo.funcionario)
+        .label("funcionarios"),
+        func.count().filter(Funcionario.tipo == FuncionarioTipo.admin).label("admins"),
+        func.count().filter(Funcionario.data_saida.is_not(None)).label("desativados"),
+        func.count()
+        .filter(
+            Funcionario.data_entrada >= inicio.date(),
+            Funcionario.data_entrada < fim.date(),
+        )
+        .label("adicionados"),
+    ).select_from(Funcionario)
+    return bd.execute(query).one()
 
 
 @router.get(
@@ -299,71 +144,20 @@ def relatorio_get(
 ) -> RelatorioOut:
     nome_empresa = read_info(bd).nome_empresa
 
-    query_compras_mes = select(Compra).where(
-        func.strftime("%Y", Compra.horario) == str(ano),
-        func.strftime("%m", Compra.horario) == f"{mes:02d}",
-    )
-    faturamento_mensal = bd.scalar(
-        select(func.sum(Compra.preco_compra)).where(
-            func.strftime("%Y", Compra.horario) == str(ano),
-            func.strftime("%m", Compra.horario) == f"{mes:02d}",
-        )
-    )
-
-    query_funcionarios_novos = select(Funcionario).where(
-        func.strftime("%Y", Funcionario.data_entrada) == str(ano),
-        func.strftime("%m", Funcionario.data_entrada) == f"{mes:02d}",
-    )
-    num_adicionados = bd.scalar(
-        select(func.count()).select_from(query_funcionarios_novos.subquery())
-    )
-    num_funcionarios = bd.scalar(
-        select(func.count()).select_from(
-            select(Funcionario).where(Funcionario.tipo == "funcionario").subquery()
-        )
-    )
-    num_admins = bd.scalar(
-        select(func.count()).select_from(
-            select(Funcionario).where(Funcionario.tipo == "admin").subquery()
-        )
-    )
-    num_desativados = bd.scalar(
-        select(func.count()).select_from(
-            select(Funcionario).where(Funcionario.data_saida.is_not(None)).subquery()
-        )
-    )
-
-    query_alunos_totais = (
-        select(Cliente.id, Cliente.graduando, Cliente.pos_graduando, Cliente.bolsista)
-        .where(Cliente.tipo == "aluno")
-        .subquery()
-    )
-
-    clientes_registrados = retorna_clientes_registrados(
-        bd=bd, query_alunos_totais=query_alunos_totais
-    )
-
-    compras_por_tipo = retorna_compras_por_tipo(
-        bd=bd,
-        query_compras_mes=query_compras_mes.subquery(),
-        query_alunos_totais=query_alunos_totais,
-    )
-
-    faturamento_por_tipo = retorna_faturamento_por_tipo(
-        bd=bd,
-        query_compras_mes=query_compras_mes.subquery(),
-        query_alunos_totais=query_alunos_totais,
-        faturamento_total=faturamento_mensal or 0,
+    funcionarios = retorna_funcionarios(bd, ano, mes)
+    clientes_registrados = retorna_clientes_registrados(bd)
+    faturamento_mensal, compras_por_tipo, faturamento_por_tipo = (
+        retorna_compras_e_faturamento_por_tipo(bd, ano, mes)
     )
 
     return RelatorioOut(
         nome_empresa=nome_empresa,
-        faturamento_bruto_mensal=faturamento_mensal or 0,
+        faturamento_bruto_mensal=faturamento_mensal,
         clientes_registrados=clientes_registrados,
-        funcionarios_ativos=num_funcionarios or 0,
-        administradores_ativos=num_admins or 0,
-        desativados=num_desativados or 0,
-        funcionarios_adicionados_mes=num_adicionados or 0,
+        funcionarios_ativos=funcionarios.funcionarios,
+        administradores_ativos=funcionarios.admins,
+        desativados=funcionarios.desativados,
+        funcionarios_adicionados_mes=funcionarios.adicionados,
         compras_por_tipo=compras_por_tipo,
         faturamento_por_tipo=faturamento_por_tipo,
     )
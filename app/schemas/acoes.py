@@ -9,9 +9,10 @@ class AcaoOut(BaseModel):
     data: datetime
 
     ator_id: int
-    ator_nome: str
+    ator_nome: str | None
     ator_cpf: Annotated[
-        str, StringConstraints(strip_whitespace=True, min_length=11, max_length=11)
+        str | None,
+        StringConstraints(strip_whitespace=True, min_length=11, max_length=11),
     ]
 
     alvo_id: int | None = None
@@ -28,7 +29,8 @@ class AcaoPaginationOut(BaseModel):
     total_in_page: int
     page: int
     page_size: int
-    total_pages: int
+    total_pages: int | None
+    next_cursor: str | None = None
     items: list[AcaoOut]
 
     model_config = ConfigDict(
@@ -67,3 +69,18 @@ class AcaoPaginationOut(BaseModel):
             }
         }
     )
+
+
+class FilaAuditoriaOut(BaseModel):
+    modo: str
+    profundidade: int
+    capacidade: int
+    enfileiradas: int
+    gravadas: int
+    descartadas: int
+    diretas: int
+    falhas: int
+    lotes: int
+    ultima_latencia_ms: float
+    maior_latencia_ms: float
+    latencia_media_ms: float
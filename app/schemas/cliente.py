@@ -1,7 +1,7 @@
 from enum import Enum
 from typing import Annotated
 from pydantic import BaseModel, StringConstraints, ConfigDict, Field
-from ..core.seguranca import fernet
+from ..core.cpfs import ComCpfDescriptografado
 
 
 class ClienteEnum(str, Enum):
@@ -39,7 +39,7 @@ class ClienteIn(BaseModel):
     )
 
 
-class ClienteOut(BaseModel):
+class ClienteOut(ComCpfDescriptografado, BaseModel):
     id: int
     nome: str | None
     cpf: str | None = Field(..., description="CPF descriptografado")
@@ -50,12 +50,6 @@ class ClienteOut(BaseModel):
     pos_graduando: bool
     bolsista: bool
 
-    @classmethod
-    def from_orm(cls, obj):
-        data = obj.__dict__.copy()
-        data["cpf"] = obj.get_cpf(fernet)
-        return cls(**data)
-
     model_config = ConfigDict(
         from_attributes=True,
         json_schema_extra={
@@ -78,7 +72,8 @@ class ClientePaginationOut(BaseModel):
     total_in_page: int
     page: int
     page_size: int
-    total_pages: int
+    total_pages: int | None
+    next_cursor: str | None = None
     items: list[ClienteOut]
 
 
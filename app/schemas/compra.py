@@ -25,7 +25,8 @@ class CompraPaginationOut(BaseModel):
     total_in_page: int
     page: int
     page_size: int
-    total_pages: int
+    total_pages: int | None
+    next_cursor: str | None = None
     items: list[CompraOut]
 
 
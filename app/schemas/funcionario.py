@@ -2,7 +2,7 @@ from enum import Enum
 from pydantic import BaseModel, ConfigDict, EmailStr, StringConstraints, Field
 from datetime import date
 from typing import Annotated
-from ..core.seguranca import fernet
+from ..core.cpfs import ComCpfDescriptografado
 
 
 class TipoFuncionarioEnum(str, Enum):
@@ -10,7 +10,7 @@ class TipoFuncionarioEnum(str, Enum):
     admin = "admin"
 
 
-class FuncionarioOut(BaseModel):
+class FuncionarioOut(ComCpfDescriptografado, BaseModel):
     id: int
     nome: str | None
     cpf: str | None = Field(..., description="CPF descriptografado")
@@ -19,12 +19,6 @@ class FuncionarioOut(BaseModel):
     data_entrada: date
     data_saida: date | None
 
-    @classmethod
-    def from_orm(cls, obj):
-        data = obj.__dict__.copy()
-        data["cpf"] = obj.get_cpf(fernet)
-        return cls(**data)
-
 
 class FuncionarioIn(BaseModel):
     cpf: Annotated[
@@ -76,7 +70,8 @@ class FuncionarioPaginationOut(BaseModel):
     total_in_page: int
     page: int
     page_size: int
-    total_pages: int
+    total_pages: int | None
+    next_cursor: str | None = None
     items: list[FuncionarioOut]
 
     model_config = ConfigDict(
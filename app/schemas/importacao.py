@@ -0,0 +1,41 @@
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict
+
+from ..models.models import StatusTarefa
+
+
+class TarefaCriadaOut(BaseModel):
+    tarefa_id: int
+    status: StatusTarefa
+
+
+class TarefaImportacaoOut(BaseModel):
+    id: int
+    tipo: str
+    status: StatusTarefa
+    criada_em: datetime
+    atualizada_em: datetime
+    linhas_total: int | None
+    linhas_processadas: int
+    linhas_inseridas: int
+    linhas_rejeitadas: int
+    cancelamento_solicitado: bool
+    erro: str | None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RejeicaoOut(BaseModel):
+    linha: int
+    motivo: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RejeicaoPaginationOut(BaseModel):
+    total_in_page: int
+    page: int
+    page_size: int
+    total_pages: int | None
+    next_cursor: str | None = None
+    items: list[RejeicaoOut]
@@ -0,0 +1,25 @@
+import shutil
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import BinaryIO
+
+# Bloco usado para copiar uploads sem carregá-los inteiros na memória
+TAMANHO_BLOCO_COPIA = 1024 * 1024
+
+
+def copia_em_blocos(origem: BinaryIO, caminho: str) -> None:
+    with open(caminho, "wb") as destino:
+        shutil.copyfileobj(origem, destino, TAMANHO_BLOCO_COPIA)
+
+
+@contextmanager
+def arquivo_temporario(origem: BinaryIO, sufixo: str = "") -> Iterator[str]:
+    """
+    Copia `origem` em blocos para um arquivo temporário em disco, fornece
+    o caminho dele e o remove ao sair.
+    """
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = f"{diretorio}/upload{sufixo}"
+        copia_em_blocos(origem, caminho)
+        yield caminho
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+
+def intervalo_mes(ano: int, mes: int) -> tuple[datetime, datetime]:
+    """
+    Retorna o intervalo semiaberto [início, fim) que cobre o mês informado.
+    """
+    inicio = datetime(ano, mes, 1)
+    fim = datetime(ano + 1, 1, 1) if mes == 12 else datetime(ano, mes + 1, 1)
+    return inicio, fim
+
+
+def intervalo_ano(ano: int) -> tuple[datetime, datetime]:
+    """
+    Retorna o intervalo semiaberto [início, fim) que cobre o ano informado.
+    """
+    return datetime(ano, 1, 1), datetime(ano + 1, 1, 1)
@@ -0,0 +1,137 @@
+import base64
+import binascii
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+from math import ceil
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, func, select, tuple_
+from sqlalchemy.orm import InstrumentedAttribute, Session
+
+# CONFIG
+CONTAGEM_CACHE_SEGUNDOS = float(os.environ.get("CONTAGEM_CACHE_SEGUNDOS", 30))
+CONTAGEM_CACHE_MAXIMO = 256
+
+CURSOR_DESCRICAO = (
+    "Ativa a paginação por cursor: envie vazio na primeira página "
+    "e depois o next_cursor da resposta anterior (ignora page)"
+)
+CONTAR_TOTAL_DESCRICAO = "No modo cursor, também calcula total_pages (com cache)"
+
+_contagens: dict[tuple, tuple[float, int]] = {}
+_trava_contagens = threading.Lock()
+
+
+def codifica_cursor(valores: tuple) -> str:
+    serializaveis = [
+        v.isoformat() if isinstance(v, (date, datetime)) else v for v in valores
+    ]
+    texto = json.dumps(serializaveis, separators=(",", ":"))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+def decodifica_cursor(cursor: str, chave: list[InstrumentedAttribute]) -> tuple:
+    try:
+        preenchido = cursor + "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(preenchido))
+        if not isinstance(valores, list) or len(valores) != len(chave):
+            raise ValueError
+        convertidos = []
+        for coluna, valor in zip(chave, valores):
+            tipo = coluna.type.python_type
+            if tipo in (date, datetime):
+                valor = tipo.fromisoformat(valor)
+            elif not isinstance(valor, tipo):
+                raise ValueError
+            convertidos.append(valor)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido"
+        )
+    return tuple(convertidos)
+
+
+def conta_com_cache(db: Session, query: Select) -> int:
+    """
+    Conta as linhas da query, reaproveitando o resultado por até
+    CONTAGEM_CACHE_SEGUNDOS para a mesma consulta e parâmetros.
+    """
+    compilada = query.compile(dialect=db.get_bind().dialect)
+    chave = (str(compilada), repr(sorted(compilada.params.items())))
+    agora = time.monotonic()
+
+    with _trava_contagens:
+        guardada = _contagens.get(chave)
+    if guardada and agora - guardada[0] < CONTAGEM_CACHE_SEGUNDOS:
+        return guardada[1]
+
+    total = db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+    with _trava_contagens:
+        if len(_contagens) >= CONTAGEM_CACHE_MAXIMO:
+            del _contagens[min(_contagens, key=lambda c: _contagens[c][0])]
+        _contagens[chave] = (agora, total)
+    return total
+
+
+def pagina_consulta(
+    db: Session,
+    query: Select,
+    chave: list[InstrumentedAttribute],
+    page: int,
+    page_size: int,
+    cursor: str | None = None,
+    contar_total: bool = False,
+    escalar: bool = True,
+) -> tuple[list, dict]:
+    """
+    Executa uma página da query e retorna os resultados e os campos de
+    paginação da resposta.
+
+    Sem `cursor`, usa OFFSET/LIMIT e sempre conta o total. Com `cursor`
+    (vazio na primeira página), ordena pela `chave` e continua a partir do
+    último registro da página anterior; o total só é contado se
+    `contar_total` for verdadeiro. `escalar` indica se a query retorna uma
+    entidade por linha; caso contrário a chave é lida da primeira coluna.
+    """
+    executar = db.scalars if escalar else db.execute
+
+    if cursor is None:
+        total = db.scalar(
+            select(func.count()).select_from(query.order_by(None).subquery())
+        )
+        offset = (page - 1) * page_size
+        resultados = executar(query.offset(offset).limit(page_size)).all()
+        return resultados, {
+            "total_in_page": len(resultados),
+            "page": page,
+            "page_size": page_size,
+            "total_pages": ceil(total / page_size) if total else 0,
+            "next_cursor": None,
+        }
+
+    total_pages = None
+    if contar_total:
+        total = conta_com_cache(db, query)
+        total_pages = ceil(total / page_size) if total else 0
+
+    query = query.order_by(None).order_by(*chave)
+    if cursor:
+        query = query.where(tuple_(*chave) > tuple_(*decodifica_cursor(cursor, chave)))
+    resultados = executar(query.limit(page_size + 1)).all()
+
+    proximo = None
+    if len(resultados) > page_size:
+        resultados = resultados[:page_size]
+        ultimo = resultados[-1] if escalar else resultados[-1][0]
+        proximo = codifica_cursor(tuple(getattr(ultimo, c.key) for c in chave))
+
+    return resultados, {
+        "total_in_page": len(resultados),
+        "page": page,
+        "page_size": page_size,
+        "total_pages": total_pages,
+        "next_cursor": proximo,
+    }
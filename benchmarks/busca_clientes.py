@@ -0,0 +1,139 @@
+"""
+Mede a latência da busca de clientes em todos os campos (a do balcão) com
+ILIKE e com o índice FTS5 trigram, para termos raros e comuns, na paginação
+por página (que conta o total) e por cursor.
+
+Uso: uv run -m benchmarks.busca_clientes --clientes 1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from unittest.mock import patch
+
+from .gerador import PRIMEIROS, SOBRENOMES
+
+TAMANHO_LOTE = 50_000
+
+
+def popula(engine, clientes: int, semente: int) -> None:
+    from sqlalchemy import insert
+
+    from app.models.models import Cliente, Usuario
+
+    aleatorio = random.Random(semente)
+    with engine.begin() as conexao:
+        for deslocamento in range(1, clientes + 1, TAMANHO_LOTE):
+            ids = range(deslocamento, min(deslocamento + TAMANHO_LOTE, clientes + 1))
+            conexao.execute(
+                insert(Usuario.__table__),
+                [
+                    {
+                        "id": i,
+                        "cpf_hash": f"{i:064d}",
+                        "nome": " ".join(
+                            [
+                                aleatorio.choice(PRIMEIROS),
+                                *aleatorio.sample(SOBRENOMES, 2),
+                            ]
+                        ),
+                        "subtipo": "cliente",
+                    }
+                    for i in ids
+                ],
+            )
+            conexao.execute(
+                insert(Cliente.__table__),
+                [
+                    {
+                        "usuario_id": i,
+                        "matricula": f"{2000 + i % 25}{i:05d}"[-9:],
+                        "tipo": "aluno",
+                        "graduando": True,
+                        "pos_graduando": False,
+                        "bolsista": False,
+                    }
+                    for i in ids
+                ],
+            )
+
+
+def cronometra(busca, termo: str, cursor: str | None, repeticoes: int):
+    from sqlalchemy.orm import Session
+
+    from app.models.db_setup import engine
+
+    tempos = []
+    for _ in range(repeticoes):
+        with Session(engine) as db:
+            inicio = time.perf_counter()
+            resposta = busca(
+                db,
+                termo_busca=termo,
+                tipo=None,
+                pagina=1,
+                tamanho_pagina=10,
+                cursor=cursor,
+                contar_total=False,
+                incluir_cpf=False,
+            )
+            tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resposta["total_in_page"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clientes", type=int, default=1_000_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        # O engine da aplicação é criado na importação, a partir desta URL
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(diretorio, 'b.db')}"
+        from sqlalchemy import update
+
+        from app.models.db_setup import engine
+        from app.models.models import Usuario
+        from app.routers import cliente as rotas_cliente
+
+        print(f"Populando {args.clientes} clientes...")
+        popula(engine, args.clientes, args.semente)
+
+        # Um cliente com nome único e um trecho de nome comum (~2,5% dos clientes)
+        with engine.begin() as conexao:
+            conexao.execute(
+                update(Usuario)
+                .where(Usuario.id == args.clientes // 2)
+                .values(nome="Zuleica Andrade Bezerra")
+            )
+        termos = [
+            ("raro", "zuleica"),
+            ("comum", "gabriela"),
+        ]
+        print(f"{'termo':<8}{'paginação':<12}{'ILIKE (ms)':>12}{'FTS5 (ms)':>12}")
+        for nome, termo in termos:
+            for paginacao, cursor in (("página", None), ("cursor", "")):
+                with patch.object(rotas_cliente, "usa_indice_busca", lambda *_: False):
+                    ilike, _ = cronometra(
+                        rotas_cliente.buscar_clientes_todos_campos,
+                        termo,
+                        cursor,
+                        args.repeticoes,
+                    )
+                fts, _ = cronometra(
+                    rotas_cliente.buscar_clientes_todos_campos,
+                    termo,
+                    cursor,
+                    args.repeticoes,
+                )
+                print(
+                    f"{nome:<8}{paginacao:<12}{ilike * 1000:>12.1f}{fts * 1000:>12.1f}"
+                )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Teste de carga: mede a latência de requisições leves (GET /informacoes-gerais/
+e GET /cliente/id/{id}) sozinhas e enquanto um CSV grande de clientes é
+importado. O cenário "no loop" recria o comportamento antigo, com a
+importação executada direto no event loop.
+
+Uso: uv run -m benchmarks.carga_importacao --linhas 50000
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import tempfile
+import time
+from unittest.mock import patch
+
+import polars as pl
+
+
+def gera_csv(linhas: int, deslocamento: int) -> bytes:
+    tabela = pl.DataFrame(
+        {
+            "cpf": [f"{deslocamento + i:011d}" for i in range(linhas)],
+            "nome": [f"Cliente {i}" for i in range(linhas)],
+            "matricula": [f"{i:09d}" for i in range(linhas)],
+            "tipo": ["aluno"] * linhas,
+            "graduando": [True] * linhas,
+            "pos_graduando": [False] * linhas,
+            "bolsista": [False] * linhas,
+        }
+    )
+    buffer = io.BytesIO()
+    tabela.write_csv(buffer)
+    return buffer.getvalue()
+
+
+async def requisicoes_leves(cliente, headers, parar: asyncio.Event) -> list[float]:
+    latencias = []
+    rotas = ["/informacoes-gerais/", "/cliente/id/1"]
+    while not parar.is_set():
+        for rota in rotas:
+            inicio = time.perf_counter()
+            await cliente.get(rota, headers=headers)
+            latencias.append(time.perf_counter() - inicio)
+        await asyncio.sleep(0)
+    return latencias
+
+
+async def cenario(cliente, headers, csv: bytes | None, segundos: float) -> dict:
+    parar = asyncio.Event()
+    leves = asyncio.create_task(requisicoes_leves(cliente, headers, parar))
+
+    inicio = time.perf_counter()
+    if csv is None:
+        await asyncio.sleep(segundos)
+    else:
+        resposta = await cliente.post(
+            "/cliente/upload-csv/",
+            files={"arquivo": ("clientes.csv", csv, "text/csv")},
+            headers=headers,
+            timeout=None,
+        )
+        resposta.raise_for_status()
+    duracao = time.perf_counter() - inicio
+
+    parar.set()
+    latencias = sorted(await leves)
+    return {
+        "duração (s)": duracao,
+        "requisições": len(latencias),
+        "p50 (ms)": statistics.median(latencias) * 1000,
+        "p99 (ms)": latencias[int(len(latencias) * 0.99)] * 1000,
+        "máx (ms)": latencias[-1] * 1000,
+    }
+
+
+async def executa(linhas: int, segundos: float) -> list[tuple[str, dict]]:
+    import httpx
+
+    from app.main import app
+    from app.routers import cliente as rotas_cliente
+
+    async def no_loop(funcao, *args):
+        return funcao(*args)
+
+    resultados = []
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transporte, base_url="http://bench"
+        ) as cliente:
+            login = await cliente.post(
+                "/auth/login", json={"cpf": "19896507406", "senha": "John123!"}
+            )
+            headers = {"Authorization": f"Bearer {login.json()['token']}"}
+
+            resultados.append(
+                ("sem importação", await cenario(cliente, headers, None, segundos))
+            )
+            resultados.append(
+                (
+                    "threadpool",
+                    await cenario(cliente, headers, gera_csv(linhas, 0), segundos),
+                )
+            )
+            with patch.object(rotas_cliente, "run_in_threadpool", no_loop):
+                resultados.append(
+                    (
+                        "no loop",
+                        await cenario(
+                            cliente, headers, gera_csv(linhas, linhas), segundos
+                        ),
+                    )
+                )
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=50_000)
+    parser.add_argument("--segundos", type=float, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        # Precisa ser definido antes de importar o app
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(diretorio, 'bench.db')}"
+        resultados = asyncio.run(executa(args.linhas, args.segundos))
+
+    colunas = list(resultados[0][1])
+    print(f"{'cenário':<16}" + "".join(f"{coluna:>14}" for coluna in colunas))
+    for nome, valores in resultados:
+        print(f"{nome:<16}" + "".join(f"{valores[c]:>14.1f}" for c in colunas))
+
+
+if __name__ == "__main__":
+    main()
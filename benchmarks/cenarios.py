@@ -0,0 +1,339 @@
+"""
+Suíte de carga: popula um banco novo com o gerador determinístico e mede
+p50/p95/p99 e vazão de login, cadastro de compra, importação de CSV, todas
+as listagens e o relatório mensal, com requisições pela aplicação inteira
+(middlewares, autenticação e serialização incluídas).
+
+Cada mudança de desempenho pode ser comparada com uma linha de base salva:
+
+    uv run -m benchmarks.cenarios --salvar benchmarks/baseline.json
+    uv run -m benchmarks.cenarios --comparar benchmarks/baseline.json
+
+Com --comparar, o comando termina com erro se o p95 de algum cenário piorar
+mais que --tolerancia em relação à linha de base.
+"""
+
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+
+import polars as pl
+
+from .gerador import CPF_ADMIN, SENHA_ADMIN, DadosGerados, gera_dados
+
+
+@dataclass
+class Cenario:
+    nome: str
+    # Argumentos de httpx.AsyncClient.request para a i-ésima requisição
+    requisicao: Callable[[int], dict]
+    repeticoes: int
+    # Linhas enviadas por requisição, para medir linhas por segundo
+    linhas: int = 0
+
+
+def csv_clientes(linhas: int, deslocamento: int) -> bytes:
+    buffer = io.BytesIO()
+    pl.DataFrame(
+        {
+            "cpf": [f"{deslocamento + i:011d}" for i in range(linhas)],
+            "nome": [f"Cliente Importado {i}" for i in range(linhas)],
+            "matricula": [f"{deslocamento + i:011d}"[-9:] for i in range(linhas)],
+            "tipo": "aluno",
+            "graduando": True,
+            "pos_graduando": False,
+            "bolsista": False,
+        }
+    ).write_csv(buffer)
+    return buffer.getvalue()
+
+
+def monta_cenarios(dados: DadosGerados, args) -> list[Cenario]:
+    ano, mes = dados.anos[1], 6
+    cliente = dados.primeiro_cliente
+    # Datas depois das geradas: cada cadastro tem uma chave (cliente, horário) nova
+    primeira_compra = datetime(ano + 1, 1, 1, 11, 0)
+
+    def get(url: str) -> Callable[[int], dict]:
+        return lambda _: {"method": "GET", "url": url}
+
+    listagens = {
+        "clientes": "/cliente/",
+        "clientes (cursor)": "/cliente/?cursor=",
+        "busca de clientes": "/cliente/buscar-clientes-todos-campos/?termo_busca=silva",
+        "compras": "/compra/?local=humanas",
+        "lista de compras": "/compra/lista",
+        "lista de compras (pág. 100)": "/compra/lista?page=100",
+        "compras do cliente": f"/compra/cliente/{cliente}/{ano}/{mes}",
+        "funcionários": "/funcionario/",
+        "admins": "/funcionario/admins",
+        "histórico de ações": "/historico_acoes/",
+        "informações gerais": "/informacoes-gerais/",
+    }
+    return [
+        Cenario(
+            "login",
+            lambda _: {
+                "method": "POST",
+                "url": "/auth/login",
+                "json": {"cpf": CPF_ADMIN, "senha": SENHA_ADMIN},
+            },
+            args.repeticoes,
+        ),
+        Cenario(
+            "cadastro de compra",
+            lambda i: {
+                "method": "POST",
+                "url": "/compra/",
+                "json": {
+                    "usuario_id": cliente + i % dados.clientes,
+                    "horario": (primeira_compra + timedelta(days=i)).isoformat(),
+                    "local": "humanas",
+                    "forma_pagamento": "pix",
+                    "preco_compra": 1200,
+                },
+            },
+            args.repeticoes,
+        ),
+        Cenario(
+            "importação de CSV",
+            lambda i: {
+                "method": "POST",
+                "url": "/cliente/upload-csv/",
+                "files": {
+                    "arquivo": (
+                        "clientes.csv",
+                        csv_clientes(
+                            args.linhas_csv, 80_000_000_000 + i * args.linhas_csv
+                        ),
+                        "text/csv",
+                    )
+                },
+            },
+            args.repeticoes_importacao,
+            linhas=args.linhas_csv,
+        ),
+        *(Cenario(nome, get(url), args.repeticoes) for nome, url in listagens.items()),
+        Cenario("relatório mensal", get(f"/relatorio/{ano}/{mes}"), args.repeticoes),
+    ]
+
+
+def resume(latencias: list[float], duracao: float, linhas: int) -> dict:
+    p = statistics.quantiles(latencias, n=100, method="inclusive")
+    resumo = {
+        "p50_ms": p[49] * 1000,
+        "p95_ms": p[94] * 1000,
+        "p99_ms": p[98] * 1000,
+        "por_segundo": len(latencias) / duracao,
+    }
+    if linhas:
+        resumo["linhas_por_segundo"] = len(latencias) * linhas / duracao
+    return resumo
+
+
+async def executa_cenario(
+    cliente, headers: dict, cenario: Cenario, aquecimento: int, concorrencia: int
+) -> dict:
+    async def requisita(i: int) -> float:
+        inicio = time.perf_counter()
+        resposta = await cliente.request(
+            **cenario.requisicao(i), headers=headers, timeout=None
+        )
+        duracao = time.perf_counter() - inicio
+        if resposta.status_code >= 400:
+            raise RuntimeError(
+                f"{cenario.nome}: {resposta.status_code} {resposta.text[:200]}"
+            )
+        return duracao
+
+    for i in range(aquecimento):
+        await requisita(i)
+
+    indices = itertools.count(aquecimento)
+    fim = aquecimento + cenario.repeticoes
+    latencias: list[float] = []
+
+    async def trabalhador():
+        while (i := next(indices)) < fim:
+            latencias.append(await requisita(i))
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    return resume(latencias, time.perf_counter() - inicio, cenario.linhas)
+
+
+async def executa(dados: DadosGerados, args) -> dict[str, dict]:
+    import httpx
+
+    from app.main import app
+
+    resultados = {}
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transporte, base_url="http://bench"
+        ) as cliente:
+            login = await cliente.post(
+                "/auth/login", json={"cpf": CPF_ADMIN, "senha": SENHA_ADMIN}
+            )
+            headers = {"Authorization": f"Bearer {login.json()['token']}"}
+
+            for cenario in monta_cenarios(dados, args):
+                if args.cenarios and cenario.nome not in args.cenarios:
+                    continue
+                resultados[cenario.nome] = await executa_cenario(
+                    cliente, headers, cenario, args.aquecimento, args.concorrencia
+                )
+                print(
+                    f"  {cenario.nome}: p95 {resultados[cenario.nome]['p95_ms']:.1f} ms"
+                )
+    return resultados
+
+
+def parametros(args) -> dict:
+    return {
+        nome: getattr(args, nome)
+        for nome in (
+            "clientes",
+            "compras",
+            "acoes",
+            "semente",
+            "repeticoes",
+            "repeticoes_importacao",
+            "linhas_csv",
+            "concorrencia",
+        )
+    }
+
+
+def ambiente() -> dict:
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "sistema": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def imprime(resultados: dict[str, dict], base: dict[str, dict] | None) -> None:
+    cabecalho = (
+        f"{'cenário':<30}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}"
+    )
+    if base is not None:
+        cabecalho += f"{'p95 base':>10}{'Δ p95':>9}"
+    print(cabecalho)
+    for nome, valores in resultados.items():
+        linha = (
+            f"{nome:<30}{valores['p50_ms']:>10.1f}{valores['p95_ms']:>10.1f}"
+            f"{valores['p99_ms']:>10.1f}{valores['por_segundo']:>10.1f}"
+        )
+        if base is not None and nome in base:
+            anterior = base[nome]["p95_ms"]
+            linha += (
+                f"{anterior:>10.1f}{(valores['p95_ms'] / anterior - 1) * 100:>8.0f}%"
+            )
+        if "linhas_por_segundo" in valores:
+            linha += f"  ({valores['linhas_por_segundo']:.0f} linhas/s)"
+        print(linha)
+
+
+def regressoes(
+    resultados: dict[str, dict], base: dict[str, dict], tolerancia: float
+) -> list[str]:
+    return [
+        nome
+        for nome, valores in resultados.items()
+        if nome in base and valores["p95_ms"] > base[nome]["p95_ms"] * (1 + tolerancia)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--clientes", type=int, default=20_000)
+    parser.add_argument("--compras", type=int, default=200_000)
+    parser.add_argument("--acoes", type=int, default=50_000)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--repeticoes", type=int, default=200)
+    parser.add_argument("--repeticoes-importacao", type=int, default=10)
+    parser.add_argument("--linhas-csv", type=int, default=1000)
+    parser.add_argument("--aquecimento", type=int, default=5)
+    parser.add_argument("--concorrencia", type=int, default=1)
+    parser.add_argument(
+        "--cenarios", nargs="*", help="Roda só os cenários com estes nomes"
+    )
+    parser.add_argument(
+        "--database-url",
+        help="Banco vazio a usar no lugar de um SQLite temporário",
+    )
+    parser.add_argument("--salvar", help="Grava os resultados como linha de base")
+    parser.add_argument("--comparar", help="Compara com a linha de base deste arquivo")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    args = parser.parse_args()
+
+    base = None
+    if args.comparar:
+        with open(args.comparar) as arquivo:
+            base = json.load(arquivo)
+        if base["parametros"] != parametros(args):
+            print("Aviso: parâmetros diferentes dos da linha de base", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        # Precisa ser definido antes de importar o app
+        os.environ["DATABASE_URL"] = args.database_url or (
+            f"sqlite:///{os.path.join(diretorio, 'bench.db')}"
+        )
+        os.environ["DIRETORIO_IMPORTACOES"] = os.path.join(diretorio, "importacoes")
+        from app.models.db_setup import engine
+
+        print(
+            f"Gerando {args.clientes} clientes, {args.compras} compras "
+            f"e {args.acoes} ações..."
+        )
+        dados = gera_dados(
+            engine, args.clientes, args.compras, args.acoes, semente=args.semente
+        )
+        print(f"Dados gerados em {dados.segundos:.1f} s")
+        resultados = asyncio.run(executa(dados, args))
+        engine.dispose()
+
+    imprime(resultados, base["cenarios"] if base else None)
+
+    if args.salvar:
+        with open(args.salvar, "w") as arquivo:
+            json.dump(
+                {
+                    "parametros": parametros(args),
+                    "ambiente": ambiente(),
+                    "dados": asdict(dados),
+                    "cenarios": resultados,
+                },
+                arquivo,
+                indent=2,
+                ensure_ascii=False,
+            )
+            arquivo.write("\n")
+
+    if base:
+        piores = regressoes(resultados, base["cenarios"], args.tolerancia)
+        if piores:
+            print(f"p95 piorou mais de {args.tolerancia:.0%} em: {', '.join(piores)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
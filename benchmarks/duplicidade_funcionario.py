@@ -0,0 +1,132 @@
+"""
+Compara a checagem de CPF e email duplicados no cadastro de funcionários:
+a antiga, que trazia todos os hashes e emails para o Python, e a atual
+(valida_funcionario), com EXISTS sobre os índices de cpf_hash e email.
+
+Uso: uv run -m benchmarks.duplicidade_funcionario --funcionarios 100000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date
+
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.orm import Session
+from validate_docbr import CPF  # type: ignore
+
+from app.core.seguranca import gerar_hash
+from app.models.models import Funcionario, Usuario
+from app.routers.funcionario import valida_funcionario
+from app.schemas.funcionario import FuncionarioIn
+
+TAMANHO_LOTE = 50_000
+
+
+def popula(engine, funcionarios: int) -> None:
+    with engine.begin() as conexao:
+        for deslocamento in range(1, funcionarios + 1, TAMANHO_LOTE):
+            ids = range(
+                deslocamento, min(deslocamento + TAMANHO_LOTE, funcionarios + 1)
+            )
+            conexao.execute(
+                insert(Usuario.__table__),
+                [
+                    {
+                        "id": i,
+                        "cpf_hash": gerar_hash(f"{i:011d}"),
+                        "nome": f"Funcionário {i}",
+                        "subtipo": "funcionario",
+                    }
+                    for i in ids
+                ],
+            )
+            conexao.execute(
+                insert(Funcionario.__table__),
+                [
+                    {
+                        "usuario_id": i,
+                        "tipo": "funcionario",
+                        "senha": "x",
+                        "email": f"funcionario{i}@ru.br",
+                        "data_entrada": date(2020, 1, 1),
+                    }
+                    for i in ids
+                ],
+            )
+
+
+def valida_por_varredura(funcionario: FuncionarioIn, db: Session) -> None:
+    # Checagem anterior, mantida aqui só para comparação
+    assert gerar_hash(funcionario.cpf) not in db.scalars(select(Funcionario.cpf_hash))
+    assert funcionario.email not in db.scalars(select(Funcionario.email))
+
+
+def cronometra(engine, valida, funcionario: FuncionarioIn, repeticoes: int) -> float:
+    tempos = []
+    with Session(engine) as db:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            valida(funcionario.model_copy(), db)
+            tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--funcionarios", type=int, default=100_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    novo = FuncionarioIn(
+        cpf=CPF().generate(),
+        nome="Novo Funcionário",
+        senha="Senha123!",
+        email="novo@ru.br",
+        tipo="funcionario",
+        data_entrada=date(2025, 1, 1),
+    )
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine = create_engine(f"sqlite:///{os.path.join(diretorio, 'bench.db')}")
+        Usuario.__table__.create(engine)
+        Funcionario.__table__.create(engine)
+
+        print(f"Populando {args.funcionarios} funcionários...")
+        popula(engine, args.funcionarios)
+
+        resultados = [
+            (
+                "varredura (antes)",
+                cronometra(engine, valida_por_varredura, novo, args.repeticoes),
+            )
+        ]
+        with engine.begin() as conexao:
+            conexao.execute(text("DROP INDEX ix_funcionario_email"))
+        resultados.append(
+            (
+                "EXISTS (sem índice)",
+                cronometra(engine, valida_funcionario, novo, args.repeticoes),
+            )
+        )
+        with engine.begin() as conexao:
+            conexao.execute(
+                text("CREATE INDEX ix_funcionario_email ON funcionario (email)")
+            )
+        resultados.append(
+            (
+                "EXISTS (com índice)",
+                cronometra(engine, valida_funcionario, novo, args.repeticoes),
+            )
+        )
+        engine.dispose()
+
+    referencia = resultados[0][1]
+    print(f"{'cenário':<24}{'melhor (ms)':>14}{'speedup':>10}")
+    for nome, segundos in resultados:
+        print(f"{nome:<24}{segundos * 1000:>14.3f}{referencia / segundos:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compara o tempo de leitura em lotes (le_em_lotes) do mesmo arquivo de compras
+em CSV, Parquet e Arrow IPC. Mede só a leitura: a validação e a inserção são
+as mesmas para todos os formatos.
+
+Uso: uv run -m benchmarks.formatos_importacao --linhas 2000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import polars as pl
+
+from app.core.importacao import COLUNAS_COMPRA, le_em_lotes
+
+
+def gera_tabela(linhas: int) -> pl.DataFrame:
+    indices = pl.int_range(linhas, eager=True)
+    return pl.DataFrame(
+        {
+            "usuario_id": indices % 5000 + 1,
+            "horario": pl.datetime_range(
+                datetime(2020, 1, 1),
+                datetime(2020, 1, 1) + (linhas - 1) * pl.duration(seconds=1),
+                "1s",
+                eager=True,
+            ),
+            "local": "ufcg",
+            "forma_pagamento": "pix",
+            "preco_compra": 600,
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    tabela = gera_tabela(args.linhas)
+    escritas = {
+        ".csv": tabela.write_csv,
+        ".parquet": tabela.write_parquet,
+        ".arrow": tabela.write_ipc,
+    }
+
+    print(f"{'formato':<10}{'tamanho (MiB)':>16}{'leitura (s)':>14}")
+    with tempfile.TemporaryDirectory() as diretorio:
+        for extensao, escreve in escritas.items():
+            caminho = os.path.join(diretorio, f"compras{extensao}")
+            escreve(caminho)
+
+            inicio = time.perf_counter()
+            linhas = sum(
+                lote.height for _, lote in le_em_lotes(caminho, COLUNAS_COMPRA)
+            )
+            duracao = time.perf_counter() - inicio
+            assert linhas == args.linhas
+
+            tamanho = os.path.getsize(caminho) / 1024 / 1024
+            print(f"{extensao:<10}{tamanho:>16.1f}{duracao:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Gerador determinístico de dados sintéticos para os benchmarks: clientes de
+todos os tipos (alunos com as flags de graduação e bolsa), funcionários,
+compras espalhadas por vários anos nos horários de almoço e jantar e linhas
+do histórico de ações. A mesma semente gera sempre os mesmos dados.
+
+Uso: DATABASE_URL=sqlite:///bench.db uv run -m benchmarks.gerador \
+    --clientes 100000 --compras 1000000 --acoes 200000
+"""
+
+import argparse
+import json
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+
+PRIMEIROS = (
+    "Ana Antônio Beatriz Bruno Caio Camila Carla Daniel Diego Eduarda Elisa "
+    "Fábio Felipe Fernanda Gabriel Gabriela Gustavo Heloísa Hugo Isabela João "
+    "Júlia Larissa Leonardo Letícia Lucas Luíza Marcos Maria Mateus Natália "
+    "Otávio Paula Pedro Rafael Renata Samuel Sofia Tiago Vitória"
+).split()
+SOBRENOMES = (
+    "Almeida Alves Araújo Barbosa Cardoso Carvalho Castro Costa Dias Duarte "
+    "Ferreira Freitas Gomes Lima Lopes Machado Martins Melo Mendes Monteiro "
+    "Moreira Nascimento Nunes Oliveira Pereira Pinto Ramos Reis Ribeiro Rocha "
+    "Rodrigues Santos Silva Soares Souza Teixeira Vieira"
+).split()
+LOCAIS = ("humanas", "exatas", "saúde", "agrárias", "centro")
+FORMAS_PAGAMENTO = ("pix", "credito", "debito", "dinheiro")
+# Proporção aproximada do público de um RU
+PESOS_TIPOS = {"aluno": 75, "professor": 8, "tecnico": 9, "externo": 8}
+
+# Mesmo admin criado na inicialização da aplicação
+CPF_ADMIN = "19896507406"
+SENHA_ADMIN = "John123!"
+
+# Mesmos horários e preços padrão da inicialização da aplicação
+INICIO_ALMOCO, FIM_ALMOCO = (10, 30), (14, 0)
+INICIO_JANTAR, FIM_JANTAR = (17, 0), (20, 0)
+PRECOS = {"almoco": (1200, 600), "jantar": (1000, 500)}
+
+TAMANHO_LOTE = 50_000
+
+
+@dataclass
+class DadosGerados:
+    clientes: int
+    funcionarios: int
+    compras: int
+    acoes: int
+    anos: tuple[int, int]
+    semente: int
+    primeiro_cliente: int
+    segundos: float
+
+
+def _segundos(hora_minuto: tuple[int, int]) -> int:
+    return hora_minuto[0] * 3600 + hora_minuto[1] * 60
+
+
+def _em_lotes(linhas, insere) -> None:
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) == TAMANHO_LOTE:
+            insere(lote)
+            lote = []
+    if lote:
+        insere(lote)
+
+
+def _gera_clientes(aleatorio: random.Random, ids: range, ultimo_ano: int):
+    tipos = list(PESOS_TIPOS)
+    pesos = list(PESOS_TIPOS.values())
+    for id in ids:
+        tipo = aleatorio.choices(tipos, pesos)[0]
+        aluno = tipo == "aluno"
+        graduando = aluno and aleatorio.random() < 0.8
+        ano_ingresso = ultimo_ano - aleatorio.randrange(6)
+        yield {
+            "usuario_id": id,
+            "matricula": None if tipo == "externo" else f"{ano_ingresso}{id:07d}",
+            "tipo": tipo,
+            "graduando": graduando,
+            "pos_graduando": aluno and not graduando,
+            "bolsista": aluno and aleatorio.random() < 0.3,
+        }
+
+
+def _gera_compras(
+    aleatorio: random.Random,
+    clientes: list[dict],
+    quantidade: int,
+    anos: tuple[int, int],
+):
+    inicio = datetime(anos[0], 1, 1)
+    dias = (datetime(anos[1] + 1, 1, 1) - inicio).days
+    janelas = {
+        "almoco": (_segundos(INICIO_ALMOCO), _segundos(FIM_ALMOCO)),
+        "jantar": (_segundos(INICIO_JANTAR), _segundos(FIM_JANTAR)),
+    }
+    # (usuario_id, horario) é a chave primária da compra
+    vistos: set[tuple[int, datetime]] = set()
+    while len(vistos) < quantidade:
+        cliente = aleatorio.choice(clientes)
+        refeicao = "almoco" if aleatorio.random() < 0.65 else "jantar"
+        abre, fecha = janelas[refeicao]
+        horario = inicio + timedelta(
+            days=aleatorio.randrange(dias), seconds=aleatorio.randrange(abre, fecha)
+        )
+        chave = (cliente["usuario_id"], horario)
+        if chave in vistos:
+            continue
+        vistos.add(chave)
+        inteira, meia = PRECOS[refeicao]
+        yield {
+            "usuario_id": cliente["usuario_id"],
+            "horario": horario,
+            "local": aleatorio.choice(LOCAIS),
+            "forma_pagamento": aleatorio.choice(FORMAS_PAGAMENTO),
+            "preco_compra": meia if cliente["bolsista"] else inteira,
+        }
+
+
+def _gera_acoes(
+    aleatorio: random.Random,
+    atores: list[int],
+    clientes: list[dict],
+    quantidade: int,
+    anos: tuple[int, int],
+    acoes: tuple[str, str],
+):
+    inicio = datetime(anos[0], 1, 1)
+    segundos = int((datetime(anos[1] + 1, 1, 1) - inicio).total_seconds())
+    for _ in range(quantidade):
+        cadastro = aleatorio.random() < 0.5
+        yield {
+            "usuario_id_ator": aleatorio.choice(atores),
+            "usuario_id_alvo": aleatorio.choice(clientes)["usuario_id"],
+            "acao": acoes[0] if cadastro else acoes[1],
+            "info": None if cadastro else json.dumps({"local": "humanas"}),
+            "data": inicio + timedelta(seconds=aleatorio.randrange(segundos)),
+        }
+
+
+def gera_dados(
+    engine,
+    clientes: int,
+    compras: int,
+    acoes: int,
+    funcionarios: int = 20,
+    anos: tuple[int, int] = (2023, 2025),
+    semente: int = 42,
+) -> DadosGerados:
+    """
+    Insere os dados sintéticos no banco do `engine`, já com as tabelas
+    criadas, e recalcula o resumo mensal de compras. Os ids continuam a
+    partir do maior já existente.
+    """
+    from sqlalchemy import func, insert, select, text
+    from sqlalchemy.orm import Session
+
+    from app.core.historico_acoes import AcoesEnum
+    from app.core.importacao import protege_cpfs_em_paralelo
+    from app.core.resumo_compras import reconstroi_resumo_compras
+    from app.core.seguranca import gerar_hash, gerar_hash_senha
+    from app.models.models import (
+        Cliente,
+        Compra,
+        Funcionario,
+        HistoricoAcoes,
+        Usuario,
+    )
+
+    comeco = time.perf_counter()
+    aleatorio = random.Random(semente)
+    senha = gerar_hash_senha(SENHA_ADMIN)
+
+    with engine.begin() as conexao:
+        proximo_id = (conexao.scalar(select(func.max(Usuario.id))) or 0) + 1
+        admin_existe = conexao.scalar(
+            select(Usuario.id).where(Usuario.cpf_hash == gerar_hash(CPF_ADMIN))
+        )
+
+        # Funcionários: o admin padrão (se ainda não existir) e os demais
+        cpfs_funcionarios = [f"{90_000_000_000 + i:011d}" for i in range(funcionarios)]
+        if not admin_existe:
+            cpfs_funcionarios.insert(0, CPF_ADMIN)
+        ids_funcionarios = range(proximo_id, proximo_id + len(cpfs_funcionarios))
+        protegidos = protege_cpfs_em_paralelo(cpfs_funcionarios)
+        conexao.execute(
+            insert(Usuario.__table__),
+            [
+                {
+                    "id": id,
+                    "cpf_hash": cpf_hash,
+                    "cpf_cript": cpf_cript,
+                    "nome": f"Funcionário {id}",
+                    "subtipo": "funcionario",
+                }
+                for id, (cpf_hash, cpf_cript) in zip(ids_funcionarios, protegidos)
+            ],
+        )
+        conexao.execute(
+            insert(Funcionario.__table__),
+            [
+                {
+                    "usuario_id": id,
+                    "tipo": "admin" if cpf == CPF_ADMIN else "funcionario",
+                    "senha": senha,
+                    "email": f"funcionario{id}@ru.br",
+                    "data_entrada": date(anos[0], 1, 1),
+                }
+                for id, cpf in zip(ids_funcionarios, cpfs_funcionarios)
+            ],
+        )
+        atores = list(ids_funcionarios)
+        if admin_existe:
+            atores.append(admin_existe)
+
+        primeiro_cliente = ids_funcionarios.stop
+        ids_clientes = range(primeiro_cliente, primeiro_cliente + clientes)
+        linhas_clientes = list(_gera_clientes(aleatorio, ids_clientes, anos[1]))
+        for inicio in range(0, clientes, TAMANHO_LOTE):
+            lote = linhas_clientes[inicio : inicio + TAMANHO_LOTE]
+            protegidos = protege_cpfs_em_paralelo(
+                [f"{linha['usuario_id']:011d}" for linha in lote]
+            )
+            conexao.execute(
+                insert(Usuario.__table__),
+                [
+                    {
+                        "id": linha["usuario_id"],
+                        "cpf_hash": cpf_hash,
+                        "cpf_cript": cpf_cript,
+                        "nome": " ".join(
+                            [
+                                aleatorio.choice(PRIMEIROS),
+                                *aleatorio.sample(SOBRENOMES, 2),
+                            ]
+                        ),
+                        "subtipo": "cliente",
+                    }
+                    for linha, (cpf_hash, cpf_cript) in zip(lote, protegidos)
+                ],
+            )
+            conexao.execute(insert(Cliente.__table__), lote)
+
+        if conexao.dialect.name == "postgresql":
+            # Os ids foram definidos aqui: a sequência precisa acompanhar
+            conexao.execute(
+                text(
+                    "SELECT setval(pg_get_serial_sequence('usuario', 'id'), "
+                    "(SELECT max(id) FROM usuario))"
+                )
+            )
+
+        _em_lotes(
+            _gera_compras(aleatorio, linhas_clientes, compras, anos),
+            lambda lote: conexao.execute(insert(Compra.__table__), lote),
+        )
+        _em_lotes(
+            _gera_acoes(
+                aleatorio,
+                atores,
+                linhas_clientes,
+                acoes,
+                anos,
+                (AcoesEnum.CADASTRAR_CLIENTE.value, AcoesEnum.CADASTRAR_COMPRA.value),
+            ),
+            lambda lote: conexao.execute(insert(HistoricoAcoes.__table__), lote),
+        )
+
+    with Session(engine) as db:
+        reconstroi_resumo_compras(db)
+        db.commit()
+
+    return DadosGerados(
+        clientes=clientes,
+        funcionarios=len(atores),
+        compras=compras,
+        acoes=acoes,
+        anos=anos,
+        semente=semente,
+        primeiro_cliente=primeiro_cliente,
+        segundos=time.perf_counter() - comeco,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clientes", type=int, default=100_000)
+    parser.add_argument("--compras", type=int, default=1_000_000)
+    parser.add_argument("--acoes", type=int, default=200_000)
+    parser.add_argument("--funcionarios", type=int, default=20)
+    parser.add_argument("--anos", type=int, nargs=2, default=(2023, 2025))
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    from app.models.db_setup import engine
+
+    dados = gera_dados(
+        engine,
+        args.clientes,
+        args.compras,
+        args.acoes,
+        args.funcionarios,
+        tuple(args.anos),
+        args.semente,
+    )
+    print(json.dumps(asdict(dados), indent=2))
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compara a filtragem mensal de compras por strftime com o intervalo
+semiaberto [início, fim) sobre o índice de Compra.horario.
+
+Uso: uv run -m benchmarks.intervalo_horario --linhas 10000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, insert, select, text
+
+from app.models.models import Compra
+from app.utils.intervalos import intervalo_mes
+
+TAMANHO_LOTE = 50_000
+
+
+def popula(engine, linhas: int, semente: int) -> None:
+    aleatorio = random.Random(semente)
+    inicio = datetime(2015, 1, 1)
+    segundos = int((datetime(2026, 1, 1) - inicio).total_seconds())
+    formas = ["pix", "credito", "debito", "dinheiro"]
+
+    with engine.begin() as conexao:
+        for deslocamento in range(0, linhas, TAMANHO_LOTE):
+            lote = [
+                {
+                    "usuario_id": deslocamento + i,
+                    "horario": inicio
+                    + timedelta(seconds=aleatorio.randrange(segundos)),
+                    "local": "ufcg",
+                    "forma_pagamento": aleatorio.choice(formas),
+                    "preco_compra": 600,
+                }
+                for i in range(min(TAMANHO_LOTE, linhas - deslocamento))
+            ]
+            conexao.execute(insert(Compra), lote)
+
+
+def cronometra(engine, query, repeticoes: int) -> tuple[float, int]:
+    tempos = []
+    with engine.connect() as conexao:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = conexao.scalar(query)
+            tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=10_000_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    ano, mes = 2020, 6
+    inicio, fim = intervalo_mes(ano, mes)
+    por_strftime = select(func.count()).where(
+        func.strftime("%Y", Compra.horario) == str(ano),
+        func.strftime("%m", Compra.horario) == f"{mes:02d}",
+    )
+    por_intervalo = select(func.count()).where(
+        Compra.horario >= inicio, Compra.horario < fim
+    )
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine = create_engine(f"sqlite:///{os.path.join(diretorio, 'bench.db')}")
+        Compra.__table__.create(engine)
+        with engine.begin() as conexao:
+            conexao.execute(text("DROP INDEX ix_compra_horario"))
+
+        print(f"Populando {args.linhas} compras...")
+        popula(engine, args.linhas, args.semente)
+
+        cenarios = [
+            ("strftime (sem índice)", por_strftime),
+            ("intervalo (sem índice)", por_intervalo),
+        ]
+        resultados = [
+            (nome, *cronometra(engine, query, args.repeticoes))
+            for nome, query in cenarios
+        ]
+
+        with engine.begin() as conexao:
+            conexao.execute(text("CREATE INDEX ix_compra_horario ON compra (horario)"))
+            conexao.execute(text("ANALYZE"))
+        resultados.append(
+            (
+                "intervalo (com índice)",
+                *cronometra(engine, por_intervalo, args.repeticoes),
+            )
+        )
+        engine.dispose()
+
+    referencia = resultados[0][1]
+    print(f"{'cenário':<26}{'melhor (ms)':>14}{'linhas':>10}{'speedup':>10}")
+    for nome, segundos, contagem in resultados:
+        print(
+            f"{nome:<26}{segundos * 1000:>14.2f}{contagem:>10}"
+            f"{referencia / segundos:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Vazão de logins simultâneos, como na abertura de um turno, pelo caminho
+anterior (Funcionario inteiro do banco, senha verificada no event loop e CPF
+descriptografado para o token) e pelo atual (credenciais em cache, senha
+verificada no pool de senhas e CPF do próprio pedido), com o sha256 e com o
+pbkdf2. Também mede a latência de GET /informacoes-gerais/ durante os
+logins, para mostrar se o KDF está segurando o event loop.
+
+Uso: uv run -m benchmarks.login --caixas 300 --concorrencia 50
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from unittest.mock import patch
+
+from .gerador import SENHA_ADMIN
+
+
+async def requisicoes_leves(cliente, headers, parar: asyncio.Event) -> list[float]:
+    latencias = []
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        await cliente.get("/informacoes-gerais/", headers=headers)
+        latencias.append(time.perf_counter() - inicio)
+        await asyncio.sleep(0.005)
+    return latencias
+
+
+async def cenario(cliente, headers, rota: str, cpfs: list[str], concorrencia: int):
+    fila = iter(cpfs)
+    latencias: list[float] = []
+
+    async def caixa():
+        for cpf in fila:
+            inicio = time.perf_counter()
+            resposta = await cliente.post(
+                rota, json={"cpf": cpf, "senha": SENHA_ADMIN}, timeout=None
+            )
+            resposta.raise_for_status()
+            latencias.append(time.perf_counter() - inicio)
+
+    parar = asyncio.Event()
+    leves = asyncio.create_task(requisicoes_leves(cliente, headers, parar))
+    inicio = time.perf_counter()
+    await asyncio.gather(*(caixa() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+    parar.set()
+    leves_latencias = sorted(await leves)
+
+    latencias.sort()
+    return {
+        "logins/s": len(latencias) / duracao,
+        "p50 (ms)": statistics.median(latencias) * 1000,
+        "p99 (ms)": latencias[int(len(latencias) * 0.99)] * 1000,
+        "leve p99 (ms)": leves_latencias[int(len(leves_latencias) * 0.99)] * 1000,
+    }
+
+
+async def executa(args) -> list[tuple[str, dict]]:
+    import httpx
+    from fastapi import HTTPException
+    from sqlalchemy import select, update
+    from sqlalchemy.orm import Session
+
+    from app.core import seguranca
+    from app.core.seguranca import cria_token_de_acesso, gerar_hash, verificar_hash
+    from app.main import app
+    from app.models.db_setup import conexao_bd_assincrona, engine, executa_no_bd
+    from app.models.models import Funcionario
+    from app.schemas.auth import LoginDTO
+    from app.utils.validacao import valida_e_retorna_cpf
+
+    from .gerador import CPF_ADMIN, gera_dados
+
+    def get_usuario_por_cpf(db: Session, cpf: str):
+        cpf = valida_e_retorna_cpf(cpf)
+        return db.scalar(
+            select(Funcionario).where(Funcionario.cpf_hash == gerar_hash(cpf))
+        )
+
+    # Login anterior, mantido aqui só para comparação
+    @app.post("/bench/login-anterior")
+    async def login_anterior(login_data: LoginDTO, db: conexao_bd_assincrona):
+        usuario = await executa_no_bd(db, get_usuario_por_cpf, login_data.cpf)
+        if (
+            usuario
+            and verificar_hash(login_data.senha, usuario.senha)
+            and usuario.data_saida is None
+        ):
+            token = cria_token_de_acesso(
+                {"sub": usuario.cpf, "tipo": usuario.tipo.value, "id": usuario.id}
+            )
+            return {"token": token, "tipo": usuario.tipo.value}
+        raise HTTPException(status_code=400, detail="Usuário ou senha incorretos")
+
+    dados = gera_dados(engine, 0, 0, 0, funcionarios=args.caixas)
+    print(f"{dados.funcionarios} funcionários gerados")
+    cpfs = [f"{90_000_000_000 + i:011d}" for i in range(args.caixas)]
+    # Os CPFs sintéticos não têm dígitos verificadores válidos
+    validacao = patch("app.utils.validacao.cpf.validate", return_value=True)
+
+    resultados = []
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transporte, base_url="http://bench"
+        ) as cliente:
+            login = await cliente.post(
+                "/auth/login", json={"cpf": CPF_ADMIN, "senha": SENHA_ADMIN}
+            )
+            headers = {"Authorization": f"Bearer {login.json()['token']}"}
+
+            for kdf in ("sha256", "pbkdf2"):
+                with (
+                    patch.object(seguranca, "KDF_SENHAS", kdf),
+                    patch.object(seguranca, "ITERACOES_PBKDF2", args.iteracoes),
+                    Session(engine) as db,
+                ):
+                    db.execute(
+                        update(Funcionario).values(
+                            senha=seguranca.gerar_hash_senha(SENHA_ADMIN)
+                        )
+                    )
+                    db.commit()
+
+                with validacao:
+                    for nome, rota in (
+                        ("anterior", "/bench/login-anterior"),
+                        ("atual", "/auth/login"),
+                    ):
+                        resultados.append(
+                            (
+                                f"{kdf} {nome}",
+                                await cenario(
+                                    cliente, headers, rota, cpfs, args.concorrencia
+                                ),
+                            )
+                        )
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--caixas", type=int, default=300)
+    parser.add_argument("--concorrencia", type=int, default=50)
+    parser.add_argument("--iteracoes", type=int, default=600_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        # Precisa ser definido antes de importar o app
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(diretorio, 'bench.db')}"
+        resultados = asyncio.run(executa(args))
+
+    colunas = list(resultados[0][1])
+    print(f"{'cenário':<18}" + "".join(f"{coluna:>15}" for coluna in colunas))
+    for nome, valores in resultados:
+        print(f"{nome:<18}" + "".join(f"{valores[c]:>15.1f}" for c in colunas))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Mede o pico de memória (RSS) da importação de compras por CSV para arquivos
+de tamanhos diferentes. O cenário "arquivo inteiro" recria a leitura antiga,
+com o upload e a tabela inteiros na memória; "em lotes" usa a leitura atual.
+Cada medição roda num processo separado.
+
+Uso: uv run -m benchmarks.memoria_importacao --linhas 100000 400000
+"""
+
+import argparse
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import polars as pl
+
+
+def gera_csv(caminho: str, linhas: int, clientes: int) -> None:
+    # Horários de almoço em dias seguidos, sem repetir por cliente
+    inicio = datetime(2020, 1, 1, 11, 0)
+    indices = pl.int_range(linhas, eager=True)
+    pl.DataFrame(
+        {
+            "usuario_id": indices % clientes + 1,
+            "horario": [
+                (inicio + timedelta(days=i // 3600, seconds=i % 3600)).isoformat()
+                for i in range(linhas)
+            ],
+            "local": "ufcg",
+            "forma_pagamento": "pix",
+            "preco_compra": 600,
+        }
+    ).write_csv(caminho)
+
+
+def le_inteiro(caminho: str, colunas: list[str], esquema=None, pular: int = 0):
+    with open(caminho, "rb") as arquivo:
+        contents = arquivo.read()
+    yield (
+        1,
+        pl.read_csv(io.BytesIO(contents), columns=colunas, schema_overrides=esquema),
+    )
+
+
+def mede(caminho: str, clientes: int, inteiro: bool) -> None:
+    from sqlalchemy.orm import Session
+
+    from app.main import app  # noqa: F401 - cria as tabelas
+    from app.models.db_setup import engine
+    from app.models.models import Cliente, InformacoesGerais
+    from app.routers import compra as rotas_compra
+
+    if inteiro:
+        rotas_compra.le_em_lotes = le_inteiro
+
+    with Session(engine) as db:
+        db.add_all(
+            Cliente(
+                cpf_hash=f"{i:064d}",
+                nome=f"Cliente {i}",
+                matricula=f"{i:09d}",
+                tipo="aluno",
+                graduando=True,
+                pos_graduando=False,
+                bolsista=False,
+            )
+            for i in range(clientes)
+        )
+        db.add(
+            InformacoesGerais(
+                nome_empresa="RU",
+                preco_almoco=1200,
+                preco_meia_almoco=600,
+                preco_jantar=1000,
+                preco_meia_jantar=500,
+                inicio_almoco=datetime(2020, 1, 1, 10, 30).time(),
+                fim_almoco=datetime(2020, 1, 1, 14, 0).time(),
+                inicio_jantar=datetime(2020, 1, 1, 17, 0).time(),
+                fim_jantar=datetime(2020, 1, 1, 20, 0).time(),
+            )
+        )
+        db.commit()
+
+        base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        comeco = time.perf_counter()
+        with open(caminho, "rb") as arquivo:
+            rotas_compra.importa_arquivo_compras(db, arquivo, ".csv", {"id": 1})
+        db.commit()
+        duracao = time.perf_counter() - comeco
+
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KiB no Linux
+    print(f"{(pico - base) / 1024:.1f} {duracao:.1f}")
+
+
+def roda(linhas: int, inteiro: bool, clientes: int) -> tuple[float, float]:
+    with tempfile.TemporaryDirectory() as diretorio:
+        # Gerado aqui para não inflar o pico de memória do processo medido
+        caminho = os.path.join(diretorio, "compras.csv")
+        gera_csv(caminho, linhas, clientes)
+        ambiente = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(diretorio, 'bench.db')}",
+            # Cache de páginas e mmap do SQLite também crescem com o arquivo
+            # e esconderiam o consumo da leitura
+            "SQLITE_CACHE_SIZE": "-2000",
+            "SQLITE_MMAP_SIZE": "",
+        }
+        saida = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.memoria_importacao",
+                "--filho",
+                caminho,
+                "--clientes",
+                str(clientes),
+                *(["--inteiro"] if inteiro else []),
+            ],
+            env=ambiente,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+    return float(saida[-2]), float(saida[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[100_000, 400_000])
+    parser.add_argument("--clientes", type=int, default=1000)
+    parser.add_argument("--filho", help=argparse.SUPPRESS)
+    parser.add_argument("--inteiro", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        mede(args.filho, args.clientes, args.inteiro)
+        return
+
+    print(f"{'linhas':>10}{'cenário':>16}{'pico (MiB)':>14}{'duração (s)':>14}")
+    for linhas in args.linhas:
+        for nome, inteiro in (("arquivo inteiro", True), ("em lotes", False)):
+            pico, duracao = roda(linhas, inteiro, args.clientes)
+            print(f"{linhas:>10}{nome:>16}{pico:>14.1f}{duracao:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
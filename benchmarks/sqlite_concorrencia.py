@@ -0,0 +1,121 @@
+"""
+Compara o SQLite com os pragmas padrão e com o perfil de PRAGMAS_SQLITE
+sob escritas concorrentes de compras (uma transação por compra, como em
+cadastra_compra) enquanto uma thread lê o total do mês.
+
+Uso: uv run -m benchmarks.sqlite_concorrencia --escritores 8 --segundos 10
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+
+from app.models.db_setup import PRAGMAS_SQLITE, aplica_pragmas_sqlite
+from app.models.models import Compra
+from app.utils.intervalos import intervalo_mes
+
+# Pragmas padrão, mas com o mesmo busy_timeout para comparar só a escrita
+SEM_PERFIL = {"busy_timeout": PRAGMAS_SQLITE.get("busy_timeout", "5000")}
+
+
+def escreve(engine, escritor: int, parar: threading.Event, resultado: dict) -> None:
+    horario = datetime(2020, 6, 1) + timedelta(days=escritor)
+    escritas = falhas = 0
+    while not parar.is_set():
+        horario += timedelta(seconds=1)
+        try:
+            with engine.begin() as conexao:
+                conexao.execute(
+                    insert(Compra),
+                    {
+                        "usuario_id": escritor,
+                        "horario": horario,
+                        "local": "ufcg",
+                        "forma_pagamento": "pix",
+                        "preco_compra": 600,
+                    },
+                )
+            escritas += 1
+        except OperationalError:
+            falhas += 1
+    resultado[escritor] = (escritas, falhas)
+
+
+def le(engine, parar: threading.Event, latencias: list[float]) -> None:
+    inicio, fim = intervalo_mes(2020, 6)
+    query = select(func.count()).where(Compra.horario >= inicio, Compra.horario < fim)
+    while not parar.is_set():
+        comeco = time.perf_counter()
+        try:
+            with engine.connect() as conexao:
+                conexao.scalar(query)
+        except OperationalError:
+            continue
+        latencias.append(time.perf_counter() - comeco)
+
+
+def roda_cenario(pragmas: dict, escritores: int, segundos: float) -> dict:
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(diretorio, 'bench.db')}",
+            connect_args={"check_same_thread": False},
+            pool_size=escritores + 1,
+        )
+        aplica_pragmas_sqlite(engine, pragmas)
+        Compra.__table__.create(engine)
+
+        parar = threading.Event()
+        resultado: dict[int, tuple[int, int]] = {}
+        latencias: list[float] = []
+        threads = [
+            threading.Thread(target=escreve, args=(engine, i, parar, resultado))
+            for i in range(escritores)
+        ]
+        threads.append(threading.Thread(target=le, args=(engine, parar, latencias)))
+        for thread in threads:
+            thread.start()
+        time.sleep(segundos)
+        parar.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    escritas = sum(e for e, _ in resultado.values())
+    latencias.sort()
+    return {
+        "escritas/s": escritas / segundos,
+        "falhas": sum(f for _, f in resultado.values()),
+        "leitura p50 (ms)": statistics.median(latencias) * 1000 if latencias else 0,
+        "leitura p99 (ms)": (
+            latencias[int(len(latencias) * 0.99)] * 1000 if latencias else 0
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--escritores", type=int, default=8)
+    parser.add_argument("--segundos", type=float, default=10)
+    args = parser.parse_args()
+
+    cenarios = [("padrão", SEM_PERFIL), ("perfil", PRAGMAS_SQLITE)]
+    resultados = [
+        (nome, roda_cenario(pragmas, args.escritores, args.segundos))
+        for nome, pragmas in cenarios
+    ]
+
+    colunas = list(resultados[0][1])
+    print(f"{'cenário':<10}" + "".join(f"{coluna:>18}" for coluna in colunas))
+    for nome, valores in resultados:
+        print(f"{nome:<10}" + "".join(f"{valores[c]:>18.1f}" for c in colunas))
+
+
+if __name__ == "__main__":
+    main()
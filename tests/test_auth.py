@@ -1,14 +1,17 @@
 from datetime import date
 import unittest
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 from app.main import app
 from app.models.models import Funcionario
 from app.models.db_setup import engine
+from app.core import credenciais, seguranca
 from app.core.seguranca import (
     descriptografa_cpf,
     criptografa_cpf,
     gerar_hash,
+    verifica_token_de_acesso,
 )
 
 client = TestClient(app)
@@ -75,3 +78,108 @@ class AuthTestCase(unittest.TestCase):
 
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json()["detail"], "CPF inválido")
+
+    def test_token_traz_cpf_sem_pontuacao(self):
+        payload = {"cpf": "198.965.074-06", "senha": "John123!"}
+        response = client.post("/auth/login", json=payload)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            verifica_token_de_acesso(response.json()["token"]), "19896507406"
+        )
+
+    def test_login_com_pbkdf2_e_troca_de_senha(self):
+        cpf_novo = "79920205451"
+        login = client.post(
+            "/auth/login", json={"cpf": "19896507406", "senha": "John123!"}
+        )
+        headers = {"Authorization": f"Bearer {login.json()['token']}"}
+
+        with (
+            patch.object(seguranca, "KDF_SENHAS", "pbkdf2"),
+            patch.object(seguranca, "ITERACOES_PBKDF2", 1000),
+        ):
+            response = client.post(
+                "/funcionario/",
+                json={
+                    "cpf": cpf_novo,
+                    "nome": "John Dois",
+                    "senha": "Senha123!",
+                    "email": "john@dois.com",
+                    "tipo": "funcionario",
+                    "data_entrada": "2025-08-04",
+                },
+                headers=headers,
+            )
+            self.assertEqual(response.status_code, 200)
+        self.addCleanup(self.remove_funcionario, cpf_novo)
+        novo = (
+            self.db.query(Funcionario).filter_by(cpf_hash=gerar_hash(cpf_novo)).first()
+        )
+        self.assertTrue(novo.senha.startswith("pbkdf2_sha256$1000$"))
+
+        def entra(senha: str) -> int:
+            return client.post(
+                "/auth/login", json={"cpf": cpf_novo, "senha": senha}
+            ).status_code
+
+        self.assertEqual(entra("Senha123!"), 200)
+        self.assertEqual(entra("errada"), 400)
+
+        # A troca de senha invalida o cache de credenciais
+        response = client.put(
+            f"/funcionario/{novo.id}/", json={"senha": "Nova123!"}, headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(entra("Senha123!"), 400)
+        self.assertEqual(entra("Nova123!"), 200)
+
+        # E o desligamento também
+        response = client.put(
+            f"/funcionario/{novo.id}/",
+            json={"data_saida": "2025-08-05"},
+            headers=headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(entra("Nova123!"), 400)
+
+    def test_cpf_sem_cadastro_tambem_verifica_senha(self):
+        with (
+            patch.object(seguranca, "KDF_SENHAS", "pbkdf2"),
+            patch.object(seguranca, "ITERACOES_PBKDF2", 1000),
+            patch.object(
+                credenciais, "verificar_hash", wraps=seguranca.verificar_hash
+            ) as verificar,
+        ):
+            response = client.post(
+                "/auth/login", json={"cpf": "79920205451", "senha": "John123!"}
+            )
+
+        self.assertEqual(response.status_code, 400)
+        verificar.assert_called_once()
+        self.assertTrue(verificar.call_args.args[1].startswith("pbkdf2_sha256$1000$"))
+
+    def test_hash_malformado_conta_como_senha_errada(self):
+        for hash_str in ("pbkdf2_sha256$abc", "pbkdf2_sha256$10$zz$00", "çãé"):
+            self.assertFalse(seguranca.verificar_hash("John123!", hash_str))
+
+        funcionario = (
+            self.db.query(Funcionario)
+            .filter_by(cpf_hash=self.funcionario_data["cpf_hash"])
+            .first()
+        )
+        funcionario.senha = "pbkdf2_sha256$abc"
+        self.db.commit()
+        response = client.post(
+            "/auth/login", json={"cpf": "19896507406", "senha": "John123!"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def remove_funcionario(self, cpf: str):
+        with Session(engine) as db:
+            funcionario = (
+                db.query(Funcionario).filter_by(cpf_hash=gerar_hash(cpf)).first()
+            )
+            if funcionario:
+                db.delete(funcionario)
+                db.commit()
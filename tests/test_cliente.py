@@ -3,7 +3,8 @@ import unittest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 from app.main import app
-from app.models.models import Cliente, Funcionario
+from app.models.models import Cliente, Funcionario, HistoricoAcoes
+from app.core.historico_acoes import AcoesEnum
 from app.models.db_setup import engine
 from app.core.seguranca import (
     gerar_hash,
@@ -125,6 +126,27 @@ class ClienteTestCase(unittest.TestCase):
         cpfs = [cliente["cpf"] for cliente in data["items"]]
         self.assertIn(payload["cpf"], cpfs)
 
+    def test_listar_clientes_sem_cpf(self):
+        payload = {
+            "cpf": "39410861977",
+            "nome": "Cliente Sem CPF",
+            "matricula": "20240003",
+            "tipo": "aluno",
+            "graduando": True,
+            "pos_graduando": False,
+            "bolsista": True,
+        }
+        self.client.post("/cliente/", json=payload, headers=self.auth_headers)
+        response = self.client.get(
+            "/cliente/",
+            params={"nome": payload["nome"], "incluir_cpf": False},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        items = response.json()["items"]
+        self.assertEqual([cliente["nome"] for cliente in items], [payload["nome"]])
+        self.assertIsNone(items[0]["cpf"])
+
     def test_criar_cliente_sem_campo_obrigatorio(self):
         payload = {
             "cpf": "12345678999",  # falta nome
@@ -349,10 +371,112 @@ class ClienteTestCase(unittest.TestCase):
         assert cliente is not None
         self.assertEqual(cliente.nome, "Cliente A")
 
+        # A ação fica registrada com o funcionário autenticado como ator
+        acao = (
+            self.db.query(HistoricoAcoes)
+            .filter_by(usuario_id_alvo=cliente.id, acao=AcoesEnum.CADASTRAR_CLIENTE)
+            .order_by(HistoricoAcoes.id.desc())
+            .first()
+        )
+        funcionario = (
+            self.db.query(Funcionario)
+            .filter_by(cpf_hash=self.funcionario_data["cpf_hash"])
+            .one()
+        )
+        self.assertEqual(acao.usuario_id_ator, funcionario.id)
+
         # **Limpeza**: deleta o cliente recém-criado para não interferir em próximos testes
         self.db.delete(cliente)
         self.db.commit()
 
+    def test_upload_csv_ignora_duplicados_e_invalidos(self):
+        headers = [
+            "cpf",
+            "nome",
+            "matricula",
+            "tipo",
+            "graduando",
+            "pos_graduando",
+            "bolsista",
+        ]
+        linha = {
+            "cpf": "05566677788",
+            "nome": "Cliente B",
+            "matricula": "20240212",
+            "tipo": "aluno",
+            "graduando": True,
+            "pos_graduando": False,
+            "bolsista": True,
+        }
+        rows = [
+            linha,
+            {**linha, "nome": "Cliente B repetido"},
+            {**linha, "cpf": "05566677799", "tipo": "visitante"},
+        ]
+        csv_bytes = self.generate_csv_bytes(headers, rows)
+
+        for esperado in (1, 0):
+            response = self.client.post(
+                "/cliente/upload-csv/",
+                files={"arquivo": ("clientes.csv", csv_bytes, "text/csv")},
+                headers=self.auth_headers,
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                response.json()["message"],
+                f"{esperado} cliente(s) cadastrado(s) com sucesso.",
+            )
+
+        cliente = (
+            self.db.query(Cliente).filter_by(cpf_hash=gerar_hash("05566677788")).first()
+        )
+        assert cliente is not None
+        self.assertEqual(cliente.nome, "Cliente B")
+        self.assertEqual(descriptografa_cpf(cliente.cpf_cript), "05566677788")
+        self.assertTrue(cliente.bolsista)
+
+        self.db.delete(cliente)
+        self.db.commit()
+
+    def test_upload_arrow_ipc(self):
+        tabela = pl.DataFrame(
+            {
+                "cpf": ["03366677788", "03366677788"],
+                "nome": ["Cliente IPC", "Repetido"],
+                "matricula": ["20240777", "20240778"],
+                "tipo": ["aluno", "aluno"],
+                "graduando": [True, True],
+                "pos_graduando": [False, False],
+                "bolsista": [False, False],
+            }
+        )
+        buf = io.BytesIO()
+        tabela.write_ipc(buf)
+
+        response = self.client.post(
+            "/cliente/upload-csv/",
+            files={
+                "arquivo": (
+                    "clientes.arrow",
+                    buf.getvalue(),
+                    "application/octet-stream",
+                )
+            },
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["message"], "1 cliente(s) cadastrado(s) com sucesso."
+        )
+
+        cliente = (
+            self.db.query(Cliente).filter_by(cpf_hash=gerar_hash("03366677788")).first()
+        )
+        assert cliente is not None
+        self.assertEqual(cliente.nome, "Cliente IPC")
+        self.db.delete(cliente)
+        self.db.commit()
+
     def test_upload_csv_extensao_invalida(self):
         csv_bytes = b"qualquer,conteudo\n"
         response = self.client.post(
@@ -702,5 +826,74 @@ class ClienteTestCase(unittest.TestCase):
         # Deve encontrar a Mariana
         self.assertIn("Mariana Costa", nomes)
 
+    def busca_todos_campos(self, termo: str) -> list[str]:
+        response = self.client.get(
+            "/cliente/buscar-clientes-todos-campos/",
+            params={"termo_busca": termo},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        return [c["nome"] for c in response.json()["items"]]
+
+    def test_buscar_clientes_indice_acompanha_edicao_e_remocao(self):
+        payload = {
+            "cpf": "88451210031",
+            "nome": "Zuleica Andrade",
+            "matricula": "ZX7700101",
+            "tipo": "aluno",
+            "graduando": True,
+            "pos_graduando": False,
+            "bolsista": False,
+        }
+        id = self.client.post(
+            "/cliente/", json=payload, headers=self.auth_headers
+        ).json()["id"]
+
+        # Trecho do meio do nome, sem diferenciar maiúsculas
+        self.assertEqual(self.busca_todos_campos("LEICA"), ["Zuleica Andrade"])
+        self.assertEqual(self.busca_todos_campos("x77001"), ["Zuleica Andrade"])
+        self.assertEqual(self.busca_todos_campos("88451210031"), ["Zuleica Andrade"])
+
+        self.client.put(
+            f"/cliente/id/{id}",
+            json={"nome": "Zenaide Andrade"},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(self.busca_todos_campos("leica"), [])
+        self.assertEqual(self.busca_todos_campos("naide"), ["Zenaide Andrade"])
+
+        self.db.delete(self.db.get(Cliente, id))
+        self.db.commit()
+        self.assertEqual(self.busca_todos_campos("naide"), [])
+
+    @unittest.skipUnless(
+        engine.dialect.name == "sqlite", "Relevância só existe no índice FTS5"
+    )
+    def test_buscar_clientes_ordena_por_relevancia(self):
+        clientes = [
+            ("39410861977", "Ana Beatriz Souza", "ZX7700201"),
+            ("36452746006", "Ana Ana Anacleto", "ZX7700202"),
+        ]
+        for cpf, nome, matricula in clientes:
+            self.client.post(
+                "/cliente/",
+                json={
+                    "cpf": cpf,
+                    "nome": nome,
+                    "matricula": matricula,
+                    "tipo": "aluno",
+                    "graduando": True,
+                    "pos_graduando": False,
+                    "bolsista": False,
+                },
+                headers=self.auth_headers,
+            )
+
+        nomes = self.busca_todos_campos("ana")
+        self.assertLess(
+            nomes.index("Ana Ana Anacleto"), nomes.index("Ana Beatriz Souza")
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+from unittest.mock import patch
 import io
 import polars as pl
 from fastapi.testclient import TestClient
@@ -8,11 +9,12 @@ from app.core.seguranca import (
     descriptografa_cpf,
 )
 from datetime import date, time
+from app.core import importacao
 from app.main import app
 from app.models.models import Compra, Funcionario, Cliente, InformacoesGerais
 from app.models.db_setup import engine
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timedelta
 
 
 client = TestClient(app)
@@ -125,7 +127,7 @@ class CompraTestCase(unittest.TestCase):
 
     def test_cadastra_sucesso(self):
         payload = {
-            "usuario_id": 2,
+            "usuario_id": self.cliente.usuario_id,
             "horario": datetime(2025, 6, 20, 13, 20).isoformat(),
             "local": "ufcg",
             "forma_pagamento": "dinheiro",
@@ -138,7 +140,7 @@ class CompraTestCase(unittest.TestCase):
 
     def test_cadastra_fora_do_horario(self):
         payload = {
-            "usuario_id": 2,
+            "usuario_id": self.cliente.usuario_id,
             "horario": datetime(2025, 6, 20, 9, 20).isoformat(),
             "local": "ufcg",
             "forma_pagamento": "dinheiro",
@@ -179,7 +181,7 @@ class CompraTestCase(unittest.TestCase):
         headers = ["usuario_id", "horario", "local", "forma_pagamento", "preco_compra"]
         rows = [
             {
-                "usuario_id": 2,
+                "usuario_id": self.cliente.usuario_id,
                 "horario": "2025-04-12T12:50:00",
                 "local": "ufcg",
                 "forma_pagamento": "dinheiro",
@@ -200,11 +202,80 @@ class CompraTestCase(unittest.TestCase):
         compra = self.db.query(Compra).filter_by(forma_pagamento="dinheiro").first()
         self.assertIsNotNone(compra)
 
+    def test_cadastra_csv_ignora_duplicadas(self):
+        headers = ["usuario_id", "horario", "local", "forma_pagamento", "preco_compra"]
+        rows = [
+            {
+                "usuario_id": self.cliente.usuario_id,
+                "horario": "2025-04-12T12:50:00",
+                "local": "ufcg",
+                "forma_pagamento": "pix",
+                "preco_compra": 5,
+            },
+            {
+                "usuario_id": self.cliente.usuario_id,
+                "horario": "2025-04-12T12:50:00",
+                "local": "ufcg",
+                "forma_pagamento": "pix",
+                "preco_compra": 5,
+            },
+            {
+                "usuario_id": self.cliente.usuario_id,
+                "horario": "2025-04-12T18:00:00",
+                "local": "ufcg",
+                "forma_pagamento": "debito",
+                "preco_compra": 7,
+            },
+        ]
+        csv_bytes = self.generate_csv_bytes(headers, rows)
+
+        response = self.client.post(
+            "/compra/csv",
+            files={"arquivo": ("compras.csv", csv_bytes, "text/csv")},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["message"], "2 compra(s) cadastrada(s) com sucesso."
+        )
+
+        response = self.client.post(
+            "/compra/csv",
+            files={"arquivo": ("compras.csv", csv_bytes, "text/csv")},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["message"], "0 compra(s) cadastrada(s) com sucesso."
+        )
+        self.assertEqual(self.db.query(Compra).count(), 2)
+
+    def test_cadastra_csv_horario_invalido(self):
+        headers = ["usuario_id", "horario", "local", "forma_pagamento", "preco_compra"]
+        rows = [
+            {
+                "usuario_id": self.cliente.usuario_id,
+                "horario": "ontem ao meio-dia",
+                "local": "ufcg",
+                "forma_pagamento": "pix",
+                "preco_compra": 5,
+            },
+        ]
+        csv_bytes = self.generate_csv_bytes(headers, rows)
+
+        response = self.client.post(
+            "/compra/csv",
+            files={"arquivo": ("compras.csv", csv_bytes, "text/csv")},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.db.query(Compra).count(), 0)
+
     def test_cadastra_csv_fora_do_horario(self):
         headers = ["usuario_id", "horario", "local", "forma_pagamento", "preco_compra"]
         rows = [
             {
-                "usuario_id": 2,
+                "usuario_id": self.cliente.usuario_id,
                 "horario": "2025-04-12T16:00:00",
                 "local": "ufcg",
                 "forma_pagamento": "dinheiro",
@@ -250,6 +321,47 @@ class CompraTestCase(unittest.TestCase):
             "O cliente solicitante da compra não está cadastrado no sistema",
         )
 
+    def test_cadastra_parquet(self):
+        tabela = pl.DataFrame(
+            {
+                "usuario_id": [self.cliente.usuario_id] * 2,
+                "horario": [datetime(2025, 4, 12, 12, 50), datetime(2025, 4, 12, 18)],
+                "local": ["ufcg", "ufcg"],
+                "forma_pagamento": ["pix", "debito"],
+                "preco_compra": [5, 7],
+                # Colunas extras são ignoradas
+                "observacao": ["a", "b"],
+            }
+        )
+        buf = io.BytesIO()
+        tabela.write_parquet(buf)
+
+        response = self.client.post(
+            "/compra/csv",
+            files={
+                "arquivo": (
+                    "compras.parquet",
+                    buf.getvalue(),
+                    "application/vnd.apache.parquet",
+                )
+            },
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["message"], "2 compra(s) cadastrada(s) com sucesso."
+        )
+        self.assertEqual(self.db.query(Compra).count(), 2)
+
+    def test_cadastra_parquet_invalido(self):
+        response = self.client.post(
+            "/compra/csv",
+            files={"arquivo": ("compras.parquet", b"nao e parquet", "text/plain")},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Erro lendo arquivo", response.json()["detail"])
+
     def test_cadastra_csv_extensao_invalida(self):
         csv_bytes = b"qualquer,conteudo\n"
         response = self.client.post(
@@ -258,7 +370,9 @@ class CompraTestCase(unittest.TestCase):
             headers=self.auth_headers,
         )
         self.assertEqual(response.status_code, 400)
-        self.assertIn("O arquivo deveria ser CSV.", response.json()["detail"])
+        self.assertIn(
+            "O arquivo deveria ser CSV, Parquet ou Arrow IPC", response.json()["detail"]
+        )
 
     def test_cadastra_csv_colunas_faltando(self):
         headers = ["usuario_id", "horario", "local"]
@@ -279,9 +393,61 @@ class CompraTestCase(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 422)
         self.assertIn(
-            "O CSV não contém as colunas necessárias.", response.json()["detail"]
+            "O arquivo não contém as colunas necessárias.", response.json()["detail"]
         )
 
+    def test_cadastra_csv_em_lotes(self):
+        headers = ["usuario_id", "horario", "local", "forma_pagamento", "preco_compra"]
+        rows = [
+            {
+                "usuario_id": self.cliente.usuario_id,
+                "horario": (
+                    datetime(2025, 4, 12, 10, 30) + timedelta(seconds=i)
+                ).isoformat(),
+                "local": "ufcg",
+                "forma_pagamento": "pix",
+                "preco_compra": 5,
+            }
+            for i in range(3000)
+        ]
+        # Duplicata de uma linha que está em outro lote
+        rows.append(dict(rows[0]))
+        invalida = {**rows[1], "horario": "2025-04-12T13:59:59", "local": None}
+
+        with patch.object(importacao, "TAMANHO_LOTE_IMPORTACAO", 100):
+            response = self.client.post(
+                "/compra/csv",
+                files={
+                    "arquivo": (
+                        "compras.csv",
+                        self.generate_csv_bytes(headers, [*rows, invalida]),
+                        "text/csv",
+                    )
+                },
+                headers=self.auth_headers,
+            )
+            # Um erro no último lote desfaz os lotes já inseridos
+            self.assertEqual(response.status_code, 422)
+            self.assertIn("linha 3002", response.json()["detail"])
+            self.assertEqual(self.db.query(Compra).count(), 0)
+
+            response = self.client.post(
+                "/compra/csv",
+                files={
+                    "arquivo": (
+                        "compras.csv",
+                        self.generate_csv_bytes(headers, rows),
+                        "text/csv",
+                    )
+                },
+                headers=self.auth_headers,
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["message"], "3000 compra(s) cadastrada(s) com sucesso."
+        )
+        self.assertEqual(self.db.query(Compra).count(), 3000)
+
     def test_filtra_compras_sem_parametro(self):
         compra = Compra(
             usuario_id=self.cliente.usuario_id,
@@ -303,6 +469,79 @@ class CompraTestCase(unittest.TestCase):
         self.assertEqual(info["page"], 1)
         self.assertEqual(info["page_size"], 10)
 
+    def cria_compras_para_exportar(self):
+        self.db.add_all(
+            [
+                Compra(
+                    usuario_id=self.cliente.usuario_id,
+                    horario=datetime(2025, 5, 2, 12, 0),
+                    local="ufcg",
+                    forma_pagamento="pix",
+                    preco_compra=5,
+                ),
+                Compra(
+                    usuario_id=self.cliente.usuario_id,
+                    horario=datetime(2025, 5, 2, 18, 0),
+                    local="humanas",
+                    forma_pagamento="debito",
+                    preco_compra=7,
+                ),
+            ]
+        )
+        self.db.commit()
+
+    def test_exporta_compras_csv(self):
+        self.cria_compras_para_exportar()
+
+        with patch("app.core.exportacao.TAMANHO_LOTE_EXPORTACAO", 1):
+            response = client.get("/compra/exportar", headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/csv"))
+        self.assertIn("compras.csv", response.headers["content-disposition"])
+
+        tabela = pl.read_csv(io.BytesIO(response.content))
+        self.assertEqual(tabela["local"].to_list(), ["ufcg", "humanas"])
+        self.assertEqual(tabela["forma_pagamento"].to_list(), ["pix", "debito"])
+        self.assertEqual(tabela["nome"].to_list(), ["Fulano", "Fulano"])
+        self.assertEqual(tabela["categoria"].to_list(), ["aluno", "aluno"])
+
+    def test_exporta_compras_com_filtros(self):
+        self.cria_compras_para_exportar()
+
+        response = client.get(
+            "/compra/exportar",
+            params={"formato": "ndjson", "refeicao": "jantar", "local": "human"},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        linhas = pl.read_ndjson(io.BytesIO(response.content))
+        self.assertEqual(linhas.height, 1)
+        self.assertEqual(linhas["preco_compra"].to_list(), [7])
+
+        response = client.get(
+            "/compra/exportar",
+            params={"formato": "parquet", "forma_pagamento": "pix"},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        tabela = pl.read_parquet(io.BytesIO(response.content))
+        self.assertEqual(tabela["horario"].to_list(), [datetime(2025, 5, 2, 12, 0)])
+
+        response = client.get(
+            "/compra/exportar",
+            params={"formato": "parquet", "local": "inexistente"},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(pl.read_parquet(io.BytesIO(response.content)).is_empty())
+
+        response = client.get(
+            "/compra/exportar",
+            params={"refeicao": "lanche"},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 400)
+
     def test_filta_compras_not_found(self):
         self.db.query(Compra).delete()
         self.db.commit()
@@ -713,6 +952,33 @@ class CompraTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.json()["items"]), 3)
 
+    def test_lista_compras_por_local_e_forma_pagamento(self):
+        compras = [
+            ("humanas", "pix", datetime(2025, 4, 12, 12, 50)),
+            ("ufcg", "debito", datetime(2025, 4, 13, 12, 50)),
+            ("ufcg", "pix", datetime(2025, 4, 14, 12, 50)),
+        ]
+        for local, forma_pagamento, horario in compras:
+            self.client.post(
+                "/compra/",
+                json={
+                    "usuario_id": self.cliente.usuario_id,
+                    "horario": horario.isoformat(),
+                    "local": local,
+                    "forma_pagamento": forma_pagamento,
+                    "preco_compra": 10,
+                },
+                headers=self.auth_headers,
+            )
+
+        for busca, esperados in (("UMAN", ["humanas"]), ("debi", ["ufcg"])):
+            response = self.client.get(
+                "/compra/lista", params={"busca": busca}, headers=self.auth_headers
+            )
+            self.assertEqual(response.status_code, 200)
+            locais = [compra["local"] for compra in response.json()["items"]]
+            self.assertEqual(locais, esperados)
+
     def test_lista_compras_com_parametro_data(self):
         compras = [
             {
@@ -811,6 +1077,109 @@ class CompraTestCase(unittest.TestCase):
         info = response.json()
         self.assertEqual(info["items"], [])
 
+    def test_compras_por_cliente_e_mes(self):
+        horarios = [
+            datetime(2024, 11, 30, 20, 59),
+            datetime(2024, 12, 1, 12, 0),
+            datetime(2024, 12, 31, 20, 59),
+            datetime(2025, 1, 1, 12, 0),
+        ]
+        for horario in horarios:
+            self.db.add(
+                Compra(
+                    usuario_id=self.cliente.usuario_id,
+                    horario=horario,
+                    local="ufcg",
+                    forma_pagamento="pix",
+                    preco_compra=5,
+                )
+            )
+        self.db.commit()
+
+        response = self.client.get(
+            f"/compra/cliente/{self.cliente.usuario_id}/2024/12",
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(c["horario"] for c in response.json()),
+            ["2024-12-01T12:00:00", "2024-12-31T20:59:00"],
+        )
+
+    def test_compras_por_cliente_e_mes_invalido(self):
+        response = self.client.get(
+            f"/compra/cliente/{self.cliente.usuario_id}/2024/13",
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 422)
+
+    def test_filtra_compras_por_cursor(self):
+        horarios = [datetime(2025, 4, dia, 12, 0) for dia in range(1, 6)]
+        self.db.add_all(
+            Compra(
+                usuario_id=self.cliente.usuario_id,
+                horario=horario,
+                local="ufcg",
+                forma_pagamento="pix",
+                preco_compra=5,
+            )
+            for horario in horarios
+        )
+        self.db.commit()
+
+        vistos = []
+        params = {"page_size": 2, "cursor": "", "contar_total": True}
+        while True:
+            response = self.client.get(
+                "/compra/", params=params, headers=self.auth_headers
+            )
+            self.assertEqual(response.status_code, 200)
+            info = response.json()
+            self.assertEqual(info["total_pages"], 3)
+            vistos.extend(item["horario"] for item in info["items"])
+            if info["next_cursor"] is None:
+                break
+            params["cursor"] = info["next_cursor"]
+
+        self.assertEqual(vistos, [h.isoformat() for h in horarios])
+
+    def test_filtra_compras_por_cursor_sem_total(self):
+        response = self.client.get(
+            "/compra/", params={"cursor": ""}, headers=self.auth_headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()["total_pages"])
+        self.assertIsNone(response.json()["next_cursor"])
+
+    def test_filtra_compras_cursor_invalido(self):
+        response = self.client.get(
+            "/compra/", params={"cursor": "nao-e-cursor"}, headers=self.auth_headers
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @patch("app.models.db_setup.DB_ASSINCRONO", True)
+    def test_cadastra_e_filtra_com_sessao_assincrona(self):
+        payload = {
+            "usuario_id": self.cliente.usuario_id,
+            "horario": datetime(2025, 6, 20, 13, 20).isoformat(),
+            "local": "ufcg",
+            "forma_pagamento": "dinheiro",
+            "preco_compra": 5,
+        }
+        response = self.client.post("/compra/", json=payload, headers=self.auth_headers)
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.post("/compra/", json=payload, headers=self.auth_headers)
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(
+            "/compra/", params={"refeicao": "almoço"}, headers=self.auth_headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [c["horario"] for c in response.json()["items"]], [payload["horario"]]
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
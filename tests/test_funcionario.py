@@ -1,6 +1,7 @@
 from datetime import date
 import unittest
 from fastapi.testclient import TestClient
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import Session
 from app.core.seguranca import (
     criptografa_cpf,
@@ -9,7 +10,7 @@ from app.core.seguranca import (
 )
 from app.main import app
 from app.models.models import Funcionario
-from app.models.db_setup import engine
+from app.models.db_setup import alarga_colunas_curtas, engine
 
 client = TestClient(app)
 
@@ -1988,3 +1989,29 @@ class FuncionarioTestCase(unittest.TestCase):
         self.assertIn("79920205451", cpfs)
         self.assertIn("89159073454", cpfs)
         self.assertNotIn("19896507406", cpfs)
+
+    @unittest.skipUnless(
+        engine.dialect.name == "postgresql", "O SQLite não impõe o tamanho do VARCHAR"
+    )
+    def test_alarga_senha_de_bd_antigo(self):
+        # BDs criados antes dos hashes PBKDF2 tinham senha VARCHAR(50)
+        with engine.begin() as conexao:
+            senhas = conexao.execute(
+                text("SELECT usuario_id, senha FROM funcionario")
+            ).all()
+            conexao.execute(text("UPDATE funcionario SET senha = LEFT(senha, 50)"))
+            conexao.execute(
+                text("ALTER TABLE funcionario ALTER COLUMN senha TYPE VARCHAR(50)")
+            )
+
+        alarga_colunas_curtas()
+
+        with engine.begin() as conexao:
+            conexao.execute(
+                text("UPDATE funcionario SET senha = :senha WHERE usuario_id = :id"),
+                [{"id": id, "senha": senha} for id, senha in senhas],
+            )
+        colunas = {
+            c["name"]: c["type"] for c in inspect(engine).get_columns("funcionario")
+        }
+        self.assertEqual(colunas["senha"].length, 255)
@@ -0,0 +1,258 @@
+import queue
+import time
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.core import fila_auditoria
+from app.core.historico_acoes import AcoesEnum, guarda_acao
+from app.core.seguranca import criptografa_cpf, descriptografa_cpf, gerar_hash
+from app.main import app
+from app.models.models import Funcionario, HistoricoAcoes
+from app.models.db_setup import engine
+
+client = TestClient(app)
+
+
+class HistoricoAcoesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db = Session(engine)
+
+        # Mockando um admin pra ter permissão nas rotas
+        self.admin_data = {
+            "cpf_hash": gerar_hash("19896507406"),
+            "cpf_cript": criptografa_cpf("19896507406"),
+            "nome": "John Doe",
+            "senha": gerar_hash("John123!"),
+            "email": "john@doe.com",
+            "tipo": "admin",
+            "data_entrada": date(2025, 8, 4),
+        }
+        self.admin = (
+            self.db.query(Funcionario)
+            .filter_by(cpf_hash=self.admin_data["cpf_hash"])
+            .first()
+        )
+        if not self.admin:
+            self.admin = Funcionario(**self.admin_data)
+            self.db.add(self.admin)
+            self.db.commit()
+
+        login_payload = {
+            "cpf": descriptografa_cpf(self.admin_data["cpf_cript"]),
+            "senha": "John123!",
+        }
+        login_response = client.post("/auth/login", json=login_payload)
+        assert login_response.status_code == 200, "Falha no login do admin"
+
+        token = login_response.json().get("token")
+        assert token, "Token não retornado no login"
+
+        self.auth_headers = {"Authorization": f"Bearer {token}"}
+
+        # Datas antigas para não colidir com ações registradas por outros testes
+        self.acoes = [
+            HistoricoAcoes(
+                usuario_id_ator=self.admin.id,
+                acao=AcoesEnum.ATUALIZAR_INFOS_GERAIS,
+                info=None,
+                data=data,
+            )
+            for data in (
+                datetime(1999, 12, 31, 23, 59, 59),
+                datetime(2000, 1, 1, 0, 0, 0),
+                datetime(2000, 1, 31, 23, 59, 59),
+                datetime(2000, 2, 1, 0, 0, 0),
+            )
+        ]
+        self.db.add_all(self.acoes)
+        self.db.commit()
+
+    def tearDown(self):
+        for acao in self.acoes:
+            self.db.delete(acao)
+        self.db.commit()
+        self.db.close()
+
+    def test_filtra_acoes_por_ano(self):
+        response = client.get(
+            "/historico_acoes/", params={"ano": 2000}, headers=self.auth_headers
+        )
+        self.assertEqual(response.status_code, 200)
+        datas = [item["data"] for item in response.json()["items"]]
+        self.assertEqual(
+            sorted(datas),
+            ["2000-01-01T00:00:00", "2000-01-31T23:59:59", "2000-02-01T00:00:00"],
+        )
+
+    def test_lista_acoes_com_e_sem_cpf(self):
+        params = {"ano": 2000}
+        response = client.get(
+            "/historico_acoes/", params=params, headers=self.auth_headers
+        )
+        self.assertEqual(response.status_code, 200)
+        cpfs = {item["ator_cpf"] for item in response.json()["items"]}
+        self.assertEqual(cpfs, {"19896507406"})
+
+        response = client.get(
+            "/historico_acoes/",
+            params={**params, "incluir_cpf": False},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        cpfs = {item["ator_cpf"] for item in response.json()["items"]}
+        self.assertEqual(cpfs, {None})
+
+    def test_lista_acao_de_ator_removido(self):
+        ator = Funcionario(
+            cpf_hash=gerar_hash("52998224725"),
+            cpf_cript=criptografa_cpf("52998224725"),
+            nome="Ator Removido",
+            senha=gerar_hash("John123!"),
+            email="ator@removido.com",
+            tipo="funcionario",
+            data_entrada=date(2025, 8, 4),
+        )
+        self.db.add(ator)
+        self.db.commit()
+        acao = HistoricoAcoes(
+            usuario_id_ator=ator.id,
+            acao=AcoesEnum.ATUALIZAR_INFOS_GERAIS,
+            info=None,
+            data=datetime(1998, 6, 1),
+        )
+        self.db.add(acao)
+        self.db.commit()
+        self.acoes.append(acao)
+        ator_id = ator.id
+
+        self.db.delete(ator)
+        self.db.commit()
+
+        response = client.get(
+            "/historico_acoes/", params={"ano": 1998}, headers=self.auth_headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["items"]), 1)
+        item = response.json()["items"][0]
+        self.assertEqual(item["ator_id"], ator_id)
+        self.assertIsNone(item["ator_nome"])
+        self.assertIsNone(item["ator_cpf"])
+
+    def test_filtra_acoes_por_mes(self):
+        response = client.get(
+            "/historico_acoes/",
+            params={"ano": 2000, "mes": 1},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        datas = [item["data"] for item in response.json()["items"]]
+        self.assertEqual(sorted(datas), ["2000-01-01T00:00:00", "2000-01-31T23:59:59"])
+
+    def test_filtra_acoes_mes_sem_ano(self):
+        response = client.get(
+            "/historico_acoes/", params={"mes": 1}, headers=self.auth_headers
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_filtra_acoes_por_cursor(self):
+        datas = []
+        params = {"ano": 2000, "page_size": 1, "cursor": ""}
+        while params["cursor"] is not None:
+            response = client.get(
+                "/historico_acoes/", params=params, headers=self.auth_headers
+            )
+            self.assertEqual(response.status_code, 200)
+            datas.extend(item["data"] for item in response.json()["items"])
+            params["cursor"] = response.json()["next_cursor"]
+
+        self.assertEqual(
+            datas,
+            ["2000-01-01T00:00:00", "2000-01-31T23:59:59", "2000-02-01T00:00:00"],
+        )
+
+    def _acoes_desde(self, inicio: datetime):
+        return (
+            self.db.query(HistoricoAcoes)
+            .filter(
+                HistoricoAcoes.usuario_id_ator == self.admin.id,
+                HistoricoAcoes.acao == AcoesEnum.ANONIMIZAR_CLIENTE,
+                HistoricoAcoes.data >= inicio,
+            )
+            .all()
+        )
+
+    @patch("app.core.fila_auditoria.MODO_AUDITORIA", "lote")
+    def test_fila_grava_acao_so_apos_commit(self):
+        ator = {"id": self.admin.id, "cpf": "19896507406", "tipo": "admin"}
+        inicio = datetime.now()
+        with Session(engine) as db:
+            guarda_acao(db, AcoesEnum.ANONIMIZAR_CLIENTE, ator)
+            db.rollback()
+            fila_auditoria.aguarda_fila()
+            self.assertEqual(self._acoes_desde(inicio), [])
+
+            guarda_acao(db, AcoesEnum.ANONIMIZAR_CLIENTE, ator)
+            db.commit()
+
+        fila_auditoria.aguarda_fila()
+        gravadas = self._acoes_desde(inicio)
+        self.assertEqual(len(gravadas), 1)
+        for acao in gravadas:
+            self.db.delete(acao)
+        self.db.commit()
+
+    @patch("app.core.fila_auditoria.MODO_AUDITORIA", "descartavel")
+    @patch("app.core.fila_auditoria.inicia_fila_auditoria")
+    @patch("app.core.fila_auditoria._fila", queue.Queue(maxsize=1))
+    def test_fila_descartavel_descarta_quando_cheia(self, _):
+        antes = fila_auditoria.metricas_fila()
+        fila_auditoria.enfileira([{"acao": "a"}, {"acao": "b"}])
+        depois = fila_auditoria.metricas_fila()
+
+        self.assertEqual(depois["profundidade"], 1)
+        self.assertEqual(depois["enfileiradas"] - antes["enfileiradas"], 1)
+        self.assertEqual(depois["descartadas"] - antes["descartadas"], 1)
+
+    @patch("app.core.fila_auditoria.MODO_AUDITORIA", "lote")
+    @patch("app.core.fila_auditoria.ESPERA_FILA_AUDITORIA_SEGUNDOS", 0.05)
+    @patch("app.core.fila_auditoria.inicia_fila_auditoria")
+    @patch("app.core.fila_auditoria._fila", queue.Queue(maxsize=1))
+    def test_fila_lote_cheia_grava_direto(self, _):
+        # Trabalhador parado e fila cheia: não pode esperar indefinidamente
+        fila_auditoria._fila.put({"acao": "ocupando"})
+        inicio = datetime.now()
+        linhas = [
+            {
+                "usuario_id_ator": self.admin.id,
+                "acao": AcoesEnum.ANONIMIZAR_CLIENTE.value,
+                "info": "{}",
+                "data": inicio,
+            }
+            for _ in range(3)
+        ]
+
+        antes = fila_auditoria.metricas_fila()
+        comeco = time.perf_counter()
+        fila_auditoria.enfileira(linhas)
+        self.assertLess(time.perf_counter() - comeco, 1)
+        depois = fila_auditoria.metricas_fila()
+
+        self.assertEqual(depois["diretas"] - antes["diretas"], 3)
+        self.assertEqual(depois["enfileiradas"], antes["enfileiradas"])
+        gravadas = self._acoes_desde(inicio)
+        self.assertEqual(len(gravadas), 3)
+        for acao in gravadas:
+            self.db.delete(acao)
+        self.db.commit()
+
+    def test_metricas_fila(self):
+        response = client.get("/historico_acoes/fila", headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("profundidade", response.json())
+        self.assertIn("latencia_media_ms", response.json())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,268 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import date, timedelta
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.core import tarefas_importacao
+from app.core.seguranca import criptografa_cpf, gerar_hash
+from app.main import app
+from app.models.db_setup import engine
+from app.models.models import (
+    Cliente,
+    Funcionario,
+    RejeicaoImportacao,
+    StatusTarefa,
+    TarefaImportacao,
+)
+
+client = TestClient(app)
+
+CABECALHO_CLIENTES = "cpf,nome,matricula,tipo,graduando,pos_graduando,bolsista\n"
+
+
+class ImportacaoTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db = Session(engine)
+
+        admin_data = {
+            "cpf_hash": gerar_hash("19896507406"),
+            "cpf_cript": criptografa_cpf("19896507406"),
+            "nome": "John Doe",
+            "senha": gerar_hash("John123!"),
+            "email": "john@doe.com",
+            "tipo": "admin",
+            "data_entrada": date(2025, 8, 4),
+        }
+        if (
+            not self.db.query(Funcionario)
+            .filter_by(cpf_hash=admin_data["cpf_hash"])
+            .first()
+        ):
+            self.db.add(Funcionario(**admin_data))
+            self.db.commit()
+
+        login_response = client.post(
+            "/auth/login", json={"cpf": "19896507406", "senha": "John123!"}
+        )
+        assert login_response.status_code == 200, "Falha no login do admin"
+        self.auth_headers = {
+            "Authorization": f"Bearer {login_response.json()['token']}"
+        }
+
+        self.diretorio = tempfile.TemporaryDirectory()
+        patcher = patch.object(
+            tarefas_importacao, "DIRETORIO_IMPORTACOES", self.diretorio.name
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tarefas: list[int] = []
+        self.cpfs: list[str] = []
+
+    def tearDown(self):
+        for cpf in self.cpfs:
+            if (
+                cliente := self.db.query(Cliente)
+                .filter_by(cpf_hash=gerar_hash(cpf))
+                .first()
+            ):
+                self.db.delete(cliente)
+        for tarefa_id in self.tarefas:
+            self.db.query(RejeicaoImportacao).filter_by(tarefa_id=tarefa_id).delete()
+            self.db.query(TarefaImportacao).filter_by(id=tarefa_id).delete()
+        self.db.commit()
+        self.db.close()
+        self.diretorio.cleanup()
+
+    def envia_clientes(self, conteudo: str) -> int:
+        response = client.post(
+            "/cliente/upload-csv/",
+            params={"em_segundo_plano": True},
+            files={"arquivo": ("clientes.csv", conteudo.encode(), "text/csv")},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], "pendente")
+        tarefa_id = response.json()["tarefa_id"]
+        self.tarefas.append(tarefa_id)
+        return tarefa_id
+
+    def aguarda_fim(self, tarefa_id: int) -> dict:
+        for _ in range(100):
+            response = client.get(
+                f"/importacoes/{tarefa_id}", headers=self.auth_headers
+            )
+            self.assertEqual(response.status_code, 200)
+            if response.json()["status"] not in ("pendente", "processando"):
+                return response.json()
+            time.sleep(0.1)
+        self.fail("A importação não terminou a tempo")
+
+    def test_importacao_em_segundo_plano(self):
+        self.cpfs = ["71122233344", "71122233355"]
+        tarefa_id = self.envia_clientes(
+            CABECALHO_CLIENTES
+            + "71122233344,Cliente A,123,aluno,true,false,false\n"
+            + "71122233355,Cliente B,124,astronauta,true,false,false\n"
+        )
+
+        tarefa = self.aguarda_fim(tarefa_id)
+        self.assertEqual(tarefa["status"], "concluida")
+        self.assertEqual(tarefa["linhas_total"], 2)
+        self.assertEqual(tarefa["linhas_processadas"], 2)
+        self.assertEqual(tarefa["linhas_inseridas"], 1)
+        self.assertEqual(tarefa["linhas_rejeitadas"], 1)
+        self.assertTrue(
+            self.db.query(Cliente).filter_by(cpf_hash=gerar_hash("71122233344")).first()
+        )
+
+        response = client.get(
+            f"/importacoes/{tarefa_id}/rejeitadas", headers=self.auth_headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["items"],
+            [{"linha": 2, "motivo": "Tipo de cliente inválido"}],
+        )
+
+        # O arquivo é removido quando a tarefa termina
+        self.assertEqual(os.listdir(self.diretorio.name), [])
+
+        response = client.post(
+            f"/importacoes/{tarefa_id}/cancelar", headers=self.auth_headers
+        )
+        self.assertEqual(response.status_code, 409)
+
+    def test_importacao_sem_colunas_falha(self):
+        tarefa_id = self.envia_clientes("cpf,nome\n71122233366,Cliente C\n")
+
+        tarefa = self.aguarda_fim(tarefa_id)
+        self.assertEqual(tarefa["status"], "falhou")
+        self.assertEqual(tarefa["erro"], tarefas_importacao.ERRO_COLUNAS)
+
+    def test_cancela_importacao_pendente(self):
+        self.cpfs = ["71122233377"]
+        with patch.object(tarefas_importacao, "agenda_tarefa"):
+            tarefa_id = self.envia_clientes(
+                CABECALHO_CLIENTES
+                + "71122233377,Cliente D,125,aluno,true,false,false\n"
+            )
+
+        response = client.post(
+            f"/importacoes/{tarefa_id}/cancelar", headers=self.auth_headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "cancelada")
+        self.assertEqual(os.listdir(self.diretorio.name), [])
+
+        # Se o trabalhador pegar a tarefa depois, não importa nada
+        tarefas_importacao.processa_tarefa(tarefa_id)
+        self.db.expire_all()
+        tarefa = self.db.get_one(TarefaImportacao, tarefa_id)
+        self.assertEqual(tarefa.status, StatusTarefa.cancelada)
+        self.assertEqual(tarefa.linhas_processadas, 0)
+        self.assertIsNone(
+            self.db.query(Cliente).filter_by(cpf_hash=gerar_hash("71122233377")).first()
+        )
+
+    def test_tarefa_de_outro_processo_so_e_retomada_apos_o_prazo(self):
+        self.cpfs = ["71122233388"]
+        with patch.object(tarefas_importacao, "agenda_tarefa"):
+            tarefa_id = self.envia_clientes(
+                CABECALHO_CLIENTES
+                + "71122233388,Cliente E,126,aluno,true,false,false\n"
+            )
+
+        # Outro processo reivindica a tarefa primeiro
+        self.assertTrue(tarefas_importacao._reivindica(tarefa_id, "outro"))
+        self.assertFalse(tarefas_importacao._reivindica(tarefa_id, "mais-um"))
+
+        tarefas_importacao.processa_tarefa(tarefa_id)
+        with patch.object(tarefas_importacao, "agenda_tarefa") as agenda:
+            tarefas_importacao.retoma_tarefas()
+        self.assertNotIn(tarefa_id, [c.args[0] for c in agenda.call_args_list])
+        self.db.expire_all()
+        tarefa = self.db.get_one(TarefaImportacao, tarefa_id)
+        self.assertEqual(tarefa.status, StatusTarefa.processando)
+        self.assertEqual(tarefa.dono, "outro")
+        self.assertIsNone(
+            self.db.query(Cliente).filter_by(cpf_hash=gerar_hash("71122233388")).first()
+        )
+
+        # Sem batimento além do prazo, a tarefa pode ser assumida
+        tarefa.atualizada_em -= timedelta(
+            seconds=tarefas_importacao.PRAZO_TAREFA_SEGUNDOS + 1
+        )
+        self.db.commit()
+        with patch.object(tarefas_importacao, "agenda_tarefa") as agenda:
+            tarefas_importacao.retoma_tarefas()
+        self.assertIn(tarefa_id, [c.args[0] for c in agenda.call_args_list])
+
+        tarefas_importacao.processa_tarefa(tarefa_id)
+        self.db.expire_all()
+        tarefa = self.db.get_one(TarefaImportacao, tarefa_id)
+        self.assertEqual(tarefa.status, StatusTarefa.concluida)
+        self.assertIsNone(tarefa.dono)
+        self.assertEqual(tarefa.linhas_inseridas, 1)
+
+    def test_so_o_autor_ou_admin_acessa_a_tarefa(self):
+        funcionarios = [
+            Funcionario(
+                cpf_hash=gerar_hash(cpf),
+                cpf_cript=criptografa_cpf(cpf),
+                nome=nome,
+                senha=gerar_hash("John123!"),
+                email=f"{cpf}@importacao.com",
+                tipo=tipo,
+                data_entrada=date(2025, 8, 4),
+            )
+            for cpf, nome, tipo in [
+                ("41325768928", "Autor Importação", "funcionario"),
+                ("72836149582", "Outro Funcionário", "funcionario"),
+                ("52998224725", "Admin Importação", "admin"),
+            ]
+        ]
+        self.db.add_all(funcionarios)
+        self.db.commit()
+        self.addCleanup(self.remove_funcionarios, funcionarios)
+        autor, outro, admin = (
+            self.login(cpf) for cpf in ("41325768928", "72836149582", "52998224725")
+        )
+
+        self.auth_headers = autor
+        with patch.object(tarefas_importacao, "agenda_tarefa"):
+            tarefa_id = self.envia_clientes("cpf,nome\n71122233399,Cliente F\n")
+
+        for metodo, rota in [
+            ("get", f"/importacoes/{tarefa_id}"),
+            ("get", f"/importacoes/{tarefa_id}/rejeitadas"),
+            ("post", f"/importacoes/{tarefa_id}/cancelar"),
+        ]:
+            response = client.request(metodo, rota, headers=outro)
+            self.assertEqual(response.status_code, 404, rota)
+
+        self.db.expire_all()
+        tarefa = self.db.get_one(TarefaImportacao, tarefa_id)
+        self.assertFalse(tarefa.cancelamento_solicitado)
+
+        response = client.get(f"/importacoes/{tarefa_id}", headers=autor)
+        self.assertEqual(response.status_code, 200)
+        response = client.post(f"/importacoes/{tarefa_id}/cancelar", headers=admin)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "cancelada")
+
+    def login(self, cpf: str) -> dict:
+        response = client.post("/auth/login", json={"cpf": cpf, "senha": "John123!"})
+        self.assertEqual(response.status_code, 200)
+        return {"Authorization": f"Bearer {response.json()['token']}"}
+
+    def remove_funcionarios(self, funcionarios: list[Funcionario]):
+        for funcionario in funcionarios:
+            self.db.delete(funcionario)
+        self.db.commit()
+
+    def test_tarefa_inexistente(self):
+        response = client.get("/importacoes/999999", headers=self.auth_headers)
+        self.assertEqual(response.status_code, 404)
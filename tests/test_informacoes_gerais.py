@@ -2,7 +2,8 @@ import unittest
 from datetime import date
 from fastapi.testclient import TestClient
 from app.main import app
-from app.models.models import InformacoesGerais, Funcionario
+from app.models.models import InformacoesGerais, Funcionario, VersaoCache
+from app.routers.informacoes_gerais import cache_informacoes_gerais
 from app.models.db_setup import engine
 from app.core.seguranca import (
     gerar_hash,
@@ -11,7 +12,9 @@ from app.core.seguranca import (
 )
 from datetime import time
 
+from sqlalchemy import update
 from sqlalchemy.orm import Session
+from unittest.mock import patch
 
 client = TestClient(app)
 
@@ -138,3 +141,42 @@ class TestInformacoesGerais(unittest.TestCase):
         )
         assert response.status_code == 404
         assert response.json() == {"detail": "404: Informações gerais não encontradas."}
+
+    def test_get_informacoes_gerais_usa_cache(self):
+        self.client.get("/informacoes-gerais/", headers=self.auth_headers)
+        acertos = cache_informacoes_gerais.acertos
+
+        response = self.client.get("/informacoes-gerais/", headers=self.auth_headers)
+        assert response.status_code == 200
+        assert cache_informacoes_gerais.acertos == acertos + 1
+
+    def test_cache_invalidado_por_escrita(self):
+        response = self.client.get("/informacoes-gerais/", headers=self.auth_headers)
+        assert response.json()["nome_empresa"] == "Empresa"
+
+        info = self.db.query(InformacoesGerais).first()
+        info.nome_empresa = "Empresa Renomeada"
+        self.db.commit()
+
+        response = self.client.get("/informacoes-gerais/", headers=self.auth_headers)
+        assert response.json()["nome_empresa"] == "Empresa Renomeada"
+
+    def test_cache_percebe_escrita_de_outro_processo(self):
+        self.client.get("/informacoes-gerais/", headers=self.auth_headers)
+
+        # Simula outro worker: escreve sem passar pelos eventos desta Session
+        with engine.begin() as conexao:
+            conexao.execute(
+                update(InformacoesGerais.__table__).values(nome_empresa="Outra")
+            )
+            conexao.execute(
+                update(VersaoCache.__table__)
+                .where(VersaoCache.chave == "informacoes_gerais")
+                .values(versao=VersaoCache.versao + 1)
+            )
+
+        with patch("app.core.cache.CACHE_REVALIDACAO_SEGUNDOS", 0):
+            response = self.client.get(
+                "/informacoes-gerais/", headers=self.auth_headers
+            )
+        assert response.json()["nome_empresa"] == "Outra"
@@ -0,0 +1,102 @@
+import unittest
+from datetime import date, time
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core import instrumentacao
+from app.core.instrumentacao import mede_requisicoes
+from app.core.seguranca import criptografa_cpf, gerar_hash
+from app.main import app
+from app.models.db_setup import engine
+from app.models.models import Funcionario, InformacoesGerais
+
+client = TestClient(app)
+
+CPF_ADMIN = "52998224725"
+
+# Máximo de consultas por rota: um aumento aqui costuma ser um N+1
+ORCAMENTOS = {
+    "/relatorio/2025/8": 5,
+    "/cliente/": 2,
+    "/compra/lista": 2,
+    "/funcionario/": 2,
+    "/historico_acoes/": 2,
+}
+
+
+class InstrumentacaoTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db = Session(engine)
+
+        # Mockando um admin pra ter permissão nas rotas
+        self.admin = Funcionario(
+            cpf_hash=gerar_hash(CPF_ADMIN),
+            cpf_cript=criptografa_cpf(CPF_ADMIN),
+            nome="Admin Instrumentação",
+            senha=gerar_hash("John123!"),
+            email="admin@instrumentacao.com",
+            tipo="admin",
+            data_entrada=date(2025, 8, 4),
+        )
+        # O relatório precisa das informações gerais
+        self.info = InformacoesGerais(
+            nome_empresa="Fulano de Sal",
+            preco_almoco=12,
+            preco_meia_almoco=6,
+            preco_jantar=10,
+            preco_meia_jantar=5,
+            inicio_almoco=time(12, 30),
+            fim_almoco=time(14, 0),
+            inicio_jantar=time(17, 0),
+            fim_jantar=time(20, 0),
+        )
+        self.db.add_all([self.admin, self.info])
+        self.db.commit()
+
+        login_response = client.post(
+            "/auth/login", json={"cpf": CPF_ADMIN, "senha": "John123!"}
+        )
+        assert login_response.status_code == 200, "Falha no login do admin"
+        self.auth_headers = {
+            "Authorization": f"Bearer {login_response.json()['token']}"
+        }
+
+    def tearDown(self):
+        self.db.delete(self.admin)
+        self.db.delete(self.info)
+        self.db.commit()
+        self.db.close()
+
+    def test_server_timing(self):
+        response = client.get("/cliente/", headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            response.headers["Server-Timing"],
+            r'^bd;dur=[\d.]+;desc="\d+ consultas", total;dur=[\d.]+$',
+        )
+
+    def test_orcamento_de_consultas(self):
+        for caminho, orcamento in ORCAMENTOS.items():
+            with self.subTest(caminho=caminho), mede_requisicoes() as medicoes:
+                response = client.get(caminho, headers=self.auth_headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(medicoes), 1)
+                self.assertLessEqual(medicoes[0].consultas, orcamento)
+
+    def test_consulta_lenta_vai_para_o_log_sem_valores(self):
+        with (
+            patch.object(instrumentacao, "SQL_LENTA_MS", 0),
+            self.assertLogs(instrumentacao.logger, "WARNING") as logs,
+        ):
+            client.get(f"/funcionario/?cpf={CPF_ADMIN}", headers=self.auth_headers)
+
+        texto = "\n".join(logs.output)
+        self.assertIn("Consulta lenta", texto)
+        self.assertIn("'str'", texto)
+        self.assertNotIn(gerar_hash(CPF_ADMIN), texto)
+
+
+if __name__ == "__main__":
+    unittest.main()
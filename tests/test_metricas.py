@@ -0,0 +1,131 @@
+import io
+import unittest
+from datetime import date
+
+import polars as pl
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core.seguranca import criptografa_cpf, gerar_hash
+from app.main import app
+from app.models.db_setup import engine
+from app.models.models import Cliente, Funcionario
+
+client = TestClient(app)
+
+CPF_ADMIN = "52998224725"
+CPFS_IMPORTADOS = ["11144477735", "39053344705"]
+
+
+def amostra(nome: str) -> float:
+    """Valor de uma amostra em /metrics, ou 0 se ela ainda não existe."""
+    for linha in client.get("/metrics").text.splitlines():
+        if linha.startswith(nome + " "):
+            return float(linha.rsplit(" ", 1)[1])
+    return 0.0
+
+
+class MetricasTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db = Session(engine)
+
+        # Mockando um admin pra ter permissão nas rotas
+        self.admin = Funcionario(
+            cpf_hash=gerar_hash(CPF_ADMIN),
+            cpf_cript=criptografa_cpf(CPF_ADMIN),
+            nome="Admin Métricas",
+            senha=gerar_hash("John123!"),
+            email="admin@metricas.com",
+            tipo="admin",
+            data_entrada=date(2025, 8, 4),
+        )
+        self.db.add(self.admin)
+        self.db.commit()
+
+        login_response = client.post(
+            "/auth/login", json={"cpf": CPF_ADMIN, "senha": "John123!"}
+        )
+        assert login_response.status_code == 200, "Falha no login do admin"
+        self.auth_headers = {
+            "Authorization": f"Bearer {login_response.json()['token']}"
+        }
+
+    def tearDown(self):
+        for cpf in CPFS_IMPORTADOS:
+            cliente = self.db.query(Cliente).filter_by(cpf_hash=gerar_hash(cpf)).first()
+            if cliente:
+                self.db.delete(cliente)
+        self.db.delete(self.admin)
+        self.db.commit()
+        self.db.close()
+
+    def test_formato_prometheus(self):
+        response = client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        for nome, tipo in [
+            ("ru_requisicoes_duracao_segundos", "histogram"),
+            ("ru_requisicoes_em_andamento", "gauge"),
+            ("ru_bd_pool_espera_segundos", "histogram"),
+            ("ru_bd_consultas_total", "counter"),
+            ("ru_importacao_linhas_total", "counter"),
+            ("ru_auditoria_fila_profundidade", "gauge"),
+            ("ru_cache_acertos_total", "counter"),
+        ]:
+            self.assertIn(f"# TYPE {nome} {tipo}\n", response.text)
+
+    def test_latencia_por_rota(self):
+        contagem = 'ru_requisicoes_duracao_segundos_count{metodo="GET",rota="/cliente/id/{id}",status="404"}'
+        desconhecida = 'ru_requisicoes_duracao_segundos_count{metodo="GET",rota="desconhecida",status="404"}'
+        antes, antes_desconhecida = amostra(contagem), amostra(desconhecida)
+
+        client.get("/cliente/id/987654", headers=self.auth_headers)
+        client.get("/cliente/id/987655", headers=self.auth_headers)
+        client.get("/caminho/que/nao/existe")
+
+        # A rota é o molde do caminho, não a URL requisitada
+        self.assertEqual(amostra(contagem), antes + 2)
+        self.assertEqual(amostra(desconhecida), antes_desconhecida + 1)
+        self.assertNotIn("987654", client.get("/metrics").text)
+
+    def test_consultas_e_cache_de_cpfs(self):
+        consultas = amostra("ru_bd_consultas_total")
+        acertos = amostra('ru_cache_acertos_total{cache="cpfs"}')
+
+        for _ in range(2):
+            response = client.get("/funcionario/admins", headers=self.auth_headers)
+            self.assertEqual(response.status_code, 200)
+
+        self.assertGreater(amostra("ru_bd_consultas_total"), consultas)
+        # Na segunda listagem os CPFs já estão no cache
+        self.assertGreater(amostra('ru_cache_acertos_total{cache="cpfs"}'), acertos)
+
+    def test_linhas_importadas(self):
+        linhas = 'ru_importacao_linhas_total{tipo="clientes"}'
+        antes = amostra(linhas)
+
+        buffer = io.BytesIO()
+        pl.DataFrame(
+            {
+                "cpf": CPFS_IMPORTADOS,
+                "nome": ["Cliente Um", "Cliente Dois"],
+                "matricula": ["20240301", "20240302"],
+                "tipo": "aluno",
+                "graduando": True,
+                "pos_graduando": False,
+                "bolsista": False,
+            }
+        ).write_csv(buffer)
+        response = client.post(
+            "/cliente/upload-csv/",
+            files={"arquivo": ("clientes.csv", buffer.getvalue(), "text/csv")},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(amostra(linhas), antes + 2)
+        self.assertGreater(amostra('ru_importacao_segundos_total{tipo="clientes"}'), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import pstats
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core import perfil
+from app.core.seguranca import criptografa_cpf, gerar_hash
+from app.main import app
+from app.models.db_setup import engine
+from app.models.models import Funcionario
+
+client = TestClient(app)
+
+CPF_ADMIN = "52998224725"
+CPF_FUNCIONARIO = "11144477735"
+
+
+class PerfilTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db = Session(engine)
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.patch = patch.object(perfil, "DIRETORIO_PERFIS", self.diretorio.name)
+        self.patch.start()
+
+        # Mockando um admin e um funcionário comum
+        self.admin = Funcionario(
+            cpf_hash=gerar_hash(CPF_ADMIN),
+            cpf_cript=criptografa_cpf(CPF_ADMIN),
+            nome="Admin Perfil",
+            senha=gerar_hash("John123!"),
+            email="admin@perfil.com",
+            tipo="admin",
+            data_entrada=date(2025, 8, 4),
+        )
+        self.funcionario = Funcionario(
+            cpf_hash=gerar_hash(CPF_FUNCIONARIO),
+            cpf_cript=criptografa_cpf(CPF_FUNCIONARIO),
+            nome="Funcionário Perfil",
+            senha=gerar_hash("John123!"),
+            email="funcionario@perfil.com",
+            tipo="funcionario",
+            data_entrada=date(2025, 8, 4),
+        )
+        self.db.add_all([self.admin, self.funcionario])
+        self.db.commit()
+
+        self.auth_headers = self.login(CPF_ADMIN)
+
+    def tearDown(self):
+        self.db.delete(self.admin)
+        self.db.delete(self.funcionario)
+        self.db.commit()
+        self.db.close()
+        self.patch.stop()
+        self.diretorio.cleanup()
+
+    def login(self, cpf: str) -> dict:
+        response = client.post("/auth/login", json={"cpf": cpf, "senha": "John123!"})
+        assert response.status_code == 200, "Falha no login"
+        return {"Authorization": f"Bearer {response.json()['token']}"}
+
+    def test_sem_cabecalho_nao_perfila(self):
+        response = client.get("/funcionario/admins", headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Perfil-Arquivo", response.headers)
+        self.assertEqual(os.listdir(self.diretorio.name), [])
+
+    def test_admin_perfila_requisicao(self):
+        response = client.get(
+            "/funcionario/admins", headers={**self.auth_headers, "X-Perfil": "1"}
+        )
+        self.assertEqual(response.status_code, 200)
+        nome = response.headers["X-Perfil-Arquivo"]
+
+        stats = pstats.Stats(os.path.join(self.diretorio.name, nome))
+        self.assertTrue(
+            any(funcao == "pesquisar_funcionarios" for _, _, funcao in stats.stats),
+            "A rota deveria aparecer no perfil",
+        )
+
+        listagem = client.get("/perfis/", headers=self.auth_headers)
+        self.assertEqual(listagem.json(), [nome])
+
+        arquivo = client.get(f"/perfis/{nome}", headers=self.auth_headers)
+        self.assertEqual(arquivo.status_code, 200)
+        self.assertGreater(len(arquivo.content), 0)
+
+        resumo = client.get(
+            f"/perfis/{nome}?resumo=true&linhas=5", headers=self.auth_headers
+        )
+        self.assertEqual(resumo.status_code, 200)
+        self.assertIn("cumulative", resumo.text)
+
+    def test_perfil_inexistente(self):
+        response = client.get("/perfis/nao-existe.pstats", headers=self.auth_headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_somente_admin(self):
+        headers = {**self.login(CPF_FUNCIONARIO), "X-Perfil": "1"}
+        response = client.get("/funcionario/admins", headers=headers)
+        self.assertEqual(response.status_code, 403)
+
+        response = client.get("/cliente/", headers={"X-Perfil": "1"})
+        self.assertEqual(response.status_code, 403)
+
+        response = client.get("/perfis/", headers=self.login(CPF_FUNCIONARIO))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(os.listdir(self.diretorio.name), [])
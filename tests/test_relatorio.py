@@ -2,9 +2,17 @@ import unittest
 from datetime import date, datetime, time
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
+from app.core.resumo_compras import reconstroi_resumo_compras
 from app.core.seguranca import gerar_hash, criptografa_cpf, descriptografa_cpf
 from app.main import app
-from app.models.models import Funcionario, Cliente, Compra, InformacoesGerais, Usuario
+from app.models.models import (
+    Funcionario,
+    Cliente,
+    Compra,
+    InformacoesGerais,
+    ResumoMensalCompras,
+    Usuario,
+)
 from app.models.db_setup import engine
 
 client = TestClient(app)
@@ -120,9 +128,12 @@ class RelatorioTestCase(unittest.TestCase):
             },
         ]
 
+        ids = []
         for cliente_data in clientes:
             cliente = Cliente(**cliente_data)
             self.db.add(cliente)
+            self.db.flush()
+            ids.append(cliente.id)
 
         self.db.commit()
 
@@ -141,24 +152,24 @@ class RelatorioTestCase(unittest.TestCase):
 
         compras = [
             {
-                "usuario_id": 2,  # cliente externo
+                "usuario_id": ids[0],  # cliente externo
                 "horario": datetime(2025, 8, 15, 10, 0, 0),
                 "local": "humanas",
                 "forma_pagamento": "pix",
                 "preco_compra": 1196,
             },
             {
-                "usuario_id": 3,  # professor
+                "usuario_id": ids[1],  # professor
                 "horario": datetime(2025, 8, 20, 14, 0, 0),
                 "local": "exatas",
                 "forma_pagamento": "dinheiro",
                 "preco_compra": 1196,
             },
             {
-                "usuario_id": 5,  # aluno graduação
+                "usuario_id": ids[3],  # aluno graduação
                 "horario": datetime(2025, 8, 25, 16, 0, 0),
                 "local": "humanas",
-                "forma_pagamento": "cartao",
+                "forma_pagamento": "credito",
                 "preco_compra": 596,
             },
         ]
@@ -168,6 +179,8 @@ class RelatorioTestCase(unittest.TestCase):
             self.db.add(compra)
 
         self.db.commit()
+        reconstroi_resumo_compras(self.db)
+        self.db.commit()
 
     def cria_funcionario(self, dados=None):
         dados_func = {
@@ -350,3 +363,107 @@ class RelatorioTestCase(unittest.TestCase):
             headers=self.auth_headers_funcionario,
         )
         self.assertEqual(response.status_code, 200)
+
+    def test_relatorio_compra_de_nao_cliente_so_entra_no_faturamento_bruto(self):
+        admin = (
+            self.db.query(Funcionario)
+            .filter_by(cpf_hash=gerar_hash("19896507406"))
+            .first()
+        )
+        self.db.add(
+            Compra(
+                usuario_id=admin.id,
+                horario=datetime(2025, 8, 10, 12, 0, 0),
+                local="humanas",
+                forma_pagamento="pix",
+                preco_compra=1000,
+            )
+        )
+        self.db.commit()
+        reconstroi_resumo_compras(self.db)
+        self.db.commit()
+
+        response = client.get("/relatorio/2025/8", headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+
+        self.assertEqual(data["faturamento_bruto_mensal"], 3988)
+        self.assertEqual(data["faturamento_por_tipo"]["total"], 3988)
+        self.assertEqual(data["compras_por_tipo"]["total"], 3)
+
+    def test_relatorio_reflete_compra_cadastrada_pela_api(self):
+        aluno_pos = (
+            self.db.query(Cliente).filter_by(cpf_hash=gerar_hash("90464227046")).first()
+        )
+        payload = {
+            "usuario_id": aluno_pos.id,
+            "horario": datetime(2025, 8, 11, 13, 0, 0).isoformat(),
+            "local": "humanas",
+            "forma_pagamento": "pix",
+            "preco_compra": 600,
+        }
+        response = client.post("/compra/", json=payload, headers=self.auth_headers)
+        self.assertEqual(response.status_code, 201)
+
+        response = client.get("/relatorio/2025/8", headers=self.auth_headers)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+
+        self.assertEqual(data["faturamento_bruto_mensal"], 3588)
+        self.assertEqual(data["compras_por_tipo"]["total"], 4)
+        self.assertEqual(data["compras_por_tipo"]["alunos"]["pos_graduacao"], 1)
+        self.assertEqual(data["compras_por_tipo"]["alunos"]["bolsistas"], 1)
+        self.assertEqual(data["faturamento_por_tipo"]["alunos"]["pos_graduacao"], 600)
+
+    def test_reconstroi_resumo_compras(self):
+        esperado = client.get("/relatorio/2025/8", headers=self.auth_headers).json()
+
+        self.db.query(ResumoMensalCompras).delete()
+        self.db.commit()
+
+        response = client.get("/relatorio/2025/8", headers=self.auth_headers)
+        self.assertEqual(response.json()["faturamento_bruto_mensal"], 0)
+
+        reconstroi_resumo_compras(self.db)
+        self.db.commit()
+
+        response = client.get("/relatorio/2025/8", headers=self.auth_headers)
+        self.assertEqual(response.json(), esperado)
+        self.assertEqual(esperado["faturamento_bruto_mensal"], 2988)
+
+    def test_mudanca_de_categoria_move_compras_no_resumo(self):
+        aluno = (
+            self.db.query(Cliente).filter_by(cpf_hash=gerar_hash("72050228007")).first()
+        )
+        response = client.put(
+            f"/cliente/id/{aluno.id}",
+            json={"tipo": "professor", "graduando": False},
+            headers=self.auth_headers,
+        )
+        self.assertEqual(response.status_code, 200)
+
+        depois = client.get("/relatorio/2025/8", headers=self.auth_headers).json()
+        self.assertEqual(depois["compras_por_tipo"]["alunos"]["total"], 0)
+        self.assertEqual(depois["compras_por_tipo"]["professores"], 2)
+        self.assertEqual(depois["faturamento_por_tipo"]["professores"], 1792)
+        self.assertEqual(depois["faturamento_bruto_mensal"], 2988)
+
+        # A reconstrução chega ao mesmo resultado
+        reconstroi_resumo_compras(self.db)
+        self.db.commit()
+        response = client.get("/relatorio/2025/8", headers=self.auth_headers)
+        self.assertEqual(response.json(), depois)
+
+    def test_inicializacao_preenche_resumo_vazio(self):
+        esperado = client.get("/relatorio/2025/8", headers=self.auth_headers).json()
+
+        # Banco anterior ao resumo: compras gravadas e resumo vazio
+        self.db.query(ResumoMensalCompras).delete()
+        self.db.commit()
+
+        with TestClient(app):
+            pass
+
+        response = client.get("/relatorio/2025/8", headers=self.auth_headers)
+        self.assertEqual(response.json(), esperado)
+        self.assertEqual(esperado["faturamento_bruto_mensal"], 2988)